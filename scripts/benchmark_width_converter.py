@@ -0,0 +1,146 @@
+"""
+Compare the width converter implementations for non-integer ratios: the
+up converter to lcm(data_w_i, data_w_o) followed by a down converter, and
+the gearbox.
+
+    uv run python3 scripts/benchmark_width_converter.py [-r 24:32 -r 32:24 ...]
+
+Resources are counted on the flattened design after "proc; opt -full" with
+the yosys bundled with amaranth (register bits, mux bits and other cell
+output bits). It is not a synthesis, but it is enough to compare the cores.
+Throughput and latency come from an amaranth simulation of a stream of
+packets of each length, with tvalid and tready always high. in_rate@N is
+the input beats per cycle with packets of N beats: short packets show the
+cost of the packet boundaries.
+"""
+
+import argparse
+from collections import Counter
+import re
+
+from amaranth.back import rtlil
+from amaranth.sim import Simulator
+from amaranth._toolchain.yosys import find_yosys
+
+from hdl_utils.amaranth_utils.axi_stream_width_converter import AXIStreamWidthConverter
+
+
+DEFAULT_RATIOS = ['24:32', '32:24', '16:40', '40:16', '24:64', '64:24']
+DEFAULT_PACKET_LENGTHS = [1, 2, 3, 240]
+REGISTER_CELLS = ('$dff', '$adff', '$sdff', '$dffe', '$adffe', '$sdffe', '$sdffce')
+
+
+def count_resources(core) -> Counter:
+    il = rtlil.convert(core, ports=core.get_ports())
+    yosys = find_yosys(lambda ver: ver >= (0, 10))
+    flat = yosys.run(['-q', '-'], '\n'.join([
+        'read_rtlil <<rtlil',
+        il,
+        'rtlil',
+        'hierarchy -top top',
+        'proc',
+        'flatten',
+        'opt -full',
+        'write_rtlil -',
+    ]))
+    resources = Counter()
+    for cell_type, params in re.findall(r'^\s*cell (\S+) \S+\n((?:\s*parameter .*\n)*)', flat, re.M):
+        params = dict(re.findall(r'parameter \\(\S+) (\S+)', params))
+        width = int(params.get('WIDTH', params.get('Y_WIDTH', 1)))
+        if cell_type in REGISTER_CELLS:
+            resources['register_bits'] += width
+        elif cell_type in ('$mux', '$pmux'):
+            resources['mux_bits'] += width
+        else:
+            resources['logic_bits'] += width
+    return resources
+
+
+def measure_throughput(core, packet_length: int, n_packets: int) -> dict:
+    sink, source = core.sink, core.source
+    length = packet_length * n_packets
+    result = {}
+
+    async def testbench(ctx):
+        ctx.set(source.tready, 1)
+        ctx.set(sink.tvalid, 1)
+        n_in = n_out = n_last = cycle = 0
+        while True:
+            ctx.set(sink.tdata, n_in)
+            ctx.set(sink.tkeep, 2**len(sink.tkeep) - 1)
+            ctx.set(sink.tlast, n_in % packet_length == packet_length - 1)
+            *_, in_ok, out_ok, out_last = await ctx.tick().sample(
+                sink.accepted(), source.accepted(), source.tlast)
+            cycle += 1
+            n_in += in_ok
+            n_out += out_ok
+            n_last += out_ok and out_last
+            if n_in == length:
+                ctx.set(sink.tvalid, 0)
+                result.setdefault('in_cycles', cycle)
+            if out_ok and 'latency' not in result:
+                result['latency'] = cycle
+            if n_last == n_packets:
+                result['cycles'] = cycle
+                result['out_beats'] = n_out
+                return
+
+    sim = Simulator(core)
+    sim.add_clock(1e-8)
+    sim.add_testbench(testbench)
+    sim.run()
+    return result
+
+
+def benchmark(data_w_i: int, data_w_o: int, packet_lengths: list[int], length: int) -> list[dict]:
+    rows = []
+    for gearbox in [False, True]:
+        def create():
+            return AXIStreamWidthConverter(
+                data_w_i=data_w_i,
+                data_w_o=data_w_o,
+                user_w_i=0,
+                gearbox=gearbox,
+            )
+        row = {
+            'ratio': f'{data_w_i}->{data_w_o}',
+            'core': 'gearbox' if gearbox else 'lcm chain',
+        }
+        row.update(count_resources(create()))
+        for packet_length in packet_lengths:
+            n_packets = max(1, length // packet_length)
+            perf = measure_throughput(create(), packet_length, n_packets)
+            row[f'in_rate@{packet_length}'] = packet_length * n_packets / perf['in_cycles']
+            row['latency'] = perf['latency']
+        rows.append(row)
+    return rows
+
+
+def parse_args(sys_args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', '--ratio', action='append', default=None,
+                        help='data_w_i:data_w_o (can be repeated)')
+    parser.add_argument('-p', '--packet-length', type=int, action='append', default=None,
+                        help='Input beats per packet (can be repeated)')
+    parser.add_argument('-l', '--length', type=int, default=240,
+                        help='Input beats of the simulated stream')
+    return parser.parse_args(sys_args)
+
+
+def main(sys_args=None):
+    args = parse_args(sys_args)
+    packet_lengths = args.packet_length or DEFAULT_PACKET_LENGTHS
+    columns = ['ratio', 'core', 'register_bits', 'mux_bits', 'logic_bits',
+               *[f'in_rate@{n}' for n in packet_lengths], 'latency']
+    print(' | '.join(f'{c:>13}' for c in columns))
+    for ratio in args.ratio or DEFAULT_RATIOS:
+        data_w_i, data_w_o = (int(w) for w in ratio.split(':'))
+        for row in benchmark(data_w_i, data_w_o, packet_lengths, args.length):
+            print(' | '.join(
+                f'{row.get(c, 0):>13.2f}' if isinstance(row.get(c), float) else f'{row.get(c, 0):>13}'
+                for c in columns
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+from amaranth import Array, Cat, DomainRenamer, Elaboratable, Module, Mux, Signal
+from amaranth.lib.fifo import SyncFIFO
+import math
+
+from hdl_utils.amaranth_utils.coding import PriorityEncoder
+from hdl_utils.amaranth_utils.interfaces.axi_full import AXI4Signature
+
+
+# Address channel payload forwarded from the selected master
+ADDR_FIELDS = ('ADDR', 'LEN', 'SIZE', 'BURST', 'LOCK', 'CACHE', 'PROT', 'QOS', 'REGION')
+
+
+class QosRoundRobinArbiter(Elaboratable):
+    """Round-robin arbiter among the requests with the highest QoS.
+
+    Among the asserted requests, only those with the highest qos value are
+    eligible. Each eligible request is granted once per round: requests
+    already served in the current round wait until the other eligible ones
+    have been served. Rounds are tracked per request, so a high QoS master
+    coming and going doesn't make the low QoS ones starve each other.
+
+    The grant is consumed when advance is asserted. While hold is asserted
+    (the grant is waiting to be accepted), the grant doesn't change.
+    """
+
+    def __init__(self, n: int, qos_w: int = 4, domain: str = 'sync'):
+        self.n = n
+        self.domain = domain
+        self.requests = Signal(n)
+        self.qos = [Signal(qos_w, name=f'qos_{i}') for i in range(n)]
+        self.advance = Signal()
+        self.hold = Signal()
+        self.grant = Signal(range(max(n, 2)))
+        self.grant_valid = Signal()
+
+    def elaborate(self, platform):
+        m = Module()
+        sync = m.d[self.domain]
+
+        eligible = Signal(self.n)
+        for i in range(self.n):
+            beaten = [
+                self.requests[j] & (self.qos[j] > self.qos[i])
+                for j in range(self.n) if j != i
+            ]
+            m.d.comb += eligible[i].eq(self.requests[i] & ~Cat(*beaten, 0).any())
+
+        served = Signal(self.n)
+        m.submodules.pe_unserved = pe_unserved = PriorityEncoder(self.n)
+        m.submodules.pe_eligible = pe_eligible = PriorityEncoder(self.n)
+        new_round = pe_unserved.n
+        locked = Signal()
+        locked_grant = Signal.like(self.grant)
+        grant_onehot = Signal(self.n)
+        m.d.comb += [
+            pe_unserved.i.eq(eligible & ~served),
+            pe_eligible.i.eq(eligible),
+            self.grant.eq(Mux(
+                locked,
+                locked_grant,
+                Mux(new_round, pe_eligible.o, pe_unserved.o),
+            )),
+            self.grant_valid.eq(locked | ~pe_eligible.n),
+            grant_onehot.eq(1 << self.grant),
+        ]
+        with m.If(self.advance):
+            sync += locked.eq(0)
+            # A new round only restarts the eligible requests
+            with m.If(new_round & ~locked):
+                sync += served.eq((served & ~eligible) | grant_onehot)
+            with m.Else():
+                sync += served.eq(served | grant_onehot)
+        with m.Elif(self.hold):
+            sync += [
+                locked.eq(1),
+                locked_grant.eq(self.grant),
+            ]
+
+        return m
+
+
+class AxiArbiter(Elaboratable):
+    """N:1 AXI4 arbiter, to share one memory port between several masters.
+
+    Write and read address channels are arbitrated independently with a
+    QoS-aware round-robin (AWQOS/ARQOS, driven by wr_qos/rd_qos in AxiDma).
+    Once a master is selected, the address channel stays with it until the
+    address is accepted.
+
+    The index of the master is prepended to the ID (id_w + index bits in
+    m_axi), so several transactions from different masters can be in
+    flight at the same time and B/R responses are routed back by ID.
+
+    Write data follows the order of the accepted write addresses: up to
+    max_outstanding_writes bursts can be accepted ahead of their data.
+    """
+
+    def __init__(
+        self,
+        addr_w: int,
+        data_w: int,
+        n_masters: int,
+        user_w: int = 0,
+        id_w: int = 0,
+        max_outstanding_writes: int = 4,
+        domain: str = 'sync',
+    ):
+        assert n_masters >= 1
+        self.addr_w = addr_w
+        self.data_w = data_w
+        self.n_masters = n_masters
+        self.user_w = user_w
+        self.id_w = id_w
+        self.max_outstanding_writes = max_outstanding_writes
+        self.domain = domain
+        self.index_w = max(1, math.ceil(math.log2(n_masters)))
+        self.s_axi = [
+            AXI4Signature.create_slave(
+                addr_w=addr_w,
+                data_w=data_w,
+                user_w=user_w,
+                id_w=id_w,
+                path=[f's_axi_{i:02d}'],
+            )
+            for i in range(n_masters)
+        ]
+        self.m_axi = AXI4Signature.create_master(
+            addr_w=addr_w,
+            data_w=data_w,
+            user_w=user_w,
+            id_w=id_w + self.index_w,
+            path=['m_axi'],
+        )
+
+    def get_ports(self):
+        ports = []
+        for s_axi in self.s_axi:
+            ports += s_axi.extract_signals()
+        ports += self.m_axi.extract_signals()
+        return ports
+
+    def elaborate(self, platform):
+        m = Module()
+        comb = m.d.comb
+
+        # Write address. The index of the master is queued for the write
+        # data, and no address is accepted while the queue is full.
+        w_order = SyncFIFO(width=self.index_w, depth=self.max_outstanding_writes)
+        m.submodules.w_order = DomainRenamer(self.domain)(w_order)
+        aw_sel = self.elaborate_address_channel(m, 'AW', enable=w_order.w_rdy)
+        comb += [
+            w_order.w_data.eq(aw_sel),
+            w_order.w_en.eq(self.m_axi.aw_accepted()),
+        ]
+
+        # Write data, in the order of the accepted write addresses
+        w_sel = w_order.r_data
+        w_fields = ['WDATA', 'WSTRB', 'WLAST'] + (['WUSER'] if self.user_w else [])
+        for name in w_fields:
+            comb += getattr(self.m_axi, name).eq(
+                Array(getattr(s, name) for s in self.s_axi)[w_sel]
+            )
+        comb += self.m_axi.WVALID.eq(
+            w_order.r_rdy & Array(s.WVALID for s in self.s_axi)[w_sel]
+        )
+        for i, s in enumerate(self.s_axi):
+            comb += s.WREADY.eq(w_order.r_rdy & (w_sel == i) & self.m_axi.WREADY)
+        comb += w_order.r_en.eq(self.m_axi.w_accepted() & self.m_axi.WLAST)
+
+        # Write response, routed by ID
+        self.elaborate_response_channel(m, 'B', ['BRESP'] + (['BUSER'] if self.user_w else []))
+
+        # Read address
+        self.elaborate_address_channel(m, 'AR')
+
+        # Read data, routed by ID
+        r_fields = ['RDATA', 'RRESP', 'RLAST'] + (['RUSER'] if self.user_w else [])
+        self.elaborate_response_channel(m, 'R', r_fields)
+
+        return m
+
+    def elaborate_address_channel(self, m, ch: str, enable=1):
+        """Arbitrate and mux an address channel ('AW' or 'AR'). Returns the
+        index of the selected master.
+        """
+        comb = m.d.comb
+        m_axi = self.m_axi
+
+        arbiter = QosRoundRobinArbiter(self.n_masters, domain=self.domain)
+        m.submodules[f'{ch.lower()}_arbiter'] = arbiter
+
+        valid = getattr(m_axi, f'{ch}VALID')
+        ready = getattr(m_axi, f'{ch}READY')
+        accepted = valid & ready
+
+        # The selection stays stable while the address waits to be accepted
+        sel = arbiter.grant
+        comb += [
+            arbiter.requests.eq(Cat(getattr(s, f'{ch}VALID') for s in self.s_axi)),
+            valid.eq(arbiter.grant_valid & enable),
+            arbiter.advance.eq(accepted),
+            arbiter.hold.eq(valid & ~ready),
+        ]
+        for i, s in enumerate(self.s_axi):
+            comb += arbiter.qos[i].eq(getattr(s, f'{ch}QOS'))
+
+        for field in ADDR_FIELDS + (('USER',) if self.user_w else ()):
+            name = f'{ch}{field}'
+            comb += getattr(m_axi, name).eq(
+                Array(getattr(s, name) for s in self.s_axi)[sel]
+            )
+        index = sel[:self.index_w]
+        if self.id_w:
+            comb += getattr(m_axi, f'{ch}ID').eq(Cat(
+                Array(getattr(s, f'{ch}ID') for s in self.s_axi)[sel],
+                index,
+            ))
+        else:
+            comb += getattr(m_axi, f'{ch}ID').eq(index)
+        for i, s in enumerate(self.s_axi):
+            comb += getattr(s, f'{ch}READY').eq(accepted & (sel == i))
+
+        return index
+
+    def elaborate_response_channel(self, m, ch: str, fields: list):
+        """Route a response channel ('B' or 'R') back by the ID prefix."""
+        comb = m.d.comb
+        m_axi = self.m_axi
+        resp_id = getattr(m_axi, f'{ch}ID')
+        index = resp_id[self.id_w:]
+        for i, s in enumerate(self.s_axi):
+            comb += getattr(s, f'{ch}VALID').eq(getattr(m_axi, f'{ch}VALID') & (index == i))
+            for name in fields:
+                comb += getattr(s, name).eq(getattr(m_axi, name))
+            if self.id_w:
+                comb += getattr(s, f'{ch}ID').eq(resp_id[:self.id_w])
+        comb += getattr(m_axi, f'{ch}READY').eq(
+            Array(getattr(s, f'{ch}READY') for s in self.s_axi)[index]
+        )
+
+
+def add_arguments(parser):
+    parser.add_argument('-aw', '--addr-width', type=int, required=True,
+                        help='Address width in bits')
+    parser.add_argument('-dw', '--data-width', type=int, required=True,
+                        help='Data width in bits')
+    parser.add_argument('-uw', '--user-width', type=int, default=0,
+                        help='User width in bits')
+    parser.add_argument('-iw', '--id-width', type=int, default=0,
+                        help='ID width of the slave ports in bits')
+    parser.add_argument('-m', '--masters', type=int, required=True,
+                        help='Number of masters')
+    parser.add_argument('-ow', '--max-outstanding-writes', type=int, default=4,
+                        help='Write bursts accepted ahead of their data')
+    parser.add_argument('-rstn', '--active-low-reset', action='store_true',
+                        help='Use active low reset (default is active high)')
+    parser.add_argument('-n', '--name', type=str,
+                        default=None, help='Core name')
+    parser.add_argument('--prefix', type=str,
+                        default='', help='Module names prefix')
+
+
+def parse_args(sys_args=None):
+    import argparse
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    return parser.parse_args(sys_args)
+
+
+def create_core(args) -> tuple[Elaboratable, str]:
+    name = args.name or f'axi_arbiter_x{args.masters}'
+    core = AxiArbiter(
+        addr_w=args.addr_width,
+        data_w=args.data_width,
+        n_masters=args.masters,
+        user_w=args.user_width,
+        id_w=args.id_width,
+        max_outstanding_writes=args.max_outstanding_writes,
+    )
+    if args.active_low_reset:
+        from hdl_utils.amaranth_utils.rstn_wrapper import RstnWrapper
+        core = RstnWrapper(core=core, domain="sync")
+    return core, name
+
+
+def main(sys_args=None):
+    from hdl_utils.amaranth_utils.generate_verilog import generate_verilog
+    args = parse_args(sys_args)
+    core, name = create_core(args)
+    ports = core.get_ports()
+    output = generate_verilog(
+        core=core,
+        name=name,
+        ports=ports,
+        prefix=args.prefix
+    )
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
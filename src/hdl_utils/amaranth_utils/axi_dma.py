@@ -1,37 +1,67 @@
-from amaranth import Elaboratable, Module, Signal, Mux, Const
+from amaranth import Elaboratable, Module, Signal, Mux, Cat, Const
 from amaranth.lib import wiring
 
 from hdl_utils.amaranth_utils.interfaces.axi4_stream import AXI4StreamSignature
+from hdl_utils.amaranth_utils.axi_perf_counters import AxiPerfCounters
+from hdl_utils.amaranth_utils.axi_stream_realigner import AXIStreamRealigner
 from hdl_utils.amaranth_utils.axi_stream_to_full import AxiStreamToFull
 
 
 class AxiDma(Elaboratable):
+    """Stream to memory (write) and memory to stream (read) DMA.
+
+    By default transfers start at addresses aligned to the data width and
+    their length is given in beats (wr_len_beats/rd_len_beats).
+
+    With unaligned=True, start addresses are byte-granular and lengths are
+    given in bytes (wr_len_bytes/rd_len_bytes). The streams have tkeep:
+    the sink must be packed (only the last beat of a packet can be
+    partial) and the source is packed. Write data is realigned to the
+    address and partial memory beats are written with WSTRB. Read data is
+    fetched in whole beats and realigned to lane 0.
+
+    Bursts are cut at 4KB boundaries: a burst is min(burst_len, beats up
+    to the next 4KB boundary, beats remaining) long, so runtime burst
+    lengths that are not a power of two and unaligned start addresses are
+    legal AXI.
+
+    With perf_counters=True, self.perf_counters (AxiPerfCounters) counts
+    the m_axi activity and the backpressure of the DMA sink and source.
+    """
+
     def __init__(
         self,
         addr_w: int = 40,
         data_w: int = 128,
         user_w: int = 0,
         burst_len: int = 256,
+        unaligned: bool = False,
+        perf_counters: bool = False,
     ):
         self.addr_w = addr_w
         self.data_w = data_w
         self.user_w = user_w
         self.burst_len = burst_len
+        self.unaligned = unaligned
 
         # Modules
         self.axi_stream_to_full = AxiStreamToFull(
             addr_w=addr_w,
             data_w=data_w,
             user_w=user_w,
+            no_tkeep=not unaligned,
         )
+        if unaligned:
+            self.wr_realigner = AXIStreamRealigner(data_w=data_w, user_w=user_w)
+            self.rd_realigner = AXIStreamRealigner(data_w=data_w, user_w=user_w)
 
         # Sink
         self.sink = AXI4StreamSignature.create_slave(
-            data_w=data_w, user_w=user_w, no_tkeep=True, path=['s_axis'],
+            data_w=data_w, user_w=user_w, no_tkeep=not unaligned, path=['s_axis'],
         )
         # Source
         self.source = AXI4StreamSignature.create_master(
-            data_w=data_w, user_w=user_w, no_tkeep=True, path=['m_axis'],
+            data_w=data_w, user_w=user_w, no_tkeep=not unaligned, path=['m_axis'],
         )
         # M_AXI
         self.m_axi = self.axi_stream_to_full.m_axi
@@ -40,14 +70,27 @@ class AxiDma(Elaboratable):
         self.rd_start = Signal()
         self.wr_addr = Signal.like(self.m_axi.ARADDR)
         self.rd_addr = Signal.like(self.m_axi.ARADDR)
-        self.wr_len_beats = Signal(32)
-        self.rd_len_beats = Signal(32)
+        if unaligned:
+            self.wr_len_bytes = Signal(32)
+            self.rd_len_bytes = Signal(32)
+        else:
+            self.wr_len_beats = Signal(32)
+            self.rd_len_beats = Signal(32)
         self.wr_qos = Signal(4)
         self.rd_qos = Signal(4)
+        # Runtime burst length in beats, sampled with each start. 0 or
+        # values above the elaboration-time burst_len select burst_len.
+        self.wr_burst_len = Signal(range(burst_len + 1), init=burst_len)
+        self.rd_burst_len = Signal(range(burst_len + 1), init=burst_len)
         self.wr_ack = Signal()  # Out
         self.rd_ack = Signal()  # Out
         self.wr_finish = Signal()
         self.rd_finish = Signal()
+        self.perf_counters = None
+        if perf_counters:
+            self.perf_counters = AxiPerfCounters(
+                m_axi=self.m_axi, sink=self.sink, source=self.source,
+            )
 
     def get_ports(self, include_config_signals: bool = True):
         ports = [
@@ -61,45 +104,94 @@ class AxiDma(Elaboratable):
                 self.rd_start,
                 self.wr_addr,
                 self.rd_addr,
-                self.wr_len_beats,
-                self.rd_len_beats,
+            ]
+            if self.unaligned:
+                ports += [self.wr_len_bytes, self.rd_len_bytes]
+            else:
+                ports += [self.wr_len_beats, self.rd_len_beats]
+            ports += [
                 self.wr_qos,
                 self.rd_qos,
+                self.wr_burst_len,
+                self.rd_burst_len,
                 self.wr_ack,
                 self.rd_ack,
                 self.wr_finish,
                 self.rd_finish,
             ]
+        if self.perf_counters is not None:
+            ports += self.perf_counters.get_ports()
         return ports
 
     def elaborate(self, platform):
         m = Module()
         m.submodules.axi_stream_to_full = self.axi_stream_to_full
+        if self.perf_counters is not None:
+            m.submodules.perf_counters = self.perf_counters
 
-        # as the number of beats of a full frame is multiple of the
-        # highest burst size (256), fixed bursts at max size.
-        AWLEN_CONST = self.burst_len - 1
-        ARLEN_CONST = self.burst_len - 1
-
+        # The burst length is selected at runtime, up to burst_len, and
+        # every burst is cut at the next 4KB boundary.
         bytes_per_beat = self.data_w // 8
-        addr_jump = Const(self.burst_len * bytes_per_beat)
+        beat_shift = (bytes_per_beat - 1).bit_length()
+        boundary_beats = 4096 // bytes_per_beat
+        assert boundary_beats >= 1, 'Beats wider than 4KB'
+
+        def clamp_burst_len(burst_len) -> Signal:
+            return Mux(
+                (burst_len == 0) | (burst_len > self.burst_len),
+                self.burst_len,
+                burst_len,
+            )
+
+        wr_burst_len_r = Signal.like(self.wr_burst_len)
+        rd_burst_len_r = Signal.like(self.rd_burst_len)
 
+        # Address of the next burst
         wr_addr_r = Signal.like(self.m_axi.AWADDR)
         rd_addr_r = Signal.like(self.m_axi.ARADDR)
         wr_qos_r = Signal.like(self.axi_stream_to_full.wr_qos)
         rd_qos_r = Signal.like(self.axi_stream_to_full.rd_qos)
-        wr_offset = Signal(32)
-        rd_offset = Signal(32)
         wr_beats_remaining = Signal(32)
         rd_beats_remaining = Signal(32)
 
         def minimum(a, b) -> Signal:
             return Mux(a > b, b, a)
 
+        def burst_axlen(addr, burst_len, last_beat) -> Signal:
+            # AxLEN of a burst at addr: burst_len beats, cut at the next
+            # 4KB boundary and at last_beat (beats remaining - 1).
+            to_boundary = boundary_beats - addr[beat_shift:12]
+            return minimum(minimum(burst_len, to_boundary) - 1, last_beat)
+
+        def burst_bytes(axlen) -> Signal:
+            return (axlen + 1) << beat_shift
+
+        # Streams and transfers as seen by the burst logic. Unaligned
+        # transfers are realigned around it, so it always works with whole
+        # memory beats at aligned addresses.
+        wr_stream = self.sink.as_master()
+        rd_stream = self.source
+        wr_start = self.wr_start
+        rd_start = self.rd_start
+        wr_addr = self.wr_addr
+        rd_addr = self.rd_addr
+        wr_config = []  # Extra registers loaded with each accepted config
+        rd_config = []
+        rd_keep = []
+        if self.unaligned:
+            wr_stream, rd_stream, rd_start, wr_len_beats, rd_len_beats = self.elaborate_realigners(
+                m, bytes_per_beat, beat_shift, wr_config, rd_config, rd_keep, rd_beats_remaining,
+            )
+            wr_addr = Cat(Const(0, beat_shift), self.wr_addr[beat_shift:])
+            rd_addr = Cat(Const(0, beat_shift), self.rd_addr[beat_shift:])
+        else:
+            wr_len_beats = self.wr_len_beats
+            rd_len_beats = self.rd_len_beats
+
         # Sink and Memory Write assignments
         def disconnect_sink() -> list:
             return [
-                self.sink.disconnect_from_sink(),
+                wr_stream.disconnect_from_sink(),
                 *self.axi_stream_to_full.s_axis.connect_to_null_source(),
             ]
 
@@ -111,11 +203,13 @@ class AxiDma(Elaboratable):
         # Dma Write Config assignments
         def recv_wr_config() -> list:
             return [
-                self.axi_stream_to_full.wr_valid.eq(self.wr_start),
-                self.axi_stream_to_full.wr_addr.eq(self.wr_addr),
+                self.axi_stream_to_full.wr_valid.eq(wr_start),
+                self.axi_stream_to_full.wr_addr.eq(wr_addr),
                 self.axi_stream_to_full.wr_qos.eq(self.wr_qos),
-                self.axi_stream_to_full.wr_burst.eq(minimum(AWLEN_CONST, self.wr_len_beats - 1)),
-                self.wr_ack.eq(self.wr_start & self.axi_stream_to_full.wr_ready),
+                self.axi_stream_to_full.wr_burst.eq(
+                    burst_axlen(wr_addr, clamp_burst_len(self.wr_burst_len), wr_len_beats - 1)
+                ),
+                self.wr_ack.eq(wr_start & self.axi_stream_to_full.wr_ready),
             ]
 
         def set_dma_wr_busy() -> list:
@@ -130,9 +224,11 @@ class AxiDma(Elaboratable):
         def configure_new_wr_burst() -> list:
             return [
                 self.axi_stream_to_full.wr_valid.eq(1),
-                self.axi_stream_to_full.wr_addr.eq(wr_addr_r + wr_offset + addr_jump),
+                self.axi_stream_to_full.wr_addr.eq(wr_addr_r),
                 self.axi_stream_to_full.wr_qos.eq(wr_qos_r),
-                self.axi_stream_to_full.wr_burst.eq(minimum(AWLEN_CONST, wr_beats_remaining)),
+                self.axi_stream_to_full.wr_burst.eq(
+                    burst_axlen(wr_addr_r, wr_burst_len_r, wr_beats_remaining)
+                ),
                 self.wr_ack.eq(0),
             ]
 
@@ -148,11 +244,12 @@ class AxiDma(Elaboratable):
                 m.d.comb += disconnect_sink()
                 with m.If(self.axi_stream_to_full.wr_valid & self.axi_stream_to_full.wr_ready):
                     m.d.sync += [
-                        wr_addr_r.eq(self.wr_addr),
+                        wr_addr_r.eq(wr_addr + burst_bytes(self.axi_stream_to_full.wr_burst)),
                         wr_qos_r.eq(self.wr_qos),
-                        wr_offset.eq(0),
-                        wr_beats_remaining.eq(self.wr_len_beats - 1),
+                        wr_burst_len_r.eq(clamp_burst_len(self.wr_burst_len)),
+                        wr_beats_remaining.eq(wr_len_beats - 1),
                         self.wr_finish.eq(0),
+                        *wr_config,
                     ]
                     m.next = "WR_BURST_STARTED"
 
@@ -164,17 +261,17 @@ class AxiDma(Elaboratable):
                     m.d.comb += disconnect_sink()
                     with m.If(self.axi_stream_to_full.wr_valid & self.axi_stream_to_full.wr_ready):
                         m.d.sync += [
-                            wr_offset.eq(wr_offset + addr_jump),
+                            wr_addr_r.eq(wr_addr_r + burst_bytes(self.axi_stream_to_full.wr_burst)),
                         ]
 
                 with m.Else():
                     m.d.comb += set_dma_wr_busy()
-                    wiring.connect(m, self.sink.as_master(), self.axi_stream_to_full.s_axis)
+                    wiring.connect(m, wr_stream, self.axi_stream_to_full.s_axis)
 
-                    with m.If(self.sink.accepted() & (wr_beats_remaining > 0)):
+                    with m.If(wr_stream.accepted() & (wr_beats_remaining > 0)):
                         m.d.sync += wr_beats_remaining.eq(wr_beats_remaining - 1)
 
-                    with m.If(self.sink.accepted() & (self.sink.tlast | (wr_beats_remaining == 0))):
+                    with m.If(wr_stream.accepted() & (wr_stream.tlast | (wr_beats_remaining == 0))):
                         m.d.sync += self.wr_finish.eq(1)
                         m.next = "WR_PREPARE"
 
@@ -182,28 +279,31 @@ class AxiDma(Elaboratable):
         # Memory read and Source assignments
         def disconnect_source() -> list:
             return [
-                *self.source.connect_to_null_source(),
+                *rd_stream.connect_to_null_source(),
                 self.axi_stream_to_full.m_axis.disconnect_from_sink(),
             ]
 
         def connect_mem_rd_to_source() -> list:
             return [
-                self.source.tvalid.eq(self.axi_stream_to_full.m_axis.tvalid),
-                self.source.tdata.eq(self.axi_stream_to_full.m_axis.tdata),
-                self.source.tlast.eq(
+                rd_stream.tvalid.eq(self.axi_stream_to_full.m_axis.tvalid),
+                rd_stream.tdata.eq(self.axi_stream_to_full.m_axis.tdata),
+                rd_stream.tlast.eq(
                     self.axi_stream_to_full.m_axis.tvalid & (rd_beats_remaining == 0)
                 ),
-                self.axi_stream_to_full.m_axis.tready.eq(self.source.tready),
+                self.axi_stream_to_full.m_axis.tready.eq(rd_stream.tready),
+                *rd_keep,
             ]
 
         # Dma Read Config assignments
         def recv_rd_config() -> list:
             return [
-                self.axi_stream_to_full.rd_valid.eq(self.rd_start),
-                self.axi_stream_to_full.rd_addr.eq(self.rd_addr),
+                self.axi_stream_to_full.rd_valid.eq(rd_start),
+                self.axi_stream_to_full.rd_addr.eq(rd_addr),
                 self.axi_stream_to_full.rd_qos.eq(self.rd_qos),
-                self.axi_stream_to_full.rd_burst.eq(minimum(ARLEN_CONST, self.rd_len_beats - 1)),
-                self.rd_ack.eq(self.rd_start & self.axi_stream_to_full.rd_ready),
+                self.axi_stream_to_full.rd_burst.eq(
+                    burst_axlen(rd_addr, clamp_burst_len(self.rd_burst_len), rd_len_beats - 1)
+                ),
+                self.rd_ack.eq(rd_start & self.axi_stream_to_full.rd_ready),
             ]
 
         def set_dma_rd_busy() -> list:
@@ -218,9 +318,11 @@ class AxiDma(Elaboratable):
         def configure_new_rd_burst() -> list:
             return [
                 self.axi_stream_to_full.rd_valid.eq(1),
-                self.axi_stream_to_full.rd_addr.eq(rd_addr_r + rd_offset + addr_jump),
+                self.axi_stream_to_full.rd_addr.eq(rd_addr_r),
                 self.axi_stream_to_full.rd_qos.eq(rd_qos_r),
-                self.axi_stream_to_full.rd_burst.eq(minimum(ARLEN_CONST, rd_beats_remaining)),
+                self.axi_stream_to_full.rd_burst.eq(
+                    burst_axlen(rd_addr_r, rd_burst_len_r, rd_beats_remaining)
+                ),
                 self.rd_ack.eq(0),
             ]
 
@@ -236,11 +338,12 @@ class AxiDma(Elaboratable):
                 m.d.comb += disconnect_source()
                 with m.If(self.axi_stream_to_full.rd_valid & self.axi_stream_to_full.rd_ready):
                     m.d.sync += [
-                        rd_addr_r.eq(self.rd_addr),
+                        rd_addr_r.eq(rd_addr + burst_bytes(self.axi_stream_to_full.rd_burst)),
                         rd_qos_r.eq(self.rd_qos),
-                        rd_offset.eq(0),
-                        rd_beats_remaining.eq(self.rd_len_beats - 1),
+                        rd_burst_len_r.eq(clamp_burst_len(self.rd_burst_len)),
+                        rd_beats_remaining.eq(rd_len_beats - 1),
                         self.rd_finish.eq(0),
+                        *rd_config,
                     ]
                     m.next = "RD_BURST_STARTED"
 
@@ -251,18 +354,19 @@ class AxiDma(Elaboratable):
                     m.d.comb += disconnect_source()
                     with m.If(self.axi_stream_to_full.rd_valid & self.axi_stream_to_full.rd_ready):
                         m.d.sync += [
-                            rd_offset.eq(rd_offset + addr_jump),
+                            rd_addr_r.eq(rd_addr_r + burst_bytes(self.axi_stream_to_full.rd_burst)),
                         ]
 
                 with m.Else():
                     m.d.comb += set_dma_rd_busy()
                     m.d.comb += connect_mem_rd_to_source()
 
-                    with m.If(self.source.accepted() & (rd_beats_remaining > 0)):
+                    with m.If(rd_stream.accepted() & (rd_beats_remaining > 0)):
                         m.d.sync += rd_beats_remaining.eq(rd_beats_remaining - 1)
 
-                    with m.If(self.source.accepted() & self.source.tlast):
-                        m.d.sync += self.rd_finish.eq(1)
+                    with m.If(rd_stream.accepted() & rd_stream.tlast):
+                        if not self.unaligned:
+                            m.d.sync += self.rd_finish.eq(1)
                         with m.If(self.axi_stream_to_full.m_axis.tlast):
                             m.next = "RD_PREPARE"
                         with m.Else():
@@ -271,9 +375,106 @@ class AxiDma(Elaboratable):
 
             with m.State("RD_WAIT_LAST"):
                 m.d.comb += set_dma_rd_busy()
-                m.d.comb += self.source.connect_to_null_source()
+                m.d.comb += rd_stream.connect_to_null_source()
                 m.d.comb += self.axi_stream_to_full.m_axis.connect_to_null_sink()
                 with m.If(self.axi_stream_to_full.rd_idle):
                     m.next = "RD_PREPARE"
 
+        if self.unaligned:
+            # The read finishes when the realigned packet is sent
+            with m.If(self.source.accepted() & self.source.tlast):
+                m.d.sync += self.rd_finish.eq(1)
+
         return m
+
+    def elaborate_realigners(self, m, bytes_per_beat, beat_shift, wr_config, rd_config,
+                             rd_keep, rd_beats_remaining):
+        """Realign unaligned transfers around the burst logic.
+
+        Returns the write and read streams seen by the burst logic, the
+        read start (held while the previous packet is being realigned) and
+        the lengths of the transfers in memory beats. wr_config/rd_config
+        and rd_keep are filled with the statements to load on each accepted
+        config and the keep of the memory read beats.
+        """
+        sync = m.d.sync
+        comb = m.d.comb
+        m.submodules.wr_realigner = wr_realigner = self.wr_realigner
+        m.submodules.rd_realigner = rd_realigner = self.rd_realigner
+
+        def low_mask(n_bits):
+            return (Const(1, bytes_per_beat + 1) << n_bits) - 1
+
+        def beats(n_bytes):
+            return (n_bytes + bytes_per_beat - 1) >> beat_shift
+
+        # Write: the sink bytes are moved up to the lanes of the address
+        # and the transfer is cut at wr_len_bytes.
+        wr_byte_offset = self.wr_addr[:beat_shift]
+        wr_len_beats = Signal(32)
+        wr_rotate = Signal.like(wr_realigner.rotate)
+        wr_in_active = Signal()
+        wr_in_beats_remaining = Signal(32)
+        wr_in_last_keep = Signal(bytes_per_beat)
+        wr_in_len_rem = self.wr_len_bytes[:beat_shift]
+        wr_in_last = self.sink.tlast | (wr_in_beats_remaining == 0)
+        comb += [
+            wr_len_beats.eq(beats(wr_byte_offset + self.wr_len_bytes)),
+            wr_realigner.rotate.eq(wr_rotate),
+            wr_realigner.sink.tvalid.eq(self.sink.tvalid & wr_in_active),
+            self.sink.tready.eq(wr_realigner.sink.tready & wr_in_active),
+            wr_realigner.sink.tdata.eq(self.sink.tdata),
+            wr_realigner.sink.tkeep.eq(
+                self.sink.tkeep & Mux(wr_in_beats_remaining == 0, wr_in_last_keep, -1)
+            ),
+            wr_realigner.sink.tlast.eq(wr_in_last),
+        ]
+        if self.user_w:
+            comb += wr_realigner.sink.tuser.eq(self.sink.tuser)
+        with m.If(self.sink.accepted()):
+            sync += wr_in_beats_remaining.eq(wr_in_beats_remaining - 1)
+            with m.If(wr_in_last):
+                sync += wr_in_active.eq(0)
+        wr_config += [
+            wr_rotate.eq(wr_byte_offset),
+            wr_in_active.eq(1),
+            wr_in_beats_remaining.eq(beats(self.wr_len_bytes) - 1),
+            wr_in_last_keep.eq(Mux(wr_in_len_rem == 0, -1, low_mask(wr_in_len_rem))),
+        ]
+
+        # Read: whole memory beats are read, the bytes out of the transfer
+        # are masked with tkeep and the rest are moved down to lane 0.
+        rd_byte_offset = self.rd_addr[:beat_shift]
+        rd_len_beats = Signal(32)
+        rd_end = Signal(beat_shift)
+        rd_rotate = Signal.like(rd_realigner.rotate)
+        rd_first = Signal()
+        rd_head_keep = Signal(bytes_per_beat)
+        rd_tail_keep = Signal(bytes_per_beat)
+        rd_stream = AXI4StreamSignature.create_master(
+            data_w=self.data_w, user_w=self.user_w, path=['rd_stream'],
+        )
+        wiring.connect(m, rd_stream, rd_realigner.sink)
+        wiring.connect(m, rd_realigner.source, self.source.as_slave())
+        comb += [
+            rd_len_beats.eq(beats(rd_byte_offset + self.rd_len_bytes)),
+            rd_end.eq(rd_byte_offset + self.rd_len_bytes),
+            rd_realigner.rotate.eq(rd_rotate),
+        ]
+        with m.If(rd_stream.accepted()):
+            sync += rd_first.eq(0)
+        rd_config += [
+            rd_rotate.eq(-rd_byte_offset),
+            rd_first.eq(1),
+            rd_head_keep.eq(~low_mask(rd_byte_offset)),
+            rd_tail_keep.eq(Mux(rd_end == 0, -1, low_mask(rd_end))),
+        ]
+        rd_keep += [
+            rd_stream.tkeep.eq(
+                Mux(rd_first, rd_head_keep, -1)
+                & Mux(rd_beats_remaining == 0, rd_tail_keep, -1)
+            ),
+        ]
+        rd_start = self.rd_start & rd_realigner.idle
+
+        return wr_realigner.source, rd_stream, rd_start, wr_len_beats, rd_len_beats
@@ -3,6 +3,7 @@ from amaranth.lib import wiring
 
 from hdl_utils.amaranth_utils.interfaces.axi4_stream import AXI4StreamSignature
 from hdl_utils.amaranth_utils.axi_dma import AxiDma
+from hdl_utils.amaranth_utils.axi_stream_fifo import AXIStreamFIFO
 
 
 def at_least_one(signal: Signal):
@@ -10,6 +11,18 @@ def at_least_one(signal: Signal):
 
 
 class AXIDmaTripleBuffer(Elaboratable):
+    """Triple buffer in memory: frames are written from the sink and the
+    last complete frame is read to the source.
+
+    With rd_prefetch_depth > 0 (at least 2), the frames read from memory
+    go through a FIFO of that depth. The read of the next frame is started
+    as soon as the last beat of the current one is in the FIFO, and while
+    rd_enable is asserted that beat is held in the FIFO until the first
+    beat of the next frame is behind it, so the source has no gap between
+    frames (the memory latency of the restart is seen before the last beat
+    instead). Prefetched data is still sent after rd_enable is deasserted.
+    """
+
     def __init__(
         self,
         addr_w: int = 40,
@@ -18,6 +31,7 @@ class AXIDmaTripleBuffer(Elaboratable):
         burst_len: int = 256,
         ignore_rd_size_signal: bool = False,
         init_rd_size: int = None,
+        rd_prefetch_depth: int = 0,
     ):
         self.addr_w = addr_w
         self.data_w = data_w
@@ -25,6 +39,10 @@ class AXIDmaTripleBuffer(Elaboratable):
         self.burst_len = burst_len
         self.ignore_rd_size_signal = ignore_rd_size_signal
         self.init_rd_size = init_rd_size or burst_len
+        self.rd_prefetch_depth = rd_prefetch_depth
+        assert rd_prefetch_depth == 0 or rd_prefetch_depth >= 2, (
+            'The prefetch FIFO holds a last beat until the next frame is behind it'
+        )
 
         # Modules
         self.axi_dma = AxiDma(
@@ -33,6 +51,14 @@ class AXIDmaTripleBuffer(Elaboratable):
             user_w=user_w,
             burst_len=burst_len,
         )
+        self.rd_fifo = None
+        if rd_prefetch_depth:
+            self.rd_fifo = AXIStreamFIFO(
+                data_w=data_w,
+                user_w=user_w,
+                depth=rd_prefetch_depth,
+                no_tkeep=True,
+            )
 
         # Sink
         self.sink = AXI4StreamSignature.create_slave(
@@ -52,6 +78,8 @@ class AXIDmaTripleBuffer(Elaboratable):
         self.base_addr_2 = Signal.like(self.m_axi.ARADDR)
         self.wr_qos = Signal(4)
         self.rd_qos = Signal(4)
+        self.wr_burst_len = Signal.like(self.axi_dma.wr_burst_len)
+        self.rd_burst_len = Signal.like(self.axi_dma.rd_burst_len)
         self.wr_len_beats = Signal(32)
         self.rd_len_beats = Signal(32)
         self.wr_dont_change_buffer_if_incomplete = Signal()
@@ -71,6 +99,8 @@ class AXIDmaTripleBuffer(Elaboratable):
                 self.base_addr_2,
                 self.wr_qos,
                 self.rd_qos,
+                self.wr_burst_len,
+                self.rd_burst_len,
                 self.wr_len_beats,
                 self.rd_len_beats,
                 self.wr_dont_change_buffer_if_incomplete,
@@ -81,6 +111,26 @@ class AXIDmaTripleBuffer(Elaboratable):
         m = Module()
         m.submodules.axi_dma = self.axi_dma
 
+        # Destination of the frames read by the dma
+        if self.rd_fifo is not None:
+            m.submodules.rd_fifo = self.rd_fifo
+            # The last beat of a frame waits for the first one of the next
+            hold_last = Signal()
+            m.d.comb += [
+                hold_last.eq(
+                    self.rd_fifo.source.tlast & (self.rd_fifo.r_level < 2) & self.rd_enable
+                ),
+                self.source.tvalid.eq(self.rd_fifo.source.tvalid & ~hold_last),
+                self.source.tdata.eq(self.rd_fifo.source.tdata),
+                self.source.tlast.eq(self.rd_fifo.source.tlast),
+                self.rd_fifo.source.tready.eq(self.source.tready & ~hold_last),
+            ]
+            if self.user_w:
+                m.d.comb += self.source.tuser.eq(self.rd_fifo.source.tuser)
+            rd_output = self.rd_fifo.sink
+        else:
+            rd_output = self.source.as_slave()
+
         buffer_address_array = Array([
             self.base_addr_0,
             self.base_addr_1,
@@ -119,6 +169,8 @@ class AXIDmaTripleBuffer(Elaboratable):
             self.axi_dma.rd_addr.eq(buffer_address_array[rd_buff_id]),
             self.axi_dma.wr_qos.eq(self.wr_qos),
             self.axi_dma.rd_qos.eq(self.rd_qos),
+            self.axi_dma.wr_burst_len.eq(self.wr_burst_len),
+            self.axi_dma.rd_burst_len.eq(self.rd_burst_len),
             self.axi_dma.wr_len_beats.eq(self.wr_len_beats),
             self.axi_dma.rd_len_beats.eq(rd_len_beats_to_dma),
         ]
@@ -252,7 +304,7 @@ class AXIDmaTripleBuffer(Elaboratable):
 
         def disconnect_source() -> list:
             return [
-                *self.source.connect_to_null_source(),
+                *rd_output.connect_to_null_source(),
                 self.axi_dma.source.disconnect_from_sink(),
             ]
 
@@ -276,7 +328,7 @@ class AXIDmaTripleBuffer(Elaboratable):
 
             with m.State("RD_IN_PROGRESS"):
                 m.d.comb += set_dma_rd_busy()
-                wiring.connect(m, self.axi_dma.source, self.source.as_slave())
+                wiring.connect(m, self.axi_dma.source, rd_output)
                 m.d.comb += go_to_next_rd_buffer.eq(self.axi_dma.source.accepted() & self.axi_dma.source.tlast)
                 with m.If(self.axi_dma.source.accepted()):
                     with m.If(self.axi_dma.source.tlast):
@@ -1,9 +1,92 @@
 from amaranth import Elaboratable, Module, Signal
+from amaranth.lib.memory import Memory
+import math
+
 from hdl_utils.amaranth_utils.interfaces.axi_lite import AXI4LiteSignature
 
 
+def or_tree(values: list):
+    """Balanced OR reduction of a list of values."""
+    if len(values) == 0:
+        return 0
+    while len(values) > 1:
+        values = [
+            values[i] | values[i + 1] if i + 1 < len(values) else values[i]
+            for i in range(0, len(values), 2)
+        ]
+    return values[0]
+
+
+class RegisterArrayPorts:
+    """Hardware side of a memory-backed register array.
+
+    'rw' arrays are written by the bus and read by the hardware through a
+    synchronous read port (data is valid one cycle after addr).
+    'ro' arrays are written by the hardware and read by the bus.
+    """
+
+    def __init__(self, name: str, dir: str, depth: int, width: int):
+        assert dir in ('rw', 'ro'), f'Invalid direction for {name}: {dir}'
+        self.name = name
+        self.dir = dir
+        self.depth = depth
+        self.width = width
+        self.addr = Signal(range(depth), name=f'{name}_addr')
+        self.data = Signal(width, name=f'{name}_data')
+        self.we = Signal(name=f'{name}_we') if dir == 'ro' else None
+
+    def get_ports(self):
+        ports = [self.addr, self.data]
+        if self.we is not None:
+            ports += [self.we]
+        return ports
+
+
 class AxiLiteDevice(Elaboratable):
-    def __init__(self, addr_w, data_w, registers_map, domain='sync'):
+    """AXI4-Lite slave with a register map.
+
+    Addresses are decoded on the word-aligned bits only (the byte offset
+    within the data width is ignored). Writes honour WSTRB: only the byte
+    lanes with the strobe asserted are updated.
+
+    parameters:
+        registers_map: list
+            List of (name, dir, addr, default, fields) entries, as generated
+            by RegisterMapFactory.generate_register_map().
+
+        pipelined: bool
+            If False (default), one read and one write are handled at a time:
+            AR is not accepted again until R is accepted, and AW/W are not
+            accepted again until B is accepted.
+            If True, AR is accepted back to back while R is being consumed
+            (one read per cycle, single-cycle latency), and AW/W are
+            buffered independently so the next write is accepted while the
+            previous B is still pending.
+
+        registered_decode: bool
+            Register the address decode result before using it. Write
+            addresses are decoded as they are accepted, so writes don't pay
+            any extra latency. Reads get one extra cycle of latency.
+
+        register_arrays: list
+            List of (name, dir, addr, depth, width) entries, as generated by
+            RegisterMapFactory.generate_register_arrays(). Each array is
+            mapped to a memory (block RAM) occupying an address window
+            aligned to its size, and its hardware side is exposed in
+            self.arrays[name]. Reads get one extra cycle of latency if there
+            is any register array.
+
+        windows: list
+            List of (name, addr, size) entries, as generated by
+            RegisterMapComposer.generate_windows(). Addresses are decoded
+            hierarchically: one comparator per window on the upper bits,
+            shared by all the registers in the window, which only compare
+            the offset bits within it.
+    """
+
+    def __init__(self, addr_w, data_w, registers_map, domain='sync',
+                 pipelined=False, registered_decode=False,
+                 register_arrays=None, windows=None):
         # Preprocess registers_map for compatibility:
         _registers_map = []
         for r in registers_map:
@@ -14,7 +97,12 @@ class AxiLiteDevice(Elaboratable):
         self.addr_w = addr_w
         self.data_w = data_w
         self.registers_map = registers_map
+        self.register_arrays = list(register_arrays or [])
+        self.windows = list(windows or [])
         self.domain = domain
+        self.pipelined = pipelined
+        self.registered_decode = registered_decode
+        self.addr_lsb = int(math.log2(data_w // 8))
         self.axi_lite = AXI4LiteSignature.create_slave(
             data_w=data_w,
             addr_w=addr_w,
@@ -25,23 +113,87 @@ class AxiLiteDevice(Elaboratable):
             r_addr: Signal(data_w, name=f'reg_0x{r_addr:08x}', init=r_default)
             for _, r_dir, r_addr, r_default, r_fields in registers_map
         }
+        for r_addr in self.registers:
+            assert r_addr % (data_w // 8) == 0, f'Unaligned address: {hex(r_addr)}'
         # Register fields
         self.reg_fields = {}
         for r_name, r_dir, r_addr, r_default, r_fields in registers_map:
             for f_name, f_size, f_offset in r_fields:
                 self.reg_fields[f_name] = Signal(f_size, name=f_name)
 
+        # Register arrays
+        self.arrays = {}
+        self.memories = {}
+        for a_name, a_dir, a_addr, a_depth, a_width in self.register_arrays:
+            assert a_width <= data_w, f'{a_name} is wider than the bus'
+            window = self.array_window_size(a_depth)
+            assert a_addr % window == 0, (
+                f'{a_name} base address {hex(a_addr)} not aligned to {hex(window)}'
+            )
+            self.arrays[a_name] = RegisterArrayPorts(
+                name=a_name, dir=a_dir, depth=a_depth, width=a_width)
+            self.memories[a_name] = Memory(shape=a_width, depth=a_depth, init=[])
+
+        for w_name, w_addr, w_size in self.windows:
+            assert w_size & (w_size - 1) == 0 and w_addr % w_size == 0, (
+                f'Window {w_name} [{hex(w_addr)}, {hex(w_addr + w_size)}) not aligned'
+            )
+
         # Expose in case it's useful to detect register writes
         self.we = Signal()
         self.wr_addr = Signal(self.addr_w)
         self.wr_data = Signal(self.data_w)
+        self.wr_strb = Signal(self.data_w // 8)
+
+    @property
+    def rd_decode_stage(self) -> bool:
+        return self.registered_decode or len(self.register_arrays) > 0
+
+    def array_window_size(self, depth: int) -> int:
+        return (1 << math.ceil(math.log2(depth))) * (self.data_w // 8)
 
     def get_ports(self):
         ports = []
         ports += self.axi_lite.extract_signals()
         ports += list(self.reg_fields.values())
+        for array in self.arrays.values():
+            ports += array.get_ports()
         return ports
 
+    def decode(self, m, addr):
+        """One-hot decode of addr: one bit per register followed by one bit
+        per register array.
+        """
+        word = addr[self.addr_lsb:]
+        n_regs = len(self.registers)
+        hits = Signal(n_regs + len(self.register_arrays))
+        window_hits = []
+        for _, w_addr, w_size in self.windows:
+            w_bits = int(math.log2(w_size)) - self.addr_lsb
+            w_hit = word[w_bits:] == (w_addr >> (self.addr_lsb + w_bits))
+            window_hits.append((w_addr, w_size, w_bits, w_hit))
+
+        def match(addr: int, offset_w: int):
+            # Compare word[offset_w:] against addr, inside its window if any
+            for w_addr, w_size, w_bits, w_hit in window_hits:
+                if w_addr <= addr < w_addr + w_size:
+                    if offset_w >= w_bits:
+                        return w_hit
+                    local = (addr - w_addr) >> (self.addr_lsb + offset_w)
+                    return w_hit & (word[offset_w:w_bits] == local)
+            return word[offset_w:] == (addr >> (self.addr_lsb + offset_w))
+
+        for i, r_addr in enumerate(self.registers):
+            m.d.comb += hits[i].eq(match(r_addr, 0))
+        for i, (_, _, a_addr, a_depth, _) in enumerate(self.register_arrays):
+            offset_w = math.ceil(math.log2(a_depth))
+            m.d.comb += hits[n_regs + i].eq(match(a_addr, offset_w))
+        return hits
+
+    def array_offset(self, addr, depth: int):
+        offset_w = math.ceil(math.log2(depth))
+        return addr[self.addr_lsb:self.addr_lsb + offset_w]
+
     def elaborate(self, platform):
         m = Module()
         sync = m.d[self.domain]
@@ -59,37 +211,126 @@ class AxiLiteDevice(Elaboratable):
                         self.reg_fields[name]
                     )
 
-        we = self.we
-        wr_addr = self.wr_addr
-        wr_data = self.wr_data
-
         with m.If(self.axi_lite.aw_accepted()):
-            sync += wr_addr.eq(self.axi_lite.awaddr)
+            sync += self.wr_addr.eq(self.axi_lite.awaddr)
 
         with m.If(self.axi_lite.w_accepted()):
-            sync += wr_data.eq(self.axi_lite.wdata)
+            sync += [
+                self.wr_data.eq(self.axi_lite.wdata),
+                self.wr_strb.eq(self.axi_lite.wstrb),
+            ]
 
-        for _, r_dir, r_addr, r_default, r_fields in self.registers_map:
-            if r_dir == 'rw':
-                with m.If((wr_addr == r_addr) & (we == 1)):
-                    sync += self.registers[r_addr].eq(wr_data)
+        if self.registered_decode:
+            wr_hits = Signal(len(self.registers) + len(self.register_arrays))
+            with m.If(self.axi_lite.aw_accepted()):
+                sync += wr_hits.eq(self.decode(m, self.axi_lite.awaddr))
+        else:
+            wr_hits = self.decode(m, self.wr_addr)
 
-        for _, r_dir, r_addr, r_default, r_fields in self.registers_map:
-            with m.If(
-                self.axi_lite.ar_accepted() & (self.axi_lite.araddr == r_addr)
-            ):
-                sync += self.axi_lite.rdata.eq(self.registers[r_addr])
+        with m.If(self.we):
+            for i, (_, r_dir, r_addr, r_default, r_fields) in enumerate(self.registers_map):
+                if r_dir == 'rw':
+                    with m.If(wr_hits[i]):
+                        for b in range(self.data_w // 8):
+                            with m.If(self.wr_strb[b]):
+                                sync += self.registers[r_addr].word_select(b, 8).eq(
+                                    self.wr_data.word_select(b, 8)
+                                )
+
+        # Register arrays
+        self.rd_array_data = []
+        for i, (a_name, a_dir, a_addr, a_depth, a_width) in enumerate(self.register_arrays):
+            array = self.arrays[a_name]
+            m.submodules[f'array_{a_name}'] = memory = self.memories[a_name]
+            # Byte lanes map to write port granularity when the array width
+            # allows it. Otherwise, any strobe within the array width writes
+            # the whole entry.
+            n_lanes = math.ceil(a_width / 8)
+            if a_width % 8 == 0 and n_lanes > 1:
+                wr_port = memory.write_port(domain=self.domain, granularity=8)
+                wr_en = self.wr_strb[:n_lanes]
+            else:
+                wr_port = memory.write_port(domain=self.domain)
+                wr_en = self.wr_strb[:n_lanes].any()
+            bus_rd_port = memory.read_port(domain=self.domain)
+            if a_dir == 'rw':
+                hw_rd_port = memory.read_port(domain=self.domain)
+                comb += [
+                    wr_port.addr.eq(self.array_offset(self.wr_addr, a_depth)),
+                    wr_port.data.eq(self.wr_data),
+                    wr_port.en.eq(
+                        wr_en & (self.we & wr_hits[len(self.registers) + i]).replicate(len(wr_port.en))
+                    ),
+                    hw_rd_port.addr.eq(array.addr),
+                    array.data.eq(hw_rd_port.data),
+                ]
+            else:
+                comb += [
+                    wr_port.addr.eq(array.addr),
+                    wr_port.data.eq(array.data),
+                    wr_port.en.eq(array.we.replicate(len(wr_port.en))),
+                ]
+            comb += [
+                bus_rd_port.addr.eq(self.array_offset(self.axi_lite.araddr, a_depth)),
+                bus_rd_port.en.eq(self.axi_lite.ar_accepted()),
+            ]
+            self.rd_array_data.append(bus_rd_port.data)
 
         # Axi Lite Slave Interface
 
         comb += self.axi_lite.rresp.eq(0)
         comb += self.axi_lite.bresp.eq(0)
 
+        if self.pipelined:
+            self.elaborate_pipelined_rd(m)
+            self.elaborate_pipelined_wr(m)
+        else:
+            self.elaborate_rd(m)
+            self.elaborate_wr(m)
+
+        return m
+
+    def read_mux(self, m, hits):
+        """Parallel (AND-OR) selection of the register or array hit.
+
+        Addresses are unique, so at most one hit is asserted and the
+        selection doesn't need a priority chain.
+        """
+        rd_data = Signal(self.data_w)
+        values = [*self.registers.values(), *self.rd_array_data]
+        selected = [
+            value & hits[i].replicate(self.data_w)
+            for i, value in enumerate(values)
+        ]
+        m.d.comb += rd_data.eq(or_tree(selected))
+        return rd_data
+
+    def elaborate_rd(self, m):
+        sync = m.d[self.domain]
+        comb = m.d.comb
+
+        rd_hits = self.decode(m, self.axi_lite.araddr)
+        if self.rd_decode_stage:
+            rd_hits_r = Signal.like(rd_hits)
+            with m.If(self.axi_lite.ar_accepted()):
+                sync += rd_hits_r.eq(rd_hits)
+            rd_data = self.read_mux(m, rd_hits_r)
+        else:
+            rd_data = self.read_mux(m, rd_hits)
+            with m.If(self.axi_lite.ar_accepted()):
+                sync += self.axi_lite.rdata.eq(rd_data)
+
         with m.FSM(domain=self.domain) as fsm_rd:
             with m.State("IDLE"):
                 comb += self.axi_lite.arready.eq(1)
                 comb += self.axi_lite.rvalid.eq(0)
                 with m.If(self.axi_lite.ar_accepted()):
+                    m.next = "DECODE" if self.rd_decode_stage else "READ"
+            if self.rd_decode_stage:
+                with m.State("DECODE"):
+                    comb += self.axi_lite.arready.eq(0)
+                    comb += self.axi_lite.rvalid.eq(0)
+                    sync += self.axi_lite.rdata.eq(rd_data)
                     m.next = "READ"
             with m.State("READ"):
                 comb += self.axi_lite.arready.eq(0)
@@ -98,6 +339,12 @@ class AxiLiteDevice(Elaboratable):
                     sync += self.axi_lite.rdata.eq(0)
                     m.next = "IDLE"
 
+    def elaborate_wr(self, m):
+        sync = m.d[self.domain]
+        comb = m.d.comb
+
+        we = self.we
+
         with m.FSM(domain=self.domain) as fsm_wr:
             with m.State("IDLE"):
                 comb += [self.axi_lite.awready.eq(1),
@@ -132,4 +379,79 @@ class AxiLiteDevice(Elaboratable):
                 with m.If(self.axi_lite.b_accepted()):
                     m.next = "IDLE"
 
-        return m
+    def elaborate_pipelined_rd(self, m):
+        sync = m.d[self.domain]
+        comb = m.d.comb
+
+        rvalid = Signal()
+        r_load = Signal()
+        rd_hits = self.decode(m, self.axi_lite.araddr)
+
+        # R is an output register: it's loaded whenever it's empty or being
+        # emptied in this same cycle.
+        comb += self.axi_lite.rvalid.eq(rvalid)
+        if self.rd_decode_stage:
+            # Decode stage between AR and R, with the same handshake.
+            s1_valid = Signal()
+            rd_hits_r = Signal.like(rd_hits)
+            rd_data = self.read_mux(m, rd_hits_r)
+            comb += [
+                r_load.eq(s1_valid & (~rvalid | self.axi_lite.rready)),
+                self.axi_lite.arready.eq(~s1_valid | r_load),
+            ]
+            with m.If(self.axi_lite.ar_accepted()):
+                sync += [
+                    s1_valid.eq(1),
+                    rd_hits_r.eq(rd_hits),
+                ]
+            with m.Elif(r_load):
+                sync += s1_valid.eq(0)
+        else:
+            rd_data = self.read_mux(m, rd_hits)
+            comb += [
+                self.axi_lite.arready.eq(~rvalid | self.axi_lite.rready),
+                r_load.eq(self.axi_lite.ar_accepted()),
+            ]
+
+        with m.If(r_load):
+            sync += [
+                rvalid.eq(1),
+                self.axi_lite.rdata.eq(rd_data),
+            ]
+        with m.Elif(self.axi_lite.r_accepted()):
+            sync += [
+                rvalid.eq(0),
+                self.axi_lite.rdata.eq(0),
+            ]
+
+    def elaborate_pipelined_wr(self, m):
+        sync = m.d[self.domain]
+        comb = m.d.comb
+
+        aw_full = Signal()
+        w_full = Signal()
+        bvalid = Signal()
+
+        # AW and W are buffered independently. The write is performed when
+        # both are available and the B register is free (or being emptied).
+        comb += [
+            self.we.eq(aw_full & w_full & (~bvalid | self.axi_lite.bready)),
+            self.axi_lite.awready.eq(~aw_full | self.we),
+            self.axi_lite.wready.eq(~w_full | self.we),
+            self.axi_lite.bvalid.eq(bvalid),
+        ]
+
+        with m.If(self.axi_lite.aw_accepted()):
+            sync += aw_full.eq(1)
+        with m.Elif(self.we):
+            sync += aw_full.eq(0)
+
+        with m.If(self.axi_lite.w_accepted()):
+            sync += w_full.eq(1)
+        with m.Elif(self.we):
+            sync += w_full.eq(0)
+
+        with m.If(self.we):
+            sync += bvalid.eq(1)
+        with m.Elif(self.axi_lite.b_accepted()):
+            sync += bvalid.eq(0)
@@ -0,0 +1,307 @@
+from amaranth import Cat, Elaboratable, Module, Signal
+import math
+
+from hdl_utils.amaranth_utils.axi_lite_device import or_tree
+from hdl_utils.amaranth_utils.interfaces.axi_lite import AXI4LiteSignature
+from hdl_utils.amaranth_utils.skid_buffer import SkidBuffer, StreamOutputReg
+
+
+RESP_OKAY = 0b00
+RESP_DECERR = 0b11
+
+CHANNELS = ('aw', 'w', 'b', 'ar', 'r')
+
+
+class AxiLiteInterconnect(Elaboratable):
+    """AXI4-Lite interconnect: one master fanned out to several slaves.
+
+    The slave is selected by decoding the address against an address map.
+    Addresses are forwarded relative to the slave window, so a slave sees
+    its registers from address 0 (as generated by RegisterMapFactory).
+    Accesses outside every window are answered by the interconnect with
+    DECERR (reads return 0).
+
+    Read and write channels are independent: a read and a write can be in
+    flight at the same time, to the same or to different slaves. Each
+    direction handles one transaction at a time, so responses can't be
+    reordered.
+
+    parameters:
+        address_map: list
+            List of (name, addr, size) entries, as generated by
+            RegisterMapComposer.generate_windows(). Sizes must be powers of
+            two and addresses aligned to them. One master port
+            m_axil_<name> is created per entry, in self.masters[name].
+
+        registered_channels: tuple
+            Channels of the slave port ('aw', 'w', 'b', 'ar', 'r') that go
+            through a fully registered stage (skid buffer plus output
+            register) for timing closure, at the cost of one cycle of
+            latency each.
+    """
+
+    def __init__(self, addr_w, data_w, address_map, domain='sync',
+                 registered_channels=()):
+        for channel in registered_channels:
+            assert channel in CHANNELS, f'Invalid channel: {channel}'
+        self.addr_w = addr_w
+        self.data_w = data_w
+        self.address_map = list(address_map)
+        self.domain = domain
+        self.registered_channels = tuple(registered_channels)
+        windows = sorted((addr, size) for _, addr, size in self.address_map)
+        for name, addr, size in self.address_map:
+            assert size & (size - 1) == 0 and addr % size == 0, (
+                f'Window {name} [{hex(addr)}, {hex(addr + size)}) not aligned'
+            )
+            assert addr + size <= 2**addr_w, f'Window {name} out of range'
+        for (addr_a, size_a), (addr_b, _) in zip(windows, windows[1:]):
+            assert addr_a + size_a <= addr_b, f'Overlapping windows at {hex(addr_b)}'
+        self.axi_lite = AXI4LiteSignature.create_slave(
+            data_w=data_w,
+            addr_w=addr_w,
+            path=['s_axil'],
+        )
+        self.masters = {
+            name: AXI4LiteSignature.create_master(
+                data_w=data_w,
+                addr_w=self.window_addr_w(size),
+                path=[f'm_axil_{name}'],
+            )
+            for name, addr, size in self.address_map
+        }
+
+    def window_addr_w(self, size: int) -> int:
+        return max(int(math.log2(size)), 1)
+
+    def get_ports(self):
+        ports = []
+        ports += self.axi_lite.extract_signals()
+        for master in self.masters.values():
+            ports += master.extract_signals()
+        return ports
+
+    def decode(self, m, addr):
+        """One-hot decode of addr: one bit per window."""
+        hits = Signal(len(self.address_map))
+        for i, (_, w_addr, w_size) in enumerate(self.address_map):
+            w_bits = int(math.log2(w_size))
+            m.d.comb += hits[i].eq(addr[w_bits:] == (w_addr >> w_bits))
+        return hits
+
+    def channel(self, m, name, src_valid, src_ready, src_data):
+        """Return (valid, ready, data) of a channel after its optional
+        registered stage. src_* is the upstream side of the channel.
+        """
+        if name not in self.registered_channels:
+            return src_valid, src_ready, src_data
+        m.submodules[f'{name}_skid_buffer'] = skid = SkidBuffer(width=len(src_data))
+        m.submodules[f'{name}_output_reg'] = out = StreamOutputReg(width=len(src_data))
+        valid = Signal(name=f'{name}_valid')
+        ready = Signal(name=f'{name}_ready')
+        data = Signal(len(src_data), name=f'{name}_data')
+        m.d.comb += [
+            skid.sink_valid.eq(src_valid),
+            src_ready.eq(skid.sink_ready),
+            skid.sink_data.eq(src_data),
+            out.sink_valid.eq(skid.source_valid),
+            skid.source_ready.eq(out.sink_ready),
+            out.sink_data.eq(skid.source_data),
+            valid.eq(out.source_valid),
+            out.source_ready.eq(ready),
+            data.eq(out.source_data),
+        ]
+        return valid, ready, data
+
+    def elaborate(self, platform):
+        m = Module()
+        s = self.axi_lite
+
+        # Internal view of the slave port, after the optional stages. The
+        # response channels flow the other way, so their upstream side is
+        # the internal one.
+        aw_valid, aw_ready, aw_addr = self.channel(m, 'aw', s.awvalid, s.awready, s.awaddr)
+        w_valid, w_ready, w_data = self.channel(m, 'w', s.wvalid, s.wready, Cat(s.wdata, s.wstrb))
+        ar_valid, ar_ready, ar_addr = self.channel(m, 'ar', s.arvalid, s.arready, s.araddr)
+        b_valid, b_ready, b_resp = Signal(), Signal(), Signal(2)
+        r_valid, r_ready, r_data = Signal(), Signal(), Signal(self.data_w + 2)
+        s_b_valid, s_b_ready, s_b_resp = self.channel(m, 'b', b_valid, b_ready, b_resp)
+        s_r_valid, s_r_ready, s_r_data = self.channel(m, 'r', r_valid, r_ready, r_data)
+        m.d.comb += [
+            s.bvalid.eq(s_b_valid),
+            s_b_ready.eq(s.bready),
+            s.bresp.eq(s_b_resp),
+            s.rvalid.eq(s_r_valid),
+            s_r_ready.eq(s.rready),
+            Cat(s.rdata, s.rresp).eq(s_r_data),
+        ]
+
+        self.elaborate_wr(m, aw_valid, aw_ready, aw_addr, w_valid, w_ready, w_data,
+                          b_valid, b_ready, b_resp)
+        self.elaborate_rd(m, ar_valid, ar_ready, ar_addr, r_valid, r_ready, r_data)
+        return m
+
+    def elaborate_wr(self, m, aw_valid, aw_ready, aw_addr, w_valid, w_ready, w_data,
+                     b_valid, b_ready, b_resp):
+        sync = m.d[self.domain]
+        comb = m.d.comb
+        masters = list(self.masters.values())
+
+        wr_busy = Signal()
+        wr_sel = Signal(len(masters))
+        wr_addr = Signal(self.addr_w)
+        aw_pending = Signal()
+        w_pending = Signal()
+        wr_miss = ~wr_sel.any()
+        aw_hits = self.decode(m, aw_addr)
+
+        comb += aw_ready.eq(~wr_busy)
+        with m.If(aw_valid & aw_ready):
+            sync += [
+                wr_busy.eq(1),
+                wr_sel.eq(aw_hits),
+                wr_addr.eq(aw_addr),
+                aw_pending.eq(1),
+                w_pending.eq(1),
+            ]
+
+        w_phase = wr_busy & w_pending
+        b_phase = wr_busy & ~aw_pending & ~w_pending
+        for i, master in enumerate(masters):
+            comb += [
+                master.awaddr.eq(wr_addr[:len(master.awaddr)]),
+                master.awvalid.eq(aw_pending & wr_sel[i]),
+                Cat(master.wdata, master.wstrb).eq(w_data),
+                master.wvalid.eq(w_valid & w_phase & wr_sel[i]),
+                master.bready.eq(b_ready & b_phase & wr_sel[i]),
+            ]
+        aw_done = or_tree([master.awready & wr_sel[i] for i, master in enumerate(masters)]) | wr_miss
+        with m.If(aw_pending & aw_done):
+            sync += aw_pending.eq(0)
+        comb += w_ready.eq(w_phase & (
+            or_tree([master.wready & wr_sel[i] for i, master in enumerate(masters)]) | wr_miss
+        ))
+        with m.If(w_valid & w_ready):
+            sync += w_pending.eq(0)
+
+        comb += [
+            b_valid.eq(b_phase & (
+                or_tree([master.bvalid & wr_sel[i] for i, master in enumerate(masters)]) | wr_miss
+            )),
+            b_resp.eq(
+                or_tree([master.bresp & wr_sel[i].replicate(2) for i, master in enumerate(masters)])
+                | (RESP_DECERR * wr_miss)
+            ),
+        ]
+        with m.If(b_valid & b_ready):
+            sync += wr_busy.eq(0)
+
+    def elaborate_rd(self, m, ar_valid, ar_ready, ar_addr, r_valid, r_ready, r_data):
+        sync = m.d[self.domain]
+        comb = m.d.comb
+        masters = list(self.masters.values())
+
+        rd_busy = Signal()
+        rd_sel = Signal(len(masters))
+        rd_addr = Signal(self.addr_w)
+        ar_pending = Signal()
+        rd_miss = ~rd_sel.any()
+        ar_hits = self.decode(m, ar_addr)
+
+        comb += ar_ready.eq(~rd_busy)
+        with m.If(ar_valid & ar_ready):
+            sync += [
+                rd_busy.eq(1),
+                rd_sel.eq(ar_hits),
+                rd_addr.eq(ar_addr),
+                ar_pending.eq(1),
+            ]
+
+        r_phase = rd_busy & ~ar_pending
+        for i, master in enumerate(masters):
+            comb += [
+                master.araddr.eq(rd_addr[:len(master.araddr)]),
+                master.arvalid.eq(ar_pending & rd_sel[i]),
+                master.rready.eq(r_ready & r_phase & rd_sel[i]),
+            ]
+        ar_done = or_tree([master.arready & rd_sel[i] for i, master in enumerate(masters)]) | rd_miss
+        with m.If(ar_pending & ar_done):
+            sync += ar_pending.eq(0)
+
+        width = self.data_w + 2
+        comb += [
+            r_valid.eq(r_phase & (
+                or_tree([master.rvalid & rd_sel[i] for i, master in enumerate(masters)]) | rd_miss
+            )),
+            r_data.eq(
+                or_tree([
+                    Cat(master.rdata, master.rresp) & rd_sel[i].replicate(width)
+                    for i, master in enumerate(masters)
+                ])
+                | ((RESP_DECERR * rd_miss) << self.data_w)
+            ),
+        ]
+        with m.If(r_valid & r_ready):
+            sync += rd_busy.eq(0)
+
+
+def add_arguments(parser):
+    parser.add_argument('-aw', '--addr-width', type=int, required=True,
+                        help='Address width in bits')
+    parser.add_argument('-dw', '--data-width', type=int, required=True,
+                        help='Data width in bits')
+    parser.add_argument('-w', '--window', type=str, action='append', required=True,
+                        help='Slave window as name:addr:size (e.g. uart:0x1000:0x100). '
+                             'Can be used several times')
+    parser.add_argument('-r', '--registered-channels', type=str, default='',
+                        help=f'Comma separated channels to register ({",".join(CHANNELS)})')
+    parser.add_argument('-rstn', '--active-low-reset', action='store_true',
+                        help='Use active low reset (default is active high)')
+    parser.add_argument('-n', '--name', type=str,
+                        default=None, help='Core name')
+    parser.add_argument('--prefix', type=str,
+                        default='', help='Module names prefix')
+
+
+def parse_args(sys_args=None):
+    import argparse
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    return parser.parse_args(sys_args)
+
+
+def create_core(args) -> tuple[Elaboratable, str]:
+    address_map = []
+    for window in args.window:
+        w_name, w_addr, w_size = window.split(':')
+        address_map.append((w_name, int(w_addr, 0), int(w_size, 0)))
+    registered_channels = [c for c in args.registered_channels.split(',') if c]
+    name = args.name or f'axi_lite_interconnect_x{len(address_map)}'
+    core = AxiLiteInterconnect(
+        addr_w=args.addr_width,
+        data_w=args.data_width,
+        address_map=address_map,
+        registered_channels=registered_channels,
+    )
+    if args.active_low_reset:
+        from hdl_utils.amaranth_utils.rstn_wrapper import RstnWrapper
+        core = RstnWrapper(core=core, domain="sync")
+    return core, name
+
+
+def main(sys_args=None):
+    from hdl_utils.amaranth_utils.generate_verilog import generate_verilog
+    args = parse_args(sys_args)
+    core, name = create_core(args)
+    ports = core.get_ports()
+    output = generate_verilog(
+        core=core,
+        name=name,
+        ports=ports,
+        prefix=args.prefix
+    )
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+from amaranth import Elaboratable, Module, Signal
+
+from hdl_utils.amaranth_utils.reg_map import Field, Register
+
+
+# Counter name -> description
+COUNTERS = {
+    'wr_bursts': 'Write bursts issued (AW handshakes)',
+    'rd_bursts': 'Read bursts issued (AR handshakes)',
+    'wr_beats': 'Write beats transferred (W handshakes)',
+    'rd_beats': 'Read beats transferred (R handshakes)',
+    'aw_wait': 'Cycles with AWVALID waiting for AWREADY',
+    'ar_wait': 'Cycles with ARVALID waiting for ARREADY',
+    'w_stall': 'Cycles with WVALID waiting for WREADY',
+    'r_stall': 'Cycles with a read burst in flight and no RVALID',
+    'b_wait': 'Cycles with a write burst sent and no BVALID',
+    'sink_backpressure': 'Cycles with sink tvalid and no tready',
+    'source_backpressure': 'Cycles with source tvalid and no tready',
+}
+
+
+class AxiPerfCounters(Elaboratable):
+    """Performance counters of an AXI4 master and its streams.
+
+    The counters only monitor the signals of m_axi (and of the optional
+    sink/source streams), they don't drive anything. Counters saturate at
+    all ones and are held at zero while clear is asserted.
+
+    Use registers() to map them with RegisterMapFactory (one read-only
+    register per counter plus a control register with the clear bit) and
+    connect() to wire them to the fields of the resulting AxiLiteDevice.
+    """
+
+    def __init__(
+        self,
+        m_axi,
+        sink=None,
+        source=None,
+        width: int = 32,
+        max_outstanding: int = 256,
+        domain: str = 'sync',
+    ):
+        self.m_axi = m_axi
+        self.sink = sink
+        self.source = source
+        self.width = width
+        self.max_outstanding = max_outstanding
+        self.domain = domain
+        self.names = [
+            name for name in COUNTERS
+            if not (name == 'sink_backpressure' and sink is None)
+            and not (name == 'source_backpressure' and source is None)
+        ]
+        self.counters = {
+            name: Signal(width, name=f'perf_{name}')
+            for name in self.names
+        }
+        self.clear = Signal(name='perf_clear')  # In
+
+    def get_ports(self):
+        return [self.clear, *self.counters.values()]
+
+    def registers(self, prefix: str = '') -> list[Register]:
+        """Registers to allocate with RegisterMapFactory. Field names are
+        {prefix}perf_{counter} and {prefix}perf_clear.
+        """
+        assert self.width <= 32
+        regs = [
+            Register(
+                name=f'{prefix}perf_ctrl'.upper(),
+                dir='rw',
+                fields=[Field(name=f'{prefix}perf_clear', width=1, offset=0)],
+            ),
+        ]
+        regs += [
+            Register.from_single_field(
+                Field(name=f'{prefix}perf_{name}', width=self.width, offset=0),
+                dir='ro',
+            )
+            for name in self.names
+        ]
+        return regs
+
+    def connect(self, device, prefix: str = '') -> list:
+        """Statements connecting the counters to the fields of an
+        AxiLiteDevice built from registers(prefix).
+        """
+        return [
+            self.clear.eq(device.reg_fields[f'{prefix}perf_clear']),
+            *[
+                device.reg_fields[f'{prefix}perf_{name}'].eq(counter)
+                for name, counter in self.counters.items()
+            ],
+        ]
+
+    def elaborate(self, platform):
+        m = Module()
+        sync = m.d[self.domain]
+        m_axi = self.m_axi
+
+        # Bursts in flight: read bursts until RLAST, write bursts from
+        # WLAST until their response.
+        rd_outstanding = Signal(range(self.max_outstanding + 1))
+        b_outstanding = Signal(range(self.max_outstanding + 1))
+        rd_done = m_axi.r_accepted() & m_axi.RLAST
+        wr_done = m_axi.w_accepted() & m_axi.WLAST
+        sync += [
+            rd_outstanding.eq(rd_outstanding + m_axi.ar_accepted() - rd_done),
+            b_outstanding.eq(b_outstanding + wr_done - m_axi.b_accepted()),
+        ]
+
+        events = {
+            'wr_bursts': m_axi.aw_accepted(),
+            'rd_bursts': m_axi.ar_accepted(),
+            'wr_beats': m_axi.w_accepted(),
+            'rd_beats': m_axi.r_accepted(),
+            'aw_wait': m_axi.AWVALID & ~m_axi.AWREADY,
+            'ar_wait': m_axi.ARVALID & ~m_axi.ARREADY,
+            'w_stall': m_axi.WVALID & ~m_axi.WREADY,
+            'r_stall': (rd_outstanding != 0) & ~m_axi.RVALID,
+            'b_wait': (b_outstanding != 0) & ~m_axi.BVALID,
+        }
+        if self.sink is not None:
+            events['sink_backpressure'] = self.sink.tvalid & ~self.sink.tready
+        if self.source is not None:
+            events['source_backpressure'] = self.source.tvalid & ~self.source.tready
+
+        for name, counter in self.counters.items():
+            with m.If(self.clear):
+                sync += counter.eq(0)
+            with m.Elif(events[name] & ~counter.all()):
+                sync += counter.eq(counter + 1)
+
+        return m
@@ -1,12 +1,265 @@
-from amaranth import Elaboratable, Module, ResetSignal, Signal, Mux
-from amaranth.lib.fifo import SyncFIFOBuffered, AsyncFIFO
+from amaranth import DomainRenamer, Elaboratable, Module, ResetSignal, Signal, Mux
+from amaranth.lib.fifo import FIFOInterface, SyncFIFO, SyncFIFOBuffered, AsyncFIFO
+from amaranth.lib.memory import Memory
+from amaranth.lib.cdc import FFSynchronizer
 from amaranth.lib import wiring
+import math
 
+from hdl_utils.amaranth_utils.coding import GrayDecoder, GrayEncoder
 from hdl_utils.amaranth_utils.interfaces.axi4_stream import AXI4StreamSignature
 from hdl_utils.amaranth_utils.skid_buffer import AXISkidBuffer
 
 
+RAM_STYLES = ('auto', 'lutram', 'bram')
+# Largest FIFO mapped to distributed RAM with ram_style='auto': entries
+# and total bits (about the size of a block RAM)
+LUTRAM_MAX_DEPTH = 64
+LUTRAM_MAX_BITS = 16 * 1024
+
+
+def select_fifo_cls(depth: int, width: int, ram_style: str) -> type:
+    """Synchronous FIFO class for a RAM style.
+
+    SyncFIFO reads its memory asynchronously, which only maps to
+    distributed RAM (LUTs). SyncFIFOBuffered has a synchronous read port,
+    so it can be inferred as block RAM. 'auto' picks distributed RAM up to
+    LUTRAM_MAX_DEPTH entries of width bits and LUTRAM_MAX_BITS in total, so
+    a wide but shallow FIFO, which would take more LUTs than the bits of a
+    block RAM, goes to block RAM.
+    """
+    assert ram_style in RAM_STYLES, f'Unknown ram_style: {ram_style}'
+    if ram_style == 'auto':
+        lutram = depth <= LUTRAM_MAX_DEPTH and depth * width <= LUTRAM_MAX_BITS
+        ram_style = 'lutram' if lutram else 'bram'
+    return SyncFIFO if ram_style == 'lutram' else SyncFIFOBuffered
+
+
+class LanedSyncFIFO(Elaboratable, FIFOInterface):
+    """Synchronous FIFO with its storage split in lanes of up to lane_w bits.
+
+    Same interface and latency as SyncFIFOBuffered. Every lane is a
+    separate memory with a synchronous read port, but all of them share
+    the same pointers and flags, so a wide FIFO maps to several block RAMs
+    side by side with a single control path.
+    """
+
+    def __init__(self, *, width: int, depth: int, lane_w: int):
+        assert lane_w > 0
+        super().__init__(width=width, depth=depth)
+        self.lane_w = lane_w
+        self.n_lanes = max(1, math.ceil(width / lane_w))
+        self.level = Signal(range(depth + 1))
+
+    def elaborate(self, platform):
+        m = Module()
+        assert self.depth > 0
+
+        do_write = self.w_rdy & self.w_en
+        do_read = self.r_rdy & self.r_en
+
+        m.d.comb += [
+            self.w_level.eq(self.level),
+            self.r_level.eq(self.level),
+        ]
+
+        if self.depth == 1:
+            # A single register, as in SyncFIFOBuffered
+            m.d.comb += [
+                self.w_rdy.eq(self.level == 0),
+                self.r_rdy.eq(self.level == 1),
+            ]
+            with m.If(do_write):
+                m.d.sync += [
+                    self.r_data.eq(self.w_data),
+                    self.level.eq(1),
+                ]
+            with m.If(do_read):
+                m.d.sync += self.level.eq(0)
+            return m
+
+        # Memories followed by the output register (r_data, r_rdy)
+        inner_depth = self.depth - 1
+        inner_level = Signal(range(inner_depth + 1))
+        inner_r_rdy = Signal()
+        produce = Signal(range(inner_depth))
+        consume = Signal(range(inner_depth))
+
+        m.d.comb += [
+            self.w_rdy.eq(inner_level != inner_depth),
+            inner_r_rdy.eq(inner_level != 0),
+        ]
+        do_inner_read = inner_r_rdy & (~self.r_rdy | self.r_en)
+
+        for i in range(self.n_lanes):
+            lane = slice(i * self.lane_w, min((i + 1) * self.lane_w, self.width))
+            storage = Memory(shape=len(self.w_data[lane]), depth=inner_depth, init=[])
+            m.submodules[f'storage_{i:02d}'] = storage
+            w_port = storage.write_port()
+            r_port = storage.read_port(domain='sync')
+            m.d.comb += [
+                w_port.addr.eq(produce),
+                w_port.data.eq(self.w_data[lane]),
+                w_port.en.eq(do_write),
+                r_port.addr.eq(consume),
+                r_port.en.eq(do_inner_read),
+                self.r_data[lane].eq(r_port.data),
+            ]
+
+        with m.If(do_write):
+            m.d.sync += produce.eq(Mux(produce == inner_depth - 1, 0, produce + 1))
+        with m.If(do_inner_read):
+            m.d.sync += consume.eq(Mux(consume == inner_depth - 1, 0, consume + 1))
+
+        with m.If(do_write & ~do_inner_read):
+            m.d.sync += inner_level.eq(inner_level + 1)
+        with m.If(do_inner_read & ~do_write):
+            m.d.sync += inner_level.eq(inner_level - 1)
+
+        with m.If(do_inner_read):
+            m.d.sync += self.r_rdy.eq(1)
+        with m.Elif(self.r_en):
+            m.d.sync += self.r_rdy.eq(0)
+
+        m.d.comb += self.level.eq(inner_level + self.r_rdy)
+
+        return m
+
+
+class RewindSyncFIFO(Elaboratable, FIFOInterface):
+    """Synchronous FIFO whose writes are only readable once committed.
+
+    Written entries are pending until w_commit, which makes them (and the
+    entry written in the same cycle) readable. w_rewind discards the
+    pending entries (and the entry written in the same cycle) by moving the
+    write pointer back to the last commit. w_pending counts the pending
+    entries and w_pending_full is asserted when they fill the memory, so
+    nothing more can be written until they are committed or discarded.
+
+    Reads have the same latency as SyncFIFOBuffered. r_level counts the
+    readable entries and w_level all of them.
+    """
+
+    def __init__(self, *, width: int, depth: int):
+        assert depth >= 2
+        super().__init__(width=width, depth=depth)
+        self.w_commit = Signal()  # In
+        self.w_rewind = Signal()  # In
+        self.w_pending = Signal(range(depth))  # Out
+        self.w_pending_full = Signal()  # Out
+
+    def elaborate(self, platform):
+        m = Module()
+
+        # Memory followed by the output register (r_data, r_rdy)
+        inner_depth = self.depth - 1
+        inner_level = Signal(range(inner_depth + 1))  # Committed, in memory
+        inner_r_rdy = Signal()
+        produce = Signal(range(inner_depth))
+        commit = Signal(range(inner_depth))  # Write pointer of the last commit
+        consume = Signal(range(inner_depth))
+
+        def incr(ptr):
+            return Mux(ptr == inner_depth - 1, 0, ptr + 1)
+
+        do_write = self.w_rdy & self.w_en
+        m.d.comb += [
+            self.w_rdy.eq(inner_level + self.w_pending != inner_depth),
+            self.w_pending_full.eq(self.w_pending == inner_depth),
+            inner_r_rdy.eq(inner_level != 0),
+        ]
+        do_inner_read = inner_r_rdy & (~self.r_rdy | self.r_en)
+
+        storage = Memory(shape=self.width, depth=inner_depth, init=[])
+        m.submodules.storage = storage
+        w_port = storage.write_port()
+        r_port = storage.read_port(domain='sync')
+        m.d.comb += [
+            w_port.addr.eq(produce),
+            w_port.data.eq(self.w_data),
+            w_port.en.eq(do_write),
+            r_port.addr.eq(consume),
+            r_port.en.eq(do_inner_read),
+            self.r_data.eq(r_port.data),
+        ]
+
+        produce_next = Mux(do_write, incr(produce), produce)
+        with m.If(self.w_rewind):
+            m.d.sync += [
+                produce.eq(commit),
+                self.w_pending.eq(0),
+                inner_level.eq(inner_level - do_inner_read),
+            ]
+        with m.Elif(self.w_commit):
+            m.d.sync += [
+                produce.eq(produce_next),
+                commit.eq(produce_next),
+                self.w_pending.eq(0),
+                inner_level.eq(inner_level + self.w_pending + do_write - do_inner_read),
+            ]
+        with m.Else():
+            m.d.sync += [
+                produce.eq(produce_next),
+                self.w_pending.eq(self.w_pending + do_write),
+                inner_level.eq(inner_level - do_inner_read),
+            ]
+
+        with m.If(do_inner_read):
+            m.d.sync += consume.eq(incr(consume))
+
+        with m.If(do_inner_read):
+            m.d.sync += self.r_rdy.eq(1)
+        with m.Elif(self.r_en):
+            m.d.sync += self.r_rdy.eq(0)
+
+        m.d.comb += [
+            self.r_level.eq(inner_level + self.r_rdy),
+            self.w_level.eq(inner_level + self.w_pending + self.r_rdy),
+        ]
+
+        return m
+
+
 class AXIStreamFIFO(Elaboratable):
+    """AXI Stream FIFO.
+
+    ram_style selects the synchronous FIFO implementation (see
+    select_fifo_cls) and overrides fifo_cls. reg_output adds a registered
+    skid buffer after the FIFO, so the read data and the FIFO read enable
+    don't reach the source combinationally. It holds up to 2 extra beats,
+    not counted in r_level/w_level.
+
+    almost_full_level and almost_empty_level add registered flags:
+      - almost_full: w_level >= threshold, write domain.
+      - almost_empty: r_level <= threshold, read domain.
+      - r_almost_full, w_almost_empty: the same flags computed from the
+        level of the other side (aliases of the above without CDC).
+    almost_full and almost_empty are registered from the level after the
+    current write (read), so they assert in time and may only deassert a
+    cycle late. With runtime_thresholds, the thresholds are the inputs
+    almost_full_threshold and almost_empty_threshold (the levels at reset).
+    In CDC fifos they are quasi-static for the flags of the other domain.
+
+    In packet_mode, the source only starts a packet once it is complete in
+    the FIFO (or the FIFO is full). Occupancy outputs:
+      - packet_count: complete packets in the FIFO, read domain.
+      - w_packet_count: complete packets in the FIFO, write domain.
+      - w_beats_free: free entries, write domain.
+      - w_packets_free: packets of max_packet_beats that fit in the free
+        entries, write domain (only if max_packet_beats is given).
+    With a CDC fifo_cls (CreateCDC), the packet counts cross the domains
+    as Gray coded totals, so each side sees the other one with a few
+    cycles of delay (conservative for the writer).
+
+    With cut_through, the source also starts the packet once
+    cut_through_threshold beats are buffered (runtime input, cut_through
+    at reset), and keeps it going until its last beat.
+
+    With drop_on_error (store and forward, uses RewindSyncFIFO), a packet
+    whose last beat has tuser[error_bit] set is discarded by rewinding the
+    write pointer, and so are packets that don't fit in the FIFO (longer
+    than depth - 1 beats). packet_dropped pulses for every discarded
+    packet.
+    """
 
     def __init__(
         self,
@@ -16,10 +269,37 @@ class AXIStreamFIFO(Elaboratable):
         fifo_cls: Elaboratable = SyncFIFOBuffered,
         no_tkeep: bool = False,
         packet_mode: bool = False,
+        ram_style: str = None,
+        reg_output: bool = False,
+        cut_through: int = None,
+        drop_on_error: bool = False,
+        error_bit: int = 0,
+        max_packet_beats: int = None,
+        almost_full_level: int = None,
+        almost_empty_level: int = None,
+        runtime_thresholds: bool = False,
         *args,
         **kwargs
     ):
+        assert packet_mode or (cut_through is None and not drop_on_error), (
+            'cut_through and drop_on_error require packet_mode'
+        )
+        assert cut_through is None or not drop_on_error, (
+            'A packet can\'t be dropped once it is being forwarded'
+        )
+        assert not drop_on_error or 0 <= error_bit < user_w
+        assert packet_mode or max_packet_beats is None
+        assert not runtime_thresholds or (
+            almost_full_level is not None or almost_empty_level is not None
+        ), 'runtime_thresholds requires almost_full_level or almost_empty_level'
         self.packet_mode = packet_mode
+        self.max_packet_beats = max_packet_beats
+        self.cut_through = cut_through
+        self.drop_on_error = drop_on_error
+        self.error_bit = error_bit
+        self.almost_full_level = almost_full_level
+        self.almost_empty_level = almost_empty_level
+        self.runtime_thresholds = runtime_thresholds
         self.sink = AXI4StreamSignature.create_slave(
             data_w=data_w,
             user_w=user_w,
@@ -33,55 +313,233 @@ class AXIStreamFIFO(Elaboratable):
             path=['m_axis'],
         )
         total_width = len(self.sink.flatten())
+        if ram_style is not None:
+            fifo_cls = select_fifo_cls(depth=depth, width=total_width, ram_style=ram_style)
+        if drop_on_error:
+            fifo_cls = RewindSyncFIFO
         self.fifo = fifo_cls(width=total_width, depth=depth, *args, **kwargs)
         self.r_level = self.fifo.r_level
         self.w_level = self.fifo.w_level
+        self.output_buffer = None
+        if reg_output:
+            r_domain = kwargs.get('r_domain', 'sync')
+            self.output_buffer = DomainRenamer(r_domain)(AXISkidBuffer(
+                data_w=data_w,
+                user_w=user_w,
+                no_tkeep=no_tkeep,
+                reg_output=True,
+            ))
+        if packet_mode:
+            # Up to depth packets of a single beat
+            depth = self.fifo.depth
+            self.packet_count = Signal(range(depth + 1))  # Out
+            self.w_packet_count = Signal(range(depth + 1))  # Out
+            self.w_beats_free = Signal(range(depth + 1))  # Out
+            if max_packet_beats is not None:
+                self.w_packets_free = Signal(range(depth // max_packet_beats + 1))  # Out
+        if cut_through is not None:
+            self.cut_through_threshold = Signal(range(depth + 1), init=cut_through)  # In
+        if drop_on_error:
+            self.packet_dropped = Signal()  # Out
+        cdc = kwargs.get('r_domain', 'sync') != kwargs.get('w_domain', 'sync')
+        depth = self.fifo.depth
+        if almost_full_level is not None:
+            assert 0 <= almost_full_level <= depth
+            self.almost_full = Signal(init=almost_full_level == 0)  # Out
+            self.r_almost_full = self.almost_full
+            if cdc:
+                self.r_almost_full = Signal(init=almost_full_level == 0, name='r_almost_full')  # Out
+            if runtime_thresholds:
+                self.almost_full_threshold = Signal(range(depth + 1), init=almost_full_level)  # In
+        if almost_empty_level is not None:
+            assert 0 <= almost_empty_level <= depth
+            self.almost_empty = Signal(init=1)  # Out
+            self.w_almost_empty = self.almost_empty
+            if cdc:
+                self.w_almost_empty = Signal(init=1, name='w_almost_empty')  # Out
+            if runtime_thresholds:
+                self.almost_empty_threshold = Signal(range(depth + 1), init=almost_empty_level)  # In
 
     def get_ports(self):
-        return self.sink.extract_signals() + self.source.extract_signals()
+        ports = self.sink.extract_signals() + self.source.extract_signals()
+        if self.packet_mode:
+            ports += [self.packet_count, self.w_packet_count, self.w_beats_free]
+            if self.max_packet_beats is not None:
+                ports += [self.w_packets_free]
+        if self.cut_through is not None:
+            ports += [self.cut_through_threshold]
+        if self.drop_on_error:
+            ports += [self.packet_dropped]
+        if self.almost_full_level is not None:
+            ports += [self.almost_full]
+            if self.r_almost_full is not self.almost_full:
+                ports += [self.r_almost_full]
+            if self.runtime_thresholds:
+                ports += [self.almost_full_threshold]
+        if self.almost_empty_level is not None:
+            ports += [self.almost_empty]
+            if self.w_almost_empty is not self.almost_empty:
+                ports += [self.w_almost_empty]
+            if self.runtime_thresholds:
+                ports += [self.almost_empty_threshold]
+        return ports
 
     def elaborate(self, platform):
         m = Module()
 
         w_domain = self.fifo._w_domain if hasattr(self.fifo, '_w_domain') else 'sync'
+        r_domain = self.fifo._r_domain if hasattr(self.fifo, '_r_domain') else 'sync'
         # Fifo Instance
         m.submodules.fifo_core = fifo = self.fifo
 
+        # Stream read from the fifo
+        if self.output_buffer is not None:
+            m.submodules.output_buffer = self.output_buffer
+            wiring.connect(m, self.output_buffer.source, self.source.as_slave())
+            fifo_source = self.output_buffer.sink
+        else:
+            fifo_source = self.source
+
+        sink_tready = fifo.w_rdy & ~ResetSignal(w_domain)
+        fifo_w_en = self.sink.accepted()
+
         if not self.packet_mode:
             source_tvalid = fifo.r_rdy
         else:
             # Count packets. Source is valid if there is at least one packet
             # or if the fifo is full.
+            assert w_domain == r_domain or not self.drop_on_error, (
+                'drop_on_error is only supported in synchronous fifos'
+            )
             source_tvalid = Signal()
-            packet_count = Signal(range(self.fifo.depth))
+            packet_count = self.packet_count
             packet_written = Signal()
             packet_read = Signal()
+            m.d.comb += packet_read.eq(fifo_source.accepted() & fifo_source.tlast)
+
+            if self.drop_on_error:
+                # Only committed packets can be read. Oversize packets are
+                # discarded, dropping their remaining beats until tlast.
+                error = self.sink.tuser[self.error_bit]
+                dropping = Signal()
+                oversize = Signal()
+                m.d.comb += [
+                    oversize.eq(~dropping & fifo.w_pending_full),
+                    packet_written.eq(self.sink.accepted() & self.sink.tlast & ~error & ~dropping),
+                    fifo.w_commit.eq(packet_written),
+                    fifo.w_rewind.eq(
+                        (self.sink.accepted() & self.sink.tlast & error & ~dropping) | oversize
+                    ),
+                    self.packet_dropped.eq(fifo.w_rewind),
+                ]
+                with m.If(oversize):
+                    m.d[w_domain] += dropping.eq(1)
+                with m.Elif(self.sink.accepted() & self.sink.tlast):
+                    m.d[w_domain] += dropping.eq(0)
+                sink_tready = Mux(dropping, 1, sink_tready)
+                fifo_w_en = self.sink.accepted() & ~dropping
+            else:
+                m.d.comb += packet_written.eq(self.sink.accepted() & self.sink.tlast)
+
             # Keep the packet count
-            m.d.comb += [
-                packet_written.eq(self.sink.accepted() & self.sink.tlast),
-                packet_read.eq(self.source.accepted() & self.source.tlast),
-            ]
-            with m.If(packet_written & ~packet_read):
-                m.d.sync += packet_count.eq(packet_count + 1)
-            with m.Elif(~packet_written & packet_read):
-                m.d.sync += packet_count.eq(packet_count - 1)
-            # Source is valid only if there is at least a packet
-            # or if the fifo is full (to avoid stall).
-            m.d.comb += source_tvalid.eq(
-                fifo.r_rdy & ((packet_count > 0) | ~fifo.w_rdy)
-            )
+            if w_domain == r_domain:
+                with m.If(packet_written & ~packet_read):
+                    m.d[r_domain] += packet_count.eq(packet_count + 1)
+                with m.Elif(~packet_written & packet_read):
+                    m.d[r_domain] += packet_count.eq(packet_count - 1)
+                m.d.comb += self.w_packet_count.eq(packet_count)
+            else:
+                self.elaborate_cdc_packet_count(m, packet_written, packet_read, w_domain, r_domain)
+            m.d.comb += self.w_beats_free.eq(fifo.depth - fifo.w_level)
+            if self.max_packet_beats is not None:
+                m.d.comb += self.w_packets_free.eq(self.w_beats_free // self.max_packet_beats)
+            # Fifo full, as seen from the read domain
+            fifo_full = ~fifo.w_rdy if w_domain == r_domain else (fifo.r_level == fifo.depth)
+
+            if self.drop_on_error:
+                # Everything readable is a complete packet
+                m.d.comb += source_tvalid.eq(fifo.r_rdy)
+            elif self.cut_through is not None:
+                # Without complete packets, the fifo only holds the first
+                # beats of the next one. Once started, the packet goes on.
+                forwarding = Signal()
+                with m.If(fifo_source.accepted()):
+                    m.d[r_domain] += forwarding.eq(~fifo_source.tlast)
+                m.d.comb += source_tvalid.eq(
+                    fifo.r_rdy & (
+                        (packet_count > 0) | fifo_full | forwarding |
+                        (fifo.r_level >= self.cut_through_threshold)
+                    )
+                )
+            else:
+                # Source is valid only if there is at least a packet
+                # or if the fifo is full (to avoid stall).
+                m.d.comb += source_tvalid.eq(
+                    fifo.r_rdy & ((packet_count > 0) | fifo_full)
+                )
 
         # Sink
         m.d.comb += fifo.w_data.eq(self.sink.flatten())
-        m.d.comb += fifo.w_en.eq(self.sink.accepted())
-        m.d.comb += self.sink.tready.eq(fifo.w_rdy & ~ResetSignal(w_domain))
+        m.d.comb += fifo.w_en.eq(fifo_w_en)
+        m.d.comb += self.sink.tready.eq(sink_tready)
         # Source
-        m.d.comb += self.source.tvalid.eq(source_tvalid)
-        m.d.comb += fifo.r_en.eq(self.source.accepted())
-        m.d.comb += self.source.assign_from_flat(fifo.r_data)
+        m.d.comb += fifo_source.tvalid.eq(source_tvalid)
+        m.d.comb += fifo.r_en.eq(fifo_source.accepted())
+        m.d.comb += fifo_source.assign_from_flat(fifo.r_data)
+        # Thresholds
+        self.elaborate_thresholds(m, w_domain, r_domain)
         # Return module
         return m
 
+    def elaborate_thresholds(self, m, w_domain, r_domain):
+        """Registered almost_full/almost_empty flags of both domains."""
+        fifo = self.fifo
+        if self.almost_full_level is not None:
+            if self.runtime_thresholds:
+                threshold = self.almost_full_threshold
+            else:
+                threshold = self.almost_full_level
+            m.d[w_domain] += self.almost_full.eq(fifo.w_level + fifo.w_en >= threshold)
+            if self.r_almost_full is not self.almost_full:
+                m.d[r_domain] += self.r_almost_full.eq(fifo.r_level >= threshold)
+        if self.almost_empty_level is not None:
+            if self.runtime_thresholds:
+                threshold = self.almost_empty_threshold
+            else:
+                threshold = self.almost_empty_level
+            m.d[r_domain] += self.almost_empty.eq(fifo.r_level - fifo.r_en <= threshold)
+            if self.w_almost_empty is not self.almost_empty:
+                m.d[w_domain] += self.w_almost_empty.eq(fifo.w_level <= threshold)
+
+    def elaborate_cdc_packet_count(self, m, packet_written, packet_read, w_domain, r_domain):
+        """Packet counts of a CDC fifo: each domain counts its own packets
+        (modulo twice the depth) and receives the other total in Gray code.
+        """
+        width = len(self.packet_count) + 1
+        totals = {}
+        for name, domain, event in (('w', w_domain, packet_written), ('r', r_domain, packet_read)):
+            total = Signal(width, name=f'{name}_packet_total')
+            total_gray = Signal(width, name=f'{name}_packet_total_gray')
+            encoder = m.submodules[f'{name}_packet_total_encoder'] = GrayEncoder(width)
+            m.d[domain] += total.eq(total + event)
+            m.d.comb += encoder.i.eq(total)
+            m.d[domain] += total_gray.eq(encoder.o)
+            totals[name] = (total, total_gray)
+
+        for name, domain, other in (('w', w_domain, 'r'), ('r', r_domain, 'w')):
+            other_gray = Signal(width, name=f'{other}_packet_total_gray_{name}')
+            m.submodules[f'{other}_packet_total_cdc'] = FFSynchronizer(
+                totals[other][1], other_gray, o_domain=domain,
+            )
+            decoder = m.submodules[f'{other}_packet_total_decoder'] = GrayDecoder(width)
+            m.d.comb += decoder.i.eq(other_gray)
+            if name == 'w':
+                count = (totals['w'][0] - decoder.o)[:width]
+                m.d.comb += self.w_packet_count.eq(count)
+            else:
+                count = (decoder.o - totals['r'][0])[:width]
+                m.d.comb += self.packet_count.eq(count)
+
     @classmethod
     def CreateCDC(
         cls,
@@ -103,12 +561,25 @@ class AXIStreamFIFO(Elaboratable):
 class FastClkAXIStreamFIFO(Elaboratable):
     """Split AXI Stream FIFO into multiple FIFOs,
     and include Skid Buffers at the start, at the end, and between each FIFO.
+
+    With max_fifo_width, every FIFO is also split in lanes of up to that
+    many bits (LanedSyncFIFO) that share their control logic.
+
+    level is the number of beats in the whole chain, skid buffers included.
+    It is a registered up/down counter, so it doesn't add the levels of
+    the FIFOs (r_level and w_level are the same signal).
     """
 
     def __init__(self, data_w: int, user_w: int, depth: int, *,
-                 max_fifo_depth: int = 4096, **kwargs):
+                 max_fifo_depth: int = 4096, max_fifo_width: int = None, **kwargs):
         self.total_depth = depth
         self.max_fifo_depth = max_fifo_depth
+        self.max_fifo_width = max_fifo_width
+        if max_fifo_width is not None:
+            assert 'fifo_cls' not in kwargs and 'ram_style' not in kwargs, (
+                'max_fifo_width selects the fifo implementation'
+            )
+            kwargs = dict(kwargs, fifo_cls=LanedSyncFIFO, lane_w=max_fifo_width)
         fifos_depth = []
         while sum(fifos_depth) < depth:
             fifos_depth.append(min(depth - sum(fifos_depth), max_fifo_depth))
@@ -132,18 +603,26 @@ class FastClkAXIStreamFIFO(Elaboratable):
         assert sum([f.wrapped_core.fifo.depth for f in self.fifos]) == depth
         self.sink = self.fifos[0].sink
         self.source = self.fifos[-1].source
-        self.r_level = sum([f.wrapped_core.r_level for f in self.fifos])
-        self.w_level = sum([f.wrapped_core.w_level for f in self.fifos])
+        # Every skid buffer holds up to 2 beats
+        n_skid_buffers = len(self.fifos) + 1
+        self.level = Signal(range(depth + 2 * n_skid_buffers + 1))
+        self.r_level = self.level
+        self.w_level = self.level
 
     def get_ports(self):
         ports = []
         ports += self.sink.extract_signals()
         ports += self.source.extract_signals()
+        ports += [self.level]
         return ports
 
     def elaborate(self, platform):
         m = Module()
 
+        m.d.sync += self.level.eq(
+            self.level + self.sink.accepted() - self.source.accepted()
+        )
+
         for i, fifo in enumerate(self.fifos):
             m.submodules[f'fifo_{i:02d}'] = fifo
 
@@ -153,9 +632,7 @@ class FastClkAXIStreamFIFO(Elaboratable):
         return m
 
 
-def parse_args(sys_args=None):
-    import argparse
-    parser = argparse.ArgumentParser()
+def add_arguments(parser):
     parser.add_argument('-dw', '--data-width', type=int, required=True,
                         help='Data width in bits')
     parser.add_argument('-uw', '--user-width', type=int, required=True,
@@ -164,6 +641,16 @@ def parse_args(sys_args=None):
                         help='FIFO depth')
     parser.add_argument('--cdc', action='store_true',
                         help='Fifo with Clock Domain Crossing')
+    parser.add_argument('--ram-style', type=str, choices=RAM_STYLES, default=None,
+                        help='RAM of the (not CDC) fifo, auto selects by depth and size')
+    parser.add_argument('--reg-output', action='store_true',
+                        help='Add a registered output stage')
+    parser.add_argument('-af', '--almost-full', type=int, default=None,
+                        help='Add an almost_full flag with this level threshold')
+    parser.add_argument('-ae', '--almost-empty', type=int, default=None,
+                        help='Add an almost_empty flag with this level threshold')
+    parser.add_argument('--runtime-thresholds', action='store_true',
+                        help='Thresholds are inputs, with the levels at reset')
     parser.add_argument('-rstn', '--active-low-reset', action='store_true',
                         help='Use active low reset (default is active high)')
     parser.add_argument('--rd-domain', type=str,
@@ -175,12 +662,15 @@ def parse_args(sys_args=None):
     parser.add_argument('--prefix', type=str,
                         default='', help='Module names prefix')
 
+
+def parse_args(sys_args=None):
+    import argparse
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
     return parser.parse_args(sys_args)
 
 
-def main(sys_args=None):
-    from hdl_utils.amaranth_utils.generate_verilog import generate_verilog
-    args = parse_args(sys_args)
+def create_core(args) -> tuple[Elaboratable, str]:
     if args.cdc:
         name = args.name or 'axi_stream_fifo_cdc'
         core = AXIStreamFIFO.CreateCDC(
@@ -189,6 +679,10 @@ def main(sys_args=None):
             depth=args.fifo_depth,
             r_domain=args.rd_domain,
             w_domain=args.wr_domain,
+            reg_output=args.reg_output,
+            almost_full_level=args.almost_full,
+            almost_empty_level=args.almost_empty,
+            runtime_thresholds=args.runtime_thresholds,
         )
         if args.active_low_reset:
             from hdl_utils.amaranth_utils.rstn_wrapper import RstnWrapper
@@ -200,10 +694,22 @@ def main(sys_args=None):
             data_w=args.data_width,
             user_w=args.user_width,
             depth=args.fifo_depth,
+            ram_style=args.ram_style,
+            reg_output=args.reg_output,
+            almost_full_level=args.almost_full,
+            almost_empty_level=args.almost_empty,
+            runtime_thresholds=args.runtime_thresholds,
         )
         if args.active_low_reset:
             from hdl_utils.amaranth_utils.rstn_wrapper import RstnWrapper
             core = RstnWrapper(core=core, domain="sync")
+    return core, name
+
+
+def main(sys_args=None):
+    from hdl_utils.amaranth_utils.generate_verilog import generate_verilog
+    args = parse_args(sys_args)
+    core, name = create_core(args)
     ports = core.get_ports()
     output = generate_verilog(
         core=core,
@@ -61,9 +61,7 @@ class AXISPacketRateLimiter(am.Elaboratable):
         return m
 
 
-def parse_args(sys_args=None):
-    import argparse
-    parser = argparse.ArgumentParser()
+def add_arguments(parser):
     parser.add_argument('-dw', '--data-width', type=int, required=True,
                         help='Data width in bits')
     parser.add_argument('-uw', '--user-width', type=int, required=True,
@@ -75,12 +73,15 @@ def parse_args(sys_args=None):
     parser.add_argument('--prefix', type=str,
                         default='', help='Module names prefix')
 
+
+def parse_args(sys_args=None):
+    import argparse
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
     return parser.parse_args(sys_args)
 
 
-def main(sys_args=None):
-    from hdl_utils.amaranth_utils.generate_verilog import generate_verilog
-    args = parse_args(sys_args)
+def create_core(args) -> tuple[am.Elaboratable, str]:
     name = args.name
     core = AXISPacketRateLimiter(
         data_w=args.data_width,
@@ -90,6 +91,13 @@ def main(sys_args=None):
     if args.active_low_reset:
         from hdl_utils.amaranth_utils.rstn_wrapper import RstnWrapper
         core = RstnWrapper(core=core, domain="sync")
+    return core, name
+
+
+def main(sys_args=None):
+    from hdl_utils.amaranth_utils.generate_verilog import generate_verilog
+    args = parse_args(sys_args)
+    core, name = create_core(args)
     ports = core.get_ports()
     output = generate_verilog(
         core=core,
@@ -0,0 +1,118 @@
+from amaranth import Cat, Elaboratable, Module, Mux, Signal
+
+from hdl_utils.amaranth_utils.interfaces.axi4_stream import AXI4StreamSignature
+
+
+class AXIStreamRealigner(Elaboratable):
+    """Move the bytes of a packet to other byte lanes.
+
+    Every byte of the packet is moved rotate lanes up: byte lanes that
+    overflow the beat go to the bottom of the next output beat. Bytes are
+    identified by tkeep, so the first input beat can start at any lane
+    (leading lanes with tkeep unset) and the last one can be partial.
+
+    Typical uses are aligning a packed stream to an unaligned memory
+    address (rotate = addr % bytes per beat) and packing a stream read from
+    an unaligned address (first beat keeps masked below the address,
+    rotate = -addr % bytes per beat).
+
+    The rotation is sampled with the first beat of every packet. Output
+    beats without bytes are dropped, and one extra output beat is added at
+    the end of the packet when the last bytes overflow the last input beat.
+    There is no extra latency: data goes through a barrel shifter.
+    """
+
+    def __init__(
+        self,
+        data_w: int,
+        user_w: int,
+    ):
+        assert data_w % 8 == 0
+        self.data_w = data_w
+        self.user_w = user_w
+        self.n_bytes = data_w // 8
+        self.sink = AXI4StreamSignature.create_slave(
+            data_w=data_w,
+            user_w=user_w,
+            path=['s_axis'],
+        )
+        self.source = AXI4StreamSignature.create_master(
+            data_w=data_w,
+            user_w=user_w,
+            path=['m_axis'],
+        )
+        self.rotate = Signal(range(self.n_bytes))  # In
+        self.idle = Signal()  # Out: no packet in progress
+
+    def get_ports(self):
+        return [
+            *self.sink.extract_signals(),
+            *self.source.extract_signals(),
+            self.rotate,
+            self.idle,
+        ]
+
+    def elaborate(self, platform):
+        m = Module()
+        n_bytes = self.n_bytes
+
+        first = Signal(init=1)  # Next input beat is the first of a packet
+        flush = Signal()  # Sending the bytes that overflowed the last input beat
+        rotate_r = Signal.like(self.rotate)
+        res_data = Signal(self.data_w)
+        res_keep = Signal(n_bytes)
+        res_user = Signal(self.user_w)
+
+        # Output beat k is made of the top bytes of input beat k - 1 (the
+        # residual) and the bottom bytes of input beat k, starting at lane
+        # shift of the concatenation. shift = n_bytes is a pass-through.
+        rotate = Signal.like(self.rotate)
+        shift = Signal(range(1, n_bytes + 1))
+        cur_data = Mux(flush, 0, self.sink.tdata)
+        cur_keep = Mux(flush, 0, self.sink.tkeep)
+        out_keep = Signal(n_bytes)
+        overflow = Signal()
+        m.d.comb += [
+            rotate.eq(Mux(first, self.rotate, rotate_r)),
+            shift.eq(n_bytes - rotate),
+            out_keep.eq(Cat(res_keep, cur_keep).bit_select(shift, n_bytes)),
+            overflow.eq((cur_keep >> shift).any()),
+            self.idle.eq(first & ~flush),
+            self.source.tdata.eq(Cat(res_data, cur_data).bit_select(shift * 8, self.data_w)),
+            self.source.tkeep.eq(out_keep),
+        ]
+        if self.user_w:
+            m.d.comb += self.source.tuser.eq(Mux(flush, res_user, self.sink.tuser))
+
+        with m.If(flush):
+            m.d.comb += [
+                self.source.tvalid.eq(1),
+                self.source.tlast.eq(1),
+                self.sink.tready.eq(0),
+            ]
+            with m.If(self.source.accepted()):
+                m.d.sync += [
+                    flush.eq(0),
+                    first.eq(1),
+                    res_keep.eq(0),
+                ]
+        with m.Else():
+            # Empty beats are dropped, unless they close the packet
+            emit = out_keep.any() | (self.sink.tlast & ~overflow)
+            m.d.comb += [
+                self.source.tvalid.eq(self.sink.tvalid & emit),
+                self.source.tlast.eq(self.sink.tlast & ~overflow),
+                self.sink.tready.eq(self.source.tready | ~emit),
+            ]
+            with m.If(self.sink.accepted()):
+                m.d.sync += [
+                    res_data.eq(self.sink.tdata),
+                    res_keep.eq(Mux(self.sink.tlast & ~overflow, 0, self.sink.tkeep)),
+                    first.eq(self.sink.tlast & ~overflow),
+                    flush.eq(self.sink.tlast & overflow),
+                    rotate_r.eq(rotate),
+                ]
+                if self.user_w:
+                    m.d.sync += res_user.eq(self.sink.tuser)
+
+        return m
@@ -1,9 +1,24 @@
 from amaranth import Elaboratable, Module, ResetSignal, Signal, Mux, Cat, Array
+from amaranth.lib import wiring
 
+from hdl_utils.amaranth_utils.axi_stream_fifo import AXIStreamFIFO
 from hdl_utils.amaranth_utils.interfaces.axi4_stream import AXI4StreamSignature
 
 
 class AXIStreamSplitter(Elaboratable):
+    """Copy every sink beat to n_split sources.
+
+    By default the sources are driven directly from the sink, and the sink
+    is ready once every source has taken the beat (the slowest consumer
+    stalls all of them).
+
+    With fifo_depth, every source has its own AXIStreamFIFO, so consumers
+    with uncorrelated stalls run at full rate as long as the FIFOs absorb
+    them. sink.tready is then a register, computed from registered
+    almost_full flags of the FIFOs (two beats of margin, to cover both
+    register stages), so it doesn't depend on any src.tready and only
+    takes an OR of n_split flags. Full rate needs fifo_depth >= 6.
+    """
 
     def __init__(
         self,
@@ -11,7 +26,9 @@ class AXIStreamSplitter(Elaboratable):
         user_w: int,
         no_tkeep: bool,
         n_split: int,
+        fifo_depth: int = None,
     ):
+        assert fifo_depth is None or fifo_depth >= 3
         self.sink = AXI4StreamSignature.create_slave(
             data_w=data_w,
             user_w=user_w,
@@ -28,6 +45,7 @@ class AXIStreamSplitter(Elaboratable):
             for i in range(n_split)
         ]
         self.n_split = n_split
+        self.fifo_depth = fifo_depth
 
     def get_ports(self):
         ports = []
@@ -39,6 +57,10 @@ class AXIStreamSplitter(Elaboratable):
     def elaborate(self, platform):
         m = Module()
 
+        if self.fifo_depth is not None:
+            self.elaborate_buffered(m)
+            return m
+
         pending_accepts = Array(Signal(name=f"pending_accept_{i}", init=0) for i in range(self.n_split))
         pending_accept_cat = Signal.like(Cat(pending_accepts))
         any_pending_accept = Signal(self.n_split, init=0)
@@ -104,3 +126,30 @@ class AXIStreamSplitter(Elaboratable):
                     m.d.sync += pending_accepts[i].eq(1)
 
         return m
+
+    def elaborate_buffered(self, m):
+        # Registered: the FIFOs have room for the beat of this cycle
+        ready = Signal(init=0)
+        almost_full = []
+        for i, src in enumerate(self.sources):
+            fifo = AXIStreamFIFO(
+                data_w=len(self.sink.tdata),
+                user_w=len(self.sink.tuser) if hasattr(self.sink, 'tuser') else 0,
+                depth=self.fifo_depth,
+                no_tkeep=not hasattr(self.sink, 'tkeep'),
+                almost_full_level=self.fifo_depth - 2,
+            )
+            m.submodules[f'fifo_{i:02d}'] = fifo
+            m.d.comb += [
+                *[fifo.sink[key].eq(self.sink[key])
+                  for key in self.sink.signature.members if key not in ['tvalid', 'tready']],
+                fifo.sink.tvalid.eq(self.sink.tvalid & ready),
+            ]
+            wiring.connect(m, fifo.source, src.as_slave())
+            almost_full.append(fifo.almost_full)
+
+        # almost_full is registered from the level after the write of the
+        # previous cycle, so the FIFOs still have room after the write of
+        # this cycle and the next one.
+        m.d.comb += self.sink.tready.eq(ready)
+        m.d.sync += ready.eq(~Cat(almost_full).any())
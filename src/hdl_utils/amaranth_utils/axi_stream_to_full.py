@@ -1,34 +1,79 @@
 from amaranth import Elaboratable, Module, Signal, Mux
+from amaranth.lib import wiring
 import math
 
+from hdl_utils.amaranth_utils.axi_perf_counters import AxiPerfCounters
+from hdl_utils.amaranth_utils.axi_stream_fifo import AXIStreamFIFO
 from hdl_utils.amaranth_utils.interfaces.axi4_stream import AXI4StreamSignature
 from hdl_utils.amaranth_utils.interfaces.axi_full import (
     AXI4Signature,
     BURST_TYPE_INCR,
     CACHE_BUFFERABLE_MASK,
     CACHE_CACHEABLE_MASK,
+    RESP_OKAY,
 )
+from hdl_utils.amaranth_utils.skid_buffer import AXISkidBuffer
 
 
 class AxiStreamToFull(Elaboratable):
+    """Memory bursts to/from AXI Stream.
+
+    With no_tkeep=False the streams have tkeep: s_axis.tkeep drives WSTRB
+    (partial beats only write the kept bytes) and m_axis.tkeep is all ones.
+
+    With perf_counters=True, self.perf_counters (AxiPerfCounters) counts
+    the m_axi activity and the backpressure of s_axis/m_axis.
+
+    By default WDATA/RDATA are wired to the streams, so m_axis.tready
+    drives RREADY and WREADY drives s_axis.tready combinationally. For
+    higher clocks:
+      - reg_w adds a registered skid buffer between s_axis and W.
+      - reg_r adds a registered skid buffer before m_axis.
+      - rd_fifo_depth > 0 adds a FIFO after R. A read burst is only
+        issued when the FIFO has room for all its beats, so a stalled
+        m_axis never stalls the R channel. rd_ready can be asserted
+        while the previous bursts are still in the FIFO: size it to
+        cover the bursts in flight (two bursts for back to back reads).
+    With any read buffering, rd_idle is asserted once the beats of the
+    last burst have left m_axis.
+
+    Write responses don't block the write FSM: BREADY is always asserted
+    and wr_outstanding counts the bursts whose response hasn't arrived yet.
+    A new write burst can be started as soon as the data of the previous
+    one is sent, up to max_outstanding_writes bursts waiting for their
+    response. wr_error is set by a response other than OKAY (wr_error_resp
+    holds the first one) and stays set until wr_error_clear. An error
+    response in the same cycle as wr_error_clear sets it again.
+    """
+
     def __init__(
         self,
         addr_w: int,
         data_w: int,
         user_w: int,
+        no_tkeep: bool = True,
+        perf_counters: bool = False,
+        reg_w: bool = False,
+        reg_r: bool = False,
+        rd_fifo_depth: int = 0,
+        max_outstanding_writes: int = 4,
     ):
+        assert max_outstanding_writes >= 1
+        self.no_tkeep = no_tkeep
+        self.rd_fifo_depth = rd_fifo_depth
+        self.max_outstanding_writes = max_outstanding_writes
         # AXI Stream sink (memory write)
         self.s_axis = AXI4StreamSignature.create_slave(
             data_w=data_w,
             user_w=user_w,
-            no_tkeep=True,
+            no_tkeep=no_tkeep,
             path=['s_axis'],
         )
         # AXI Stream source (memory read)
         self.m_axis = AXI4StreamSignature.create_master(
             data_w=data_w,
             user_w=user_w,
-            no_tkeep=True,
+            no_tkeep=no_tkeep,
             path=['m_axis'],
         )
         # AXI master (Memory R/W)
@@ -52,9 +97,43 @@ class AxiStreamToFull(Elaboratable):
         self.rd_ready = Signal()  # Out: ready for reading new burst
         self.wr_idle = Signal()  # Out: Idle, available for new burst
         self.rd_idle = Signal()  # Out: Idle, available for new burst
+        self.wr_outstanding = Signal(range(max_outstanding_writes + 1))  # Out: bursts waiting for B
+        self.wr_error = Signal()  # Out: a write response was not OKAY
+        self.wr_error_resp = Signal.like(self.m_axi.BRESP)  # Out: first error response
+        self.wr_error_clear = Signal()  # In: clear wr_error
+        self.perf_counters = None
+        if perf_counters:
+            self.perf_counters = AxiPerfCounters(
+                m_axi=self.m_axi, sink=self.s_axis, source=self.m_axis,
+            )
+        # Optional buffers
+        self.w_buffer = None
+        if reg_w:
+            self.w_buffer = AXISkidBuffer(
+                data_w=data_w,
+                user_w=user_w,
+                no_tkeep=no_tkeep,
+                reg_output=True,
+            )
+        self.r_buffer = None
+        if reg_r:
+            self.r_buffer = AXISkidBuffer(
+                data_w=data_w,
+                user_w=user_w,
+                no_tkeep=no_tkeep,
+                reg_output=True,
+            )
+        self.rd_fifo = None
+        if rd_fifo_depth:
+            self.rd_fifo = AXIStreamFIFO(
+                data_w=data_w,
+                user_w=user_w,
+                depth=rd_fifo_depth,
+                no_tkeep=no_tkeep,
+            )
 
     def get_ports(self):
-        return [
+        ports = [
             *self.s_axis.extract_signals(),
             *self.m_axis.extract_signals(),
             *self.m_axi.extract_signals(),
@@ -66,10 +145,41 @@ class AxiStreamToFull(Elaboratable):
             self.rd_burst,
             self.wr_qos,
             self.rd_qos,
+            self.wr_outstanding,
+            self.wr_error,
+            self.wr_error_resp,
+            self.wr_error_clear,
         ]
+        if self.perf_counters is not None:
+            ports += self.perf_counters.get_ports()
+        return ports
 
     def elaborate(self, platform):
         m = Module()
+        if self.perf_counters is not None:
+            m.submodules.perf_counters = self.perf_counters
+
+        # Stream written to W
+        if self.w_buffer is not None:
+            m.submodules.w_buffer = self.w_buffer
+            wiring.connect(m, self.s_axis.as_master(), self.w_buffer.sink)
+            w_stream = self.w_buffer.source
+        else:
+            w_stream = self.s_axis
+
+        # Stream read from R, through the optional fifo and skid buffer
+        r_path = [b for b in (self.rd_fifo, self.r_buffer) if b is not None]
+        if len(r_path):
+            if self.rd_fifo is not None:
+                m.submodules.rd_fifo = self.rd_fifo
+            if self.r_buffer is not None:
+                m.submodules.r_buffer = self.r_buffer
+            for prv, nxt in zip(r_path[:-1], r_path[1:]):
+                wiring.connect(m, prv.source, nxt.sink)
+            wiring.connect(m, r_path[-1].source, self.m_axis.as_slave())
+            r_stream = r_path[0].sink
+        else:
+            r_stream = self.m_axis
 
         _w_width = len(self.m_axi.WDATA)
         _r_width = len(self.m_axi.RDATA)
@@ -116,7 +226,7 @@ class AxiStreamToFull(Elaboratable):
             # self.m_axi.WLAST.eq(...),
             # self.m_axi.WUSER.eq(0),
             # self.m_axi.WVALID.eq(...),
-            # self.m_axi.BREADY.eq(self.m_axi.BVALID),  # ignored, accept all transactions
+            self.m_axi.BREADY.eq(1),  # Responses are counted, never blocked
             # self.m_axi.ARID.eq(0),
             self.m_axi.ARADDR.eq(self.rd_addr),
             self.m_axi.ARLEN.eq(self.rd_burst),
@@ -142,6 +252,44 @@ class AxiStreamToFull(Elaboratable):
             # self.m_axis.tkeep.eq(-1),
         ]
 
+        # Beats accepted from R and not yet sent through m_axis. A burst is
+        # only issued if the read fifo has room for all its beats (or if
+        # nothing is buffered, for bursts longer than the fifo).
+        rd_credit = Signal(init=1)
+        rd_empty = Signal(init=1)
+        if len(r_path):
+            capacity = self.rd_fifo_depth + (2 if self.r_buffer is not None else 0)
+            rd_pending = Signal(range(capacity + 1))
+            m.d.sync += rd_pending.eq(
+                rd_pending + self.m_axi.r_accepted() - self.m_axis.accepted()
+            )
+            m.d.comb += rd_empty.eq(rd_pending == 0)
+            if self.rd_fifo is not None:
+                m.d.comb += rd_credit.eq(
+                    (rd_pending + self.rd_burst + 1 <= self.rd_fifo_depth) | rd_empty
+                )
+
+        # Write responses
+        wr_can_issue = Signal()
+        m.d.comb += wr_can_issue.eq(self.wr_outstanding != self.max_outstanding_writes)
+        m.d.sync += self.wr_outstanding.eq(
+            self.wr_outstanding + self.m_axi.aw_accepted() - self.m_axi.b_accepted()
+        )
+        with m.If(self.wr_error_clear):
+            m.d.sync += [
+                self.wr_error.eq(0),
+                self.wr_error_resp.eq(RESP_OKAY),
+            ]
+        # An error response in the same cycle as the clear is not lost
+        with m.If(
+            self.m_axi.b_accepted() & (self.m_axi.BRESP != RESP_OKAY)
+            & (~self.wr_error | self.wr_error_clear)
+        ):
+            m.d.sync += [
+                self.wr_error.eq(1),
+                self.wr_error_resp.eq(self.m_axi.BRESP),
+            ]
+
         # Burst counters logic
         wr_burst_r = Signal.like(self.m_axi.AWLEN)
         rd_burst_r = Signal.like(self.m_axi.ARLEN)
@@ -149,7 +297,7 @@ class AxiStreamToFull(Elaboratable):
         rd_last_of_burst = Signal()
         m.d.comb += [
             wr_last_of_burst.eq(Mux((wr_burst_r == 0) & (self.m_axi.WVALID), 1, 0)),
-            rd_last_of_burst.eq(Mux((rd_burst_r == 0) & (self.m_axis.tvalid), 1, 0)),
+            rd_last_of_burst.eq(Mux((rd_burst_r == 0) & (r_stream.tvalid), 1, 0)),
         ]
 
         with m.If(self.m_axi.w_accepted()):
@@ -169,10 +317,9 @@ class AxiStreamToFull(Elaboratable):
                     self.m_axi.WSTRB.eq(0),
                     self.m_axi.WVALID.eq(0),
                     self.m_axi.WLAST.eq(0),
-                    self.s_axis.tready.eq(0),
-                    self.m_axi.AWVALID.eq(self.wr_valid),
-                    self.m_axi.BREADY.eq(0),
-                    self.wr_ready.eq(self.m_axi.AWREADY),
+                    w_stream.tready.eq(0),
+                    self.m_axi.AWVALID.eq(self.wr_valid & wr_can_issue),
+                    self.wr_ready.eq(self.m_axi.AWREADY & wr_can_issue),
                     self.wr_idle.eq(1),
                 ]
                 with m.If(self.m_axi.aw_accepted()):
@@ -183,19 +330,18 @@ class AxiStreamToFull(Elaboratable):
 
             with m.State("WR_DATA"):
                 m.d.comb += [
-                    self.m_axi.WDATA.eq(self.s_axis.tdata),
-                    self.m_axi.WSTRB.eq(-1),  # All ones!
-                    self.m_axi.WVALID.eq(self.s_axis.tvalid),
+                    self.m_axi.WDATA.eq(w_stream.tdata),
+                    self.m_axi.WSTRB.eq(-1 if self.no_tkeep else w_stream.tkeep),
+                    self.m_axi.WVALID.eq(w_stream.tvalid),
                     self.m_axi.WLAST.eq(self.m_axi.WVALID & wr_last_of_burst),
-                    self.s_axis.tready.eq(self.m_axi.WREADY),
+                    w_stream.tready.eq(self.m_axi.WREADY),
                     self.m_axi.AWVALID.eq(0),
-                    self.m_axi.BREADY.eq(0),
                     self.wr_ready.eq(0),
                     self.wr_idle.eq(0),
                 ]
                 with m.If(self.m_axi.w_accepted() & wr_last_of_burst):
-                    m.next = "WR_WAIT_WRITE_RESPONSE"
-                with m.Elif(self.m_axi.w_accepted() & self.s_axis.tlast):
+                    m.next = "WR_WAITING_ADDR"
+                with m.Elif(self.m_axi.w_accepted() & w_stream.tlast):
                     m.next = "WR_DUMMY_CYCLES"
 
             with m.State("WR_DUMMY_CYCLES"):
@@ -204,28 +350,12 @@ class AxiStreamToFull(Elaboratable):
                     self.m_axi.WSTRB.eq(0),  # Zero, don't write. Only completing burst transaction.
                     self.m_axi.WVALID.eq(1),
                     self.m_axi.WLAST.eq(self.m_axi.WVALID & wr_last_of_burst),
-                    self.s_axis.tready.eq(0),
+                    w_stream.tready.eq(0),
                     self.m_axi.AWVALID.eq(0),
-                    self.m_axi.BREADY.eq(0),
                     self.wr_ready.eq(0),
                     self.wr_idle.eq(0),
                 ]
                 with m.If(self.m_axi.w_accepted() & wr_last_of_burst):
-                    m.next = "WR_WAIT_WRITE_RESPONSE"
-
-            with m.State("WR_WAIT_WRITE_RESPONSE"):
-                m.d.comb += [
-                    self.m_axi.WDATA.eq(0),
-                    self.m_axi.WSTRB.eq(0),
-                    self.m_axi.WVALID.eq(0),
-                    self.m_axi.WLAST.eq(0),
-                    self.s_axis.tready.eq(0),
-                    self.m_axi.AWVALID.eq(0),
-                    self.m_axi.BREADY.eq(1),
-                    self.wr_ready.eq(0),
-                    self.wr_idle.eq(0),
-                ]
-                with m.If(self.m_axi.b_accepted()):
                     m.next = "WR_WAITING_ADDR"
 
         # FSM Read Burst
@@ -233,14 +363,16 @@ class AxiStreamToFull(Elaboratable):
 
             with m.State("RD_WAITING_ADDR"):
                 m.d.comb += [
-                    self.m_axi.ARVALID.eq(self.rd_valid),
-                    self.rd_ready.eq(self.m_axi.ARREADY),
+                    self.m_axi.ARVALID.eq(self.rd_valid & rd_credit),
+                    self.rd_ready.eq(self.m_axi.ARREADY & rd_credit),
                     self.m_axi.RREADY.eq(0),
-                    self.m_axis.tvalid.eq(0),
-                    self.m_axis.tlast.eq(0),
-                    self.m_axis.tdata.eq(0),
-                    self.rd_idle.eq(1),
+                    r_stream.tvalid.eq(0),
+                    r_stream.tlast.eq(0),
+                    r_stream.tdata.eq(0),
+                    self.rd_idle.eq(rd_empty),
                 ]
+                if not self.no_tkeep:
+                    m.d.comb += r_stream.tkeep.eq(0)
                 with m.If(self.m_axi.ar_accepted()):
                     m.next = "RD_DATA"
                     m.d.sync += [
@@ -251,20 +383,85 @@ class AxiStreamToFull(Elaboratable):
                 m.d.comb += [
                     self.m_axi.ARVALID.eq(0),
                     self.rd_ready.eq(0),
-                    self.m_axi.RREADY.eq(self.m_axis.tready),
-                    self.m_axis.tvalid.eq(self.m_axi.RVALID),
-                    self.m_axis.tlast.eq(self.m_axi.RLAST),
-                    self.m_axis.tdata.eq(self.m_axi.RDATA),
+                    self.m_axi.RREADY.eq(r_stream.tready),
+                    r_stream.tvalid.eq(self.m_axi.RVALID),
+                    r_stream.tlast.eq(self.m_axi.RLAST),
+                    r_stream.tdata.eq(self.m_axi.RDATA),
                     self.rd_idle.eq(0),
                 ]
+                if not self.no_tkeep:
+                    m.d.comb += r_stream.tkeep.eq(-1)
                 with m.If(self.m_axi.r_accepted() & self.m_axi.RLAST):
                     m.next = "RD_WAITING_ADDR"
 
         return m
 
 
+def add_arguments(parser):
+    parser.add_argument('-aw', '--addr-width', type=int, required=True,
+                        help='AXI address width in bits')
+    parser.add_argument('-dw', '--data-width', type=int, required=True,
+                        help='Data width in bits')
+    parser.add_argument('-uw', '--user-width', type=int, default=0,
+                        help='User width in bits')
+    parser.add_argument('-k', '--tkeep', action='store_true',
+                        help='Add tkeep to the streams (drives WSTRB)')
+    parser.add_argument('-pc', '--perf-counters', action='store_true',
+                        help='Add performance counters')
+    parser.add_argument('--reg-w', action='store_true',
+                        help='Register the write data path (skid buffer)')
+    parser.add_argument('--reg-r', action='store_true',
+                        help='Register the read data path (skid buffer)')
+    parser.add_argument('-rfd', '--rd-fifo-depth', type=int, default=0,
+                        help='Read data FIFO depth (0: no FIFO)')
+    parser.add_argument('-ow', '--max-outstanding-writes', type=int, default=4,
+                        help='Write bursts waiting for their response')
+    parser.add_argument('-rstn', '--active-low-reset', action='store_true',
+                        help='Use active low reset (default is active high)')
+    parser.add_argument('-n', '--name', type=str,
+                        default='axi_stream_to_full', help='Core name')
+    parser.add_argument('--prefix', type=str,
+                        default='', help='Module names prefix')
+
+
+def parse_args(sys_args=None):
+    import argparse
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    return parser.parse_args(sys_args)
+
+
+def create_core(args) -> tuple[Elaboratable, str]:
+    name = args.name
+    core = AxiStreamToFull(
+        addr_w=args.addr_width,
+        data_w=args.data_width,
+        user_w=args.user_width,
+        no_tkeep=not args.tkeep,
+        perf_counters=args.perf_counters,
+        reg_w=args.reg_w,
+        reg_r=args.reg_r,
+        rd_fifo_depth=args.rd_fifo_depth,
+        max_outstanding_writes=args.max_outstanding_writes,
+    )
+    if args.active_low_reset:
+        from hdl_utils.amaranth_utils.rstn_wrapper import RstnWrapper
+        core = RstnWrapper(core=core, domain="sync")
+    return core, name
+
+
 def main(sys_args=None):
-    raise NotImplementedError()
+    from hdl_utils.amaranth_utils.generate_verilog import generate_verilog
+    args = parse_args(sys_args)
+    core, name = create_core(args)
+    ports = core.get_ports()
+    output = generate_verilog(
+        core=core,
+        name=name,
+        ports=ports,
+        prefix=args.prefix
+    )
+    print(output)
 
 
 if __name__ == '__main__':
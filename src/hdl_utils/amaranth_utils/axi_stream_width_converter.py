@@ -1,10 +1,20 @@
-from amaranth import Elaboratable, Module, Signal, Cat, Const, ResetSignal, Record
+from amaranth import Elaboratable, Module, Signal, Cat, Const, Mux, ResetSignal, Record
 
+from hdl_utils.amaranth_utils.coding import PriorityEncoder
 from hdl_utils.amaranth_utils.interfaces.axi4_stream import AXI4StreamSignature
 import math
 
 
 class AXIStreamWidthConverterDown(Elaboratable):
+    """Down converter by an integer ratio.
+
+    By default, the sub-words of every input word are sent in order and
+    the conversion of the last word of a packet ends early if only null
+    bytes (tkeep = 0) remain. With compact, null sub-words are skipped
+    anywhere in the word: a priority encoder picks the next sub-word with
+    any tkeep bit set, so only sub-words carrying data are sent. A null
+    word with tlast still sends its first sub-word to end the packet.
+    """
 
     def __init__(
         self,
@@ -12,12 +22,17 @@ class AXIStreamWidthConverterDown(Elaboratable):
         data_w_o: int,
         user_w_i: int,
         no_tkeep = False,
+        compact: bool = False,
     ):
         assert data_w_i > 0
         assert data_w_o > 0
         assert user_w_i >= 0
         # assert data_w_o % 8 == 0
         assert data_w_i % data_w_o == 0
+        assert not compact or (not no_tkeep and data_w_o % 8 == 0), (
+            'compact requires tkeep and byte sized sub-words'
+        )
+        self.compact = compact
         assert (user_w_i * data_w_o) % data_w_i == 0
         user_w_o = (user_w_i * data_w_o) // data_w_i
         self.sink = AXI4StreamSignature.create_slave(
@@ -50,6 +65,10 @@ class AXIStreamWidthConverterDown(Elaboratable):
             (name, member.shape) for name, member in self.sink.signature.members.items() if name not in ['tvalid', 'tready']
         ])
 
+        if self.compact:
+            self.elaborate_compact(m, buffer, convertion_ratio)
+            return m
+
         beats_remaining  = Signal(range(convertion_ratio))
         is_last_subchunk = Signal()
         # only_null_bytes_remaining: if only null bytes (bytes w/ tkeep = 0) are
@@ -85,7 +104,52 @@ class AXIStreamWidthConverterDown(Elaboratable):
 
         return m
 
+    def elaborate_compact(self, m, buffer, convertion_ratio):
+        keep_w = len(self.source.tkeep)
+
+        # Sub-words of the buffer still to be sent
+        pending = Signal(convertion_ratio)
+        sink_not_null = Signal(convertion_ratio)
+        sink_pending = Signal(convertion_ratio)
+        m.d.comb += [
+            sink_not_null.eq(Cat(*[
+                self.sink.tkeep.word_select(i, keep_w).any()
+                for i in range(convertion_ratio)
+            ])),
+            sink_pending.eq(Mux(self.sink.tlast & ~sink_not_null.any(), 1, sink_not_null)),
+        ]
+
+        m.submodules.next_subchunk = next_subchunk = PriorityEncoder(convertion_ratio)
+        index = next_subchunk.o
+        is_last_subchunk = Signal()
+        m.d.comb += [
+            next_subchunk.i         .eq(pending),
+            is_last_subchunk        .eq((pending & (pending - 1)) == 0),
+            self.source.tvalid      .eq(pending.any()),
+            self.sink.tready        .eq(~pending.any() | (self.source.tready & is_last_subchunk)),
+            *[self.source[key]      .eq(buffer[key].word_select(index, len(self.source[key])))
+              for key in buffer.fields if key != 'tlast'],
+            self.source.tlast       .eq(buffer.tlast & is_last_subchunk),
+        ]
+
+        with m.If(self.sink.accepted()):
+            m.d.sync += [
+                *[buffer[key]       .eq(self.sink[key]) for key in buffer.fields],
+                pending             .eq(sink_pending),
+            ]
+        with m.Elif(self.source.accepted()):
+            m.d.sync += pending.eq(pending & (pending - 1))  # Clear the lowest bit
+
 class AXIStreamWidthConverterUp(Elaboratable):
+    """Up converter by an integer ratio.
+
+    Input beats are assembled in a buffer separate from the (registered)
+    source, so the sink keeps accepting the next word while the previous
+    one waits to be read, and a tlast before the word is complete sends
+    it right away, padded with null sub-words. The sink only stalls when
+    both the buffer and the source hold a complete word and the source is
+    not being read.
+    """
 
     def __init__(
         self,
@@ -127,51 +191,214 @@ class AXIStreamWidthConverterUp(Elaboratable):
         data_w_o = len(self.source.tdata)
         convertion_ratio = data_w_o // data_w_i
 
-        buffer = Record([
-            (name, member.shape) for name, member in self.source.signature.members.items() if name not in ['tvalid', 'tready']
-        ])
-
-        beats_remaining     = Signal(range(convertion_ratio), init=convertion_ratio-1)
-        is_last_subchunk    = Signal()
-        padding             = Signal()
-        ready               = Signal()
+        # Double buffer: input beats are written in their slot of buffer
+        # while the previous word waits in the source registers. A word
+        # completed with the source busy stays in buffer (buffer_full).
+        keys = [key for key in self.source.signature.members if key not in ['tvalid', 'tready', 'tlast']]
+        buffer = {key: Signal(len(self.source[key]), name=f'buffer_{key}') for key in keys}
+        buffer_last = Signal()
+        buffer_full = Signal()
+        index = Signal(range(convertion_ratio))
+        is_last_subchunk = Signal()
+        source_ready = Signal()
+
+        # Word completed with the current input beat, slots above it null
+        word = {
+            key: Cat(*[
+                Mux(i < index, buffer[key].word_select(i, len(self.sink[key])),
+                    Mux(i == index, self.sink[key], 0))
+                for i in range(convertion_ratio)
+            ])
+            for key in keys
+        }
 
         m.d.comb += [
-            is_last_subchunk    .eq(~beats_remaining.any()),
-            *[self.source[key]  .eq(buffer[key]) for key in buffer.fields],
-            ready               .eq(~self.source.tvalid | self.source.tready),
-            self.sink.tready    .eq(~padding & ready),
+            is_last_subchunk    .eq((index == convertion_ratio - 1) | self.sink.tlast),
+            source_ready        .eq(~self.source.tvalid | self.source.tready),
+            self.sink.tready    .eq(~buffer_full | source_ready),
         ]
         with m.If(self.source.tready):
             m.d.sync += self.source.tvalid.eq(0)
 
-        with m.If(ready & (self.sink.tvalid | padding)):
-            with m.If(padding):
-                m.d.sync += [buffer[key].eq(buffer[key][len(self.sink[key]):]) for key in buffer.fields if key != 'tlast']
+        with m.If(buffer_full & source_ready):
+            m.d.sync += [
+                *[self.source[key]  .eq(buffer[key]) for key in keys],
+                self.source.tlast   .eq(buffer_last),
+                self.source.tvalid  .eq(1),
+                buffer_full         .eq(0),
+            ]
+
+        with m.If(self.sink.accepted() & is_last_subchunk):
+            m.d.sync += index.eq(0)
+            with m.If(source_ready & ~buffer_full):
+                m.d.sync += [
+                    *[self.source[key]  .eq(word[key]) for key in keys],
+                    self.source.tlast   .eq(self.sink.tlast),
+                    self.source.tvalid  .eq(1),
+                    ]
             with m.Else():
                 m.d.sync += [
-                    *[buffer[key]       .eq(Cat(buffer[key][len(self.sink[key]):], self.sink[key])) for key in buffer.fields if key != 'tlast'],
-                    buffer.tlast        .eq(self.sink.tlast),
-                    padding             .eq(self.sink.tlast),
+                    *[buffer[key]       .eq(word[key]) for key in keys],
+                    buffer_last         .eq(self.sink.tlast),
+                    buffer_full         .eq(1),
                 ]
+        with m.Elif(self.sink.accepted()):
+            m.d.sync += [
+                *[buffer[key].word_select(index, len(self.sink[key])).eq(self.sink[key]) for key in keys],
+                index.eq(index + 1),
+            ]
+
+        return m
+
+class AXIStreamWidthConverterGearbox(Elaboratable):
+    """Width converter between arbitrary widths, without an intermediate
+    lcm(data_w_i, data_w_o) stage.
+
+    Data is handled in units of gcd(data_w_i, data_w_o) bits (with their
+    tkeep and tuser bits) stored in a shift register of an output beat
+    plus an input beat rounded up to whole output beats. The source is
+    registered and fed from the bottom of the register, and input beats
+    are appended above the units left, so the sink sustains one beat per
+    cycle as long as the source is not the bottleneck.
+
+    At the end of a packet the tail is padded with null units (tkeep = 0)
+    up to an output beat boundary when the tlast beat is accepted, and
+    the beat is marked as the last one of the packet, so the next packet
+    is appended without waiting (no bubbles between short packets). With
+    tkeep, trailing null units of the input tlast beat are discarded, so
+    no fully null output beat is generated.
+    """
+
+    def __init__(
+        self,
+        data_w_i: int,
+        data_w_o: int,
+        user_w_i: int,
+        no_tkeep = False,
+    ):
+        assert data_w_i > 0
+        assert data_w_o > 0
+        assert user_w_i >= 0
+        unit_w = math.gcd(data_w_i, data_w_o)
+        self.units_i = data_w_i // unit_w
+        self.units_o = data_w_o // unit_w
+        assert user_w_i % self.units_i == 0
+        assert no_tkeep or unit_w % 8 == 0
+        self.user_w_o = (user_w_i // self.units_i) * self.units_o
+        self.sink = AXI4StreamSignature.create_slave(
+            data_w=data_w_i,
+            user_w=user_w_i,
+            no_tkeep=no_tkeep,
+            path=['s_axis'],
+        )
+        self.source = AXI4StreamSignature.create_master(
+            data_w=data_w_o,
+            user_w=self.user_w_o,
+            no_tkeep=no_tkeep,
+            path=['m_axis'],
+        )
 
-            with m.If(is_last_subchunk):
+        self.has_tkeep = not no_tkeep
+        self.has_tuser = user_w_i > 0
+
+    def get_ports(self):
+        return self.sink.extract_signals() + self.source.extract_signals()
+
+    def elaborate(self, platform):
+        m = Module()
+
+        units_i = self.units_i
+        units_o = self.units_o
+        # Room for a full output beat plus an input beat padded to a whole
+        # number of output beats
+        n_beats = 1 + -(-units_i // units_o)
+        capacity = n_beats * units_o
+
+        keys = ['tdata'] + (['tkeep'] if self.has_tkeep else []) + (['tuser'] if self.has_tuser else [])
+        unit_w = {key: len(self.sink[key]) // units_i for key in keys}
+        buffer = {key: Signal(capacity * unit_w[key], name=f'buffer_{key}') for key in keys}
+
+        count       = Signal(range(capacity + 1))   # Units in the buffer
+        ends        = Signal(n_beats)               # Output beats of the buffer with tlast
+        count_left  = Signal(range(capacity + 1))   # Units left after the output
+        ends_left   = Signal(n_beats)
+        units_in    = Signal(range(units_i + 1))    # Units taken from the input beat
+        count_next  = Signal(range(capacity + 1))   # Units after the input beat
+        padded      = Signal(range(capacity + 1))   # count_next up to a whole output beat
+        end_mask    = Signal(n_beats)               # Output beat ending at padded
+        out_fire    = Signal()
+
+        m.d.comb += [
+            self.source.tvalid  .eq(count >= units_o),
+            self.source.tlast   .eq(ends[0]),
+            *[self.source[key]  .eq(buffer[key][:len(self.source[key])]) for key in keys],
+            out_fire            .eq(self.source.tvalid & self.source.tready),
+            count_left          .eq(Mux(out_fire, count - units_o, count)),
+            ends_left           .eq(Mux(out_fire, ends >> 1, ends)),
+            units_in            .eq(units_i),
+            count_next          .eq(count_left + units_in),
+            # The previous packet ends at an output beat boundary, so the
+            # next one is appended right away
+            self.sink.tready    .eq(count_left <= units_o),
+        ]
+        with m.Switch(count_next):
+            for value in range(1, capacity + 1):
+                with m.Case(value):
+                    beats = -(-value // units_o)
+                    m.d.comb += [
+                        padded.eq(beats * units_o),
+                        end_mask.eq(1 << (beats - 1)),
+                    ]
+        if self.has_tkeep:
+            # Trailing null units of the last beat are not taken
+            with m.If(self.sink.tlast):
+                m.d.comb += units_in.eq(1)
+                for i in range(1, units_i):
+                    with m.If(self.sink.tkeep.word_select(i, unit_w['tkeep']).any()):
+                        m.d.comb += units_in.eq(i + 1)
+
+        shifted = {
+            key: Mux(out_fire, buffer[key] >> (units_o * unit_w[key]), buffer[key])
+            for key in keys
+        }
+        taken = {
+            key: self.sink[key] & Cat(*[(i < units_in).replicate(unit_w[key]) for i in range(units_i)])
+            for key in keys
+        }
+        with m.If(self.sink.accepted()):
+            m.d.sync += [
+                *[buffer[key].eq(shifted[key] | (taken[key] << (count_left * unit_w[key]))) for key in keys],
+                count   .eq(count_next),
+                ends    .eq(ends_left),
+            ]
+            # The end of the packet is padded with null units
+            with m.If(self.sink.tlast):
                 m.d.sync += [
-                    beats_remaining     .eq(convertion_ratio - 1),
-                    padding             .eq(0),
-                    self.source.tvalid  .eq(1),
+                    count   .eq(padded),
+                    ends    .eq(ends_left | end_mask),
                 ]
-            with m.Else():
-                m.d.sync += beats_remaining.eq(beats_remaining - 1)
+        with m.Else():
+            m.d.sync += [
+                *[buffer[key].eq(shifted[key]) for key in keys],
+                count   .eq(count_left),
+                ends    .eq(ends_left),
+            ]
 
         return m
 
 class AXIStreamWidthConverter(Elaboratable):
+    """Width converter. Integer ratios use the up or down converters, and
+    other ratios an up converter to lcm(data_w_i, data_w_o) followed by a
+    down converter. With gearbox, AXIStreamWidthConverterGearbox converts
+    directly between any two different widths. compact is passed to the
+    down converter (see AXIStreamWidthConverterDown).
+    """
 
     NONE    = 0
     UP      = 1
     DOWN    = 2
     BOTH    = 3
+    GEARBOX = 4
 
     def __init__(
         self,
@@ -179,12 +406,26 @@ class AXIStreamWidthConverter(Elaboratable):
         data_w_o: int,
         user_w_i: int,
         no_tkeep = False,
+        gearbox: bool = False,
+        compact: bool = False,
     ):
         assert data_w_i > 0
         assert data_w_o > 0
         assert user_w_i >= 0
+        assert not (gearbox and compact), 'compact is not supported by the gearbox'
 
-        if data_w_i == data_w_o:
+        if gearbox and data_w_i != data_w_o:
+            self.convertion_mode = self.GEARBOX
+            self.converter = AXIStreamWidthConverterGearbox(
+                data_w_i = data_w_i,
+                data_w_o = data_w_o,
+                user_w_i = user_w_i,
+                no_tkeep = no_tkeep
+            )
+            self.sink = self.converter.sink
+            self.source = self.converter.source
+
+        elif data_w_i == data_w_o:
             self.convertion_mode = self.NONE
             self.sink = AXI4StreamSignature.create_slave(
                 data_w=data_w_i,
@@ -205,7 +446,8 @@ class AXIStreamWidthConverter(Elaboratable):
                 data_w_i = data_w_i,
                 data_w_o = data_w_o,
                 user_w_i = user_w_i,
-                no_tkeep = no_tkeep
+                no_tkeep = no_tkeep,
+                compact = compact,
             )
             self.sink = self.converter.sink
             self.source = self.converter.source
@@ -235,6 +477,7 @@ class AXIStreamWidthConverter(Elaboratable):
                 data_w_o = data_w_o,
                 user_w_i = self.converter_up.user_w_o,
                 no_tkeep = no_tkeep,
+                compact = compact,
             )
 
             self.sink = self.converter_up.sink
@@ -245,7 +488,7 @@ class AXIStreamWidthConverter(Elaboratable):
 
     def elaborate(self, platform):
         m = Module()
-        if self.convertion_mode in [self.DOWN, self.UP]:
+        if self.convertion_mode in [self.DOWN, self.UP, self.GEARBOX]:
             m.submodules.converter = self.converter
         elif self.convertion_mode == self.NONE:
             self.sink.as_master().connect(m, self.source.as_slave())
@@ -255,15 +498,17 @@ class AXIStreamWidthConverter(Elaboratable):
             self.converter_up.source.connect(m, self.converter_down.sink)
         return m
 
-def parse_args(sys_args=None):
-    import argparse
-    parser = argparse.ArgumentParser()
+def add_arguments(parser):
     parser.add_argument('-dwi', '--data-width-in', type=int, required=True,
                         help='Data width in bits')
     parser.add_argument('-dwo', '--data-width-out', type=int, required=True,
                         help='Data width out bits')
     parser.add_argument('-uwi', '--user-width-in', type=int, required=True,
                         help='User width in bits')
+    parser.add_argument('--gearbox', action='store_true',
+                        help='Convert directly, without an lcm intermediate width')
+    parser.add_argument('--compact', action='store_true',
+                        help='Skip null sub-words (tkeep = 0) when down converting')
     parser.add_argument('-rstn', '--active-low-reset', action='store_true',
                         help='Use active low reset (default is active high)')
     parser.add_argument('-n', '--name', type=str,
@@ -271,27 +516,40 @@ def parse_args(sys_args=None):
     parser.add_argument('--prefix', type=str,
                         default='', help='Module names prefix')
 
+
+def parse_args(sys_args=None):
+    import argparse
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
     return parser.parse_args(sys_args)
 
 
-def main(sys_args=None):
-    from hdl_utils.amaranth_utils.generate_verilog import generate_verilog
-    args = parse_args(sys_args)
+def create_core(args) -> tuple[Elaboratable, str]:
     core = AXIStreamWidthConverter(
         data_w_i=args.data_width_in,
         data_w_o=args.data_width_out,
         user_w_i=args.user_width_in,
+        gearbox=args.gearbox,
+        compact=args.compact,
     )
     name = args.name or {
         AXIStreamWidthConverter.DOWN: 'axi_stream_width_converter_down',
         AXIStreamWidthConverter.UP: 'axi_stream_width_converter_up',
         AXIStreamWidthConverter.BOTH: 'axi_stream_width_converter_frac',
+        AXIStreamWidthConverter.GEARBOX: 'axi_stream_width_converter_gearbox',
         AXIStreamWidthConverter.NONE: 'axi_stream_pass_through',
     }[core.convertion_mode]
 
     if args.active_low_reset:
         from hdl_utils.amaranth_utils.rstn_wrapper import RstnWrapper
-        core = RstnWrapper(core=core, domain=args.rd_domain)
+        core = RstnWrapper(core=core, domain="sync")
+    return core, name
+
+
+def main(sys_args=None):
+    from hdl_utils.amaranth_utils.generate_verilog import generate_verilog
+    args = parse_args(sys_args)
+    core, name = create_core(args)
     ports = core.get_ports()
     output = generate_verilog(
         core=core,
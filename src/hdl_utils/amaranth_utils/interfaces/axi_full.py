@@ -59,55 +59,55 @@ class AXI4Signature(wiring.Signature):
         self.data_w = data_w
         layout = {
             # Address write channel
-            "AWID": In(id_w),
-            "AWADDR": In(addr_w),
-            "AWLEN": In(8),  # burst length = awlen + 1
-            "AWSIZE": In(3),  # Bytes in transfer = 2 ** AWSIZE (se usa para calcular addr con bursts. Fijar por ancho del bus!)
-            "AWBURST": In(2),
-            "AWLOCK": In(1),  # keep at 0
-            "AWCACHE": In(4),  # keep at 0x3
-            "AWPROT": In(3),  # keep at 0
-            "AWQOS": In(4),  # set to 0xf for SDI IN/OUT, set to 0 for others
-            "AWREGION": In(4),  # keep at 0
-            "AWUSER": In(user_w),
-            "AWVALID": In(1),
-            "AWREADY": Out(1),
+            "AWID": Out(id_w),
+            "AWADDR": Out(addr_w),
+            "AWLEN": Out(8),  # burst length = awlen + 1
+            "AWSIZE": Out(3),  # Bytes in transfer = 2 ** AWSIZE (se usa para calcular addr con bursts. Fijar por ancho del bus!)
+            "AWBURST": Out(2),
+            "AWLOCK": Out(1),  # keep at 0
+            "AWCACHE": Out(4),  # keep at 0x3
+            "AWPROT": Out(3),  # keep at 0
+            "AWQOS": Out(4),  # set to 0xf for SDI IN/OUT, set to 0 for others
+            "AWREGION": Out(4),  # keep at 0
+            "AWUSER": Out(user_w),
+            "AWVALID": Out(1),
+            "AWREADY": In(1),
             # Write channel
-            "WID": In(id_w),
-            "WDATA": In(data_w),
-            "WSTRB": In(data_w // 8),
-            "WLAST": In(1),
-            "WUSER": In(user_w),
-            "WVALID": In(1),
-            "WREADY": Out(1),
+            "WID": Out(id_w),
+            "WDATA": Out(data_w),
+            "WSTRB": Out(data_w // 8),
+            "WLAST": Out(1),
+            "WUSER": Out(user_w),
+            "WVALID": Out(1),
+            "WREADY": In(1),
             # Write response channel
-            "BID": Out(id_w),
-            "BRESP": Out(2),
-            "BUSER": Out(user_w),
-            "BVALID": Out(1),
-            "BREADY": In(1),
+            "BID": In(id_w),
+            "BRESP": In(2),
+            "BUSER": In(user_w),
+            "BVALID": In(1),
+            "BREADY": Out(1),
             # Address read channel
-            "ARID": In(id_w),
-            "ARADDR": In(addr_w),
-            "ARLEN": In(8),  # burst length = awlen + 1
-            "ARSIZE": In(3),  # Bytes in transfer = 2 ** AWSIZE (se usa para calcular addr con bursts. Fijar por ancho del bus!)
-            "ARBURST": In(2),
-            "ARLOCK": In(1),  # keep at 0
-            "ARCACHE": In(4),  # keep at 0x3
-            "ARPROT": In(3),  # keep at 0
-            "ARQOS": In(4),  # set to 0xf for SDI IN/OUT, set to 0 for others
-            "ARREGION": In(4),  # keep at 0
-            "ARUSER": In(user_w),
-            "ARVALID": In(1),
-            "ARREADY": Out(1),
+            "ARID": Out(id_w),
+            "ARADDR": Out(addr_w),
+            "ARLEN": Out(8),  # burst length = awlen + 1
+            "ARSIZE": Out(3),  # Bytes in transfer = 2 ** AWSIZE (se usa para calcular addr con bursts. Fijar por ancho del bus!)
+            "ARBURST": Out(2),
+            "ARLOCK": Out(1),  # keep at 0
+            "ARCACHE": Out(4),  # keep at 0x3
+            "ARPROT": Out(3),  # keep at 0
+            "ARQOS": Out(4),  # set to 0xf for SDI IN/OUT, set to 0 for others
+            "ARREGION": Out(4),  # keep at 0
+            "ARUSER": Out(user_w),
+            "ARVALID": Out(1),
+            "ARREADY": In(1),
             # Read channel
-            "RID": Out(id_w),
-            "RDATA": Out(data_w),
-            "RLAST": Out(1),
-            "RUSER": Out(user_w),
-            "RVALID": Out(1),
-            "RREADY": In(1),
-            "RRESP": Out(2),
+            "RID": In(id_w),
+            "RDATA": In(data_w),
+            "RLAST": In(1),
+            "RUSER": In(user_w),
+            "RVALID": In(1),
+            "RREADY": Out(1),
+            "RRESP": In(2),
         }
         if user_w == 0:
             del layout['AWUSER'], layout['WUSER'], layout['ARUSER'], layout['RUSER'], layout['BUSER']
@@ -25,23 +25,23 @@ class AXI4LiteSignature(wiring.Signature):
         self.addr_w = addr_w
         self.data_w = data_w
         layout = {
-            "AWADDR": In(addr_w),
-            "AWVALID": In(1),
-            "AWREADY": Out(1),
-            "WDATA": In(data_w),
-            "WSTRB": In(data_w // 8),
-            "WVALID": In(1),
-            "WREADY": Out(1),
-            "BRESP": Out(2),
-            "BVALID": Out(1),
-            "BREADY": In(1),
-            "ARADDR": In(addr_w),
-            "ARVALID": In(1),
-            "ARREADY": Out(1),
-            "RDATA": Out(data_w),
-            "RRESP": Out(2),
-            "RVALID": Out(1),
-            "RREADY": In(1),
+            "AWADDR": Out(addr_w),
+            "AWVALID": Out(1),
+            "AWREADY": In(1),
+            "WDATA": Out(data_w),
+            "WSTRB": Out(data_w // 8),
+            "WVALID": Out(1),
+            "WREADY": In(1),
+            "BRESP": In(2),
+            "BVALID": In(1),
+            "BREADY": Out(1),
+            "ARADDR": Out(addr_w),
+            "ARVALID": Out(1),
+            "ARREADY": In(1),
+            "RDATA": In(data_w),
+            "RRESP": In(2),
+            "RVALID": In(1),
+            "RREADY": Out(1),
 
         }
         super().__init__(layout)
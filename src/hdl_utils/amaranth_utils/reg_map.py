@@ -1,5 +1,4 @@
 from __future__ import annotations
-import copy
 from dataclasses import dataclass, field
 import numpy as np
 
@@ -29,6 +28,18 @@ class Register:
         )
 
 
+@dataclass(kw_only=True)
+class RegisterArray:
+    """Memory-backed array of registers (e.g. a LUT), mapped to block RAM
+    in AxiLiteDevice. It occupies an address window aligned to its size.
+    """
+    name: str
+    depth: int
+    width: int
+    dir: str = 'rw'
+    force_addr: int = field(default=None)
+
+
 def create_register_map_entry(
     reg: Register,
     addr: int,
@@ -78,17 +89,29 @@ class RegisterMapFactory:
     def __init__(self, reg_width: int = 32):
         self.reg_width = reg_width
         self._reg_map = []
-        self._addr_in_use = []
+        self._reg_arrays = []
+        self._addr_in_use = set()
+        # All addresses below the free pointer are in use. Allocation without
+        # start address resumes from it instead of scanning from zero.
+        self._free_ptr = 0x0
+        self._highest_addr = None
 
     @property
     def addr_jump(self) -> int:
         return self.reg_width // 8
 
+    def _mark_in_use(self, addr: int):
+        self._addr_in_use.add(addr)
+        if self._highest_addr is None or addr > self._highest_addr:
+            self._highest_addr = addr
+        while self._free_ptr in self._addr_in_use:
+            self._free_ptr += self.addr_jump
+
     def find_available_addr(self, start_from: int = 0x0) -> int:
         addr = start_from
-        while True:
-            if addr not in self._addr_in_use:
-                break
+        if addr <= self._free_ptr and (self._free_ptr - addr) % self.addr_jump == 0:
+            addr = self._free_ptr
+        while addr in self._addr_in_use:
             addr += self.addr_jump
         return addr
 
@@ -100,7 +123,7 @@ class RegisterMapFactory:
         )
         entry = create_register_map_entry(reg=reg, addr=addr)
         self._reg_map.append(entry)
-        self._addr_in_use.append(addr)
+        self._mark_in_use(addr)
         return entry
 
     def allocate_registers(self, registers: list[Register]):
@@ -114,10 +137,294 @@ class RegisterMapFactory:
         for reg in regs_not_forced_addr:
             self.add_entry(reg=reg)
 
+    def array_window_size(self, depth: int) -> int:
+        return (1 << int(np.ceil(np.log2(depth)))) * self.addr_jump
+
+    def is_window_available(self, addr: int, size: int) -> bool:
+        return not any(
+            a in self._addr_in_use
+            for a in range(addr, addr + size, self.addr_jump)
+        )
+
+    def find_available_window(self, size: int, start_from: int = 0x0) -> int:
+        # Windows below the free pointer are (at least partially) in use.
+        addr = max(start_from, self._free_ptr - self._free_ptr % size)
+        while not self.is_window_available(addr, size):
+            addr += size
+        return addr
+
+    def add_register_array(self, array: RegisterArray, addr: int = None):
+        size = self.array_window_size(array.depth)
+        if addr is None:
+            addr = self.find_available_window(size)
+        assert addr % size == 0, (
+            f'Register array {array.name} address {hex(addr)} not aligned to {hex(size)}'
+        )
+        assert self.is_window_available(addr, size), (
+            f'Conflicting address for register array {array.name}: '
+            f'[{hex(addr)}, {hex(addr + size)}) already in use'
+        )
+        entry = (array.name, array.dir, addr, array.depth, array.width)
+        self._reg_arrays.append(entry)
+        for a in range(addr, addr + size, self.addr_jump):
+            self._mark_in_use(a)
+        return entry
+
+    def allocate_register_arrays(self, arrays: list[RegisterArray]):
+        # Same as registers: fixed addresses first. Biggest arrays first to
+        # reduce fragmentation of the address space.
+        arrays_forced_addr = [a for a in arrays if a.force_addr is not None]
+        arrays_not_forced_addr = [a for a in arrays if a.force_addr is None]
+        arrays_not_forced_addr.sort(key=lambda a: a.depth, reverse=True)
+        for array in arrays_forced_addr:
+            self.add_register_array(array=array, addr=array.force_addr)
+        for array in arrays_not_forced_addr:
+            self.add_register_array(array=array)
+
+    def generate_register_arrays(self) -> list:
+        # Entries are tuples of immutable values, a shallow copy is enough.
+        return list(self._reg_arrays)
+
     def generate_register_map(self) -> list:
-        return copy.deepcopy(self._reg_map)
+        # Only the fields lists are mutable: copy them instead of deep
+        # copying the whole map.
+        return [
+            (name, dir, addr, default, list(fields))
+            for name, dir, addr, default, fields in self._reg_map
+        ]
 
     def get_min_addr_width(self) -> int:
         assert self.addr_jump in (4, 8)
-        highest_addr = max(self._addr_in_use)
-        return int(np.ceil(np.log2(highest_addr + self.addr_jump)))
+        return int(np.ceil(np.log2(self._highest_addr + self.addr_jump)))
+
+    def export(self, prefix: str = '', **kwargs) -> dict:
+        """Export the register map and register arrays. See export_register_map()."""
+        return export_register_map(
+            registers_map=self._reg_map,
+            register_arrays=self._reg_arrays,
+            reg_width=self.reg_width,
+            prefix=prefix,
+            **kwargs,
+        )
+
+
+class RegisterMapComposer:
+    """
+    Merge the register maps of several blocks into a single map, to be
+    served by a single AxiLiteDevice instead of one device per block behind
+    an interconnect.
+
+    Each block gets an address window aligned to its size (the span of its
+    map rounded up to a power of two). Register, field and register array
+    names are prefixed with the block name so they stay unique. The windows
+    can be passed to AxiLiteDevice to decode the block on the window bits
+    first and then the register within the block.
+    """
+
+    def __init__(self, reg_width: int = 32):
+        self.reg_width = reg_width
+        self._blocks = []
+        self._windows = None
+
+    def add_block(self, name: str, factory: RegisterMapFactory, force_addr: int = None):
+        assert self._windows is None, 'Windows already allocated'
+        assert factory.reg_width == self.reg_width, (
+            f'Block {name} register width {factory.reg_width} != {self.reg_width}'
+        )
+        assert name not in [b[0] for b in self._blocks], f'Duplicated block: {name}'
+        self._blocks.append((name, factory, force_addr))
+
+    def allocate(self):
+        # Windows are allocated like register arrays: aligned to their size,
+        # forced addresses first and biggest first.
+        allocator = RegisterMapFactory(reg_width=self.reg_width)
+        allocator.allocate_register_arrays([
+            RegisterArray(
+                name=name,
+                depth=(1 << factory.get_min_addr_width()) // factory.addr_jump,
+                width=self.reg_width,
+                force_addr=force_addr,
+            )
+            for name, factory, force_addr in self._blocks
+        ])
+        self._windows = {
+            name: (addr, allocator.array_window_size(depth))
+            for name, _, addr, depth, _ in allocator.generate_register_arrays()
+        }
+
+    def generate_windows(self) -> list:
+        """List of (name, addr, size) entries, one per block."""
+        if self._windows is None:
+            self.allocate()
+        return [
+            (name, *self._windows[name])
+            for name, _, _ in self._blocks
+        ]
+
+    def generate_block_register_map(self, name: str) -> list:
+        """Register map of a block with prefixed names, relative to its
+        window (e.g. for an AxiLiteDevice behind an AxiLiteInterconnect).
+        """
+        factory = self._blocks[[b[0] for b in self._blocks].index(name)][1]
+        return [
+            (f'{name}_{r_name}', r_dir, r_addr, r_default, [
+                (f'{name}_{f_name}', f_width, f_offset)
+                for f_name, f_width, f_offset in r_fields
+            ])
+            for r_name, r_dir, r_addr, r_default, r_fields in factory._reg_map
+        ]
+
+    def generate_block_register_arrays(self, name: str) -> list:
+        factory = self._blocks[[b[0] for b in self._blocks].index(name)][1]
+        return [
+            (f'{name}_{a_name}', a_dir, a_addr, a_depth, a_width)
+            for a_name, a_dir, a_addr, a_depth, a_width in factory._reg_arrays
+        ]
+
+    def generate_register_map(self) -> list:
+        return [
+            (r_name, r_dir, base + r_addr, r_default, r_fields)
+            for name, base, _ in self.generate_windows()
+            for r_name, r_dir, r_addr, r_default, r_fields
+            in self.generate_block_register_map(name)
+        ]
+
+    def generate_register_arrays(self) -> list:
+        return [
+            (a_name, a_dir, base + a_addr, a_depth, a_width)
+            for name, base, _ in self.generate_windows()
+            for a_name, a_dir, a_addr, a_depth, a_width
+            in self.generate_block_register_arrays(name)
+        ]
+
+    def get_min_addr_width(self) -> int:
+        return int(np.ceil(np.log2(max(
+            addr + size for _, addr, size in self.generate_windows()
+        ))))
+
+    def export(self, prefix: str = '', **kwargs) -> dict:
+        """Export the merged map. See export_register_map()."""
+        return export_register_map(
+            registers_map=self.generate_register_map(),
+            register_arrays=self.generate_register_arrays(),
+            reg_width=self.reg_width,
+            prefix=prefix,
+            **kwargs,
+        )
+
+
+def _c_name(*parts) -> str:
+    return '_'.join([p for p in parts if p]).upper()
+
+
+def export_register_map(
+    registers_map: list,
+    register_arrays: list = None,
+    reg_width: int = 32,
+    prefix: str = '',
+    c_header: str = None,
+    json_file: str = None,
+    py_module: str = None,
+) -> dict:
+    """
+    Export a register map (and register arrays) to several formats in a
+    single pass over the entries.
+
+    parameters:
+        registers_map: list
+            Output of RegisterMapFactory.generate_register_map().
+
+        register_arrays: list
+            Output of RegisterMapFactory.generate_register_arrays().
+
+        prefix: str
+            Prefix for the C macros.
+
+        c_header, json_file, py_module: str
+            Output file paths. Formats without path are still generated and
+            returned, but not written.
+
+    returns a dict with the contents of each format ('c', 'json', 'py').
+    The python module defines REG_MAP and REG_ARRAYS as raw lists, that can
+    be loaded in testbenches with RegMap.from_reg_map_raw_list(REG_MAP).
+    """
+    import json
+    register_arrays = register_arrays or []
+    guard = _c_name(prefix, 'REG_MAP_H')
+    c_lines = [
+        '/* Generated by hdl_utils. Do not edit. */',
+        f'#ifndef {guard}',
+        f'#define {guard}',
+        '',
+        f'#define {_c_name(prefix, "REG_WIDTH")} {reg_width}',
+    ]
+    json_regs = []
+    py_regs = []
+    for name, dir, addr, default, fields in registers_map:
+        reg = _c_name(prefix, name)
+        c_lines += ['', f'#define {reg}_ADDR 0x{addr:08x}']
+        if default is not None:
+            c_lines += [f'#define {reg}_DEFAULT 0x{default:08x}']
+        for f_name, f_width, f_offset in fields:
+            fld = _c_name(reg, f_name)
+            mask = ((1 << f_width) - 1) << f_offset
+            c_lines += [
+                f'#define {fld}_OFFSET {f_offset}',
+                f'#define {fld}_WIDTH {f_width}',
+                f'#define {fld}_MASK 0x{mask:08x}',
+            ]
+        json_regs.append({
+            'name': name,
+            'dir': dir,
+            'addr': addr,
+            'default': default,
+            'fields': [
+                {'name': f_name, 'width': f_width, 'offset': f_offset}
+                for f_name, f_width, f_offset in fields
+            ],
+        })
+        py_regs.append(f'    {(name, dir, addr, default, [tuple(f) for f in fields])!r},')
+    json_arrays = []
+    py_arrays = []
+    for name, dir, addr, depth, width in register_arrays:
+        arr = _c_name(prefix, name)
+        c_lines += [
+            '',
+            f'#define {arr}_ADDR 0x{addr:08x}',
+            f'#define {arr}_DEPTH {depth}',
+            f'#define {arr}_WIDTH {width}',
+        ]
+        json_arrays.append({
+            'name': name,
+            'dir': dir,
+            'addr': addr,
+            'depth': depth,
+            'width': width,
+        })
+        py_arrays.append(f'    {(name, dir, addr, depth, width)!r},')
+    c_lines += ['', f'#endif  /* {guard} */', '']
+    py_lines = [
+        '# Generated by hdl_utils. Do not edit.',
+        f'REG_WIDTH = {reg_width}',
+        'REG_MAP = [',
+        *py_regs,
+        ']',
+        'REG_ARRAYS = [',
+        *py_arrays,
+        ']',
+        '',
+    ]
+    outputs = {
+        'c': '\n'.join(c_lines),
+        'json': json.dumps({
+            'reg_width': reg_width,
+            'registers': json_regs,
+            'register_arrays': json_arrays,
+        }, indent=2),
+        'py': '\n'.join(py_lines),
+    }
+    for key, path in (('c', c_header), ('json', json_file), ('py', py_module)):
+        if path:
+            with open(path, 'w') as f:
+                f.write(outputs[key])
+    return outputs
@@ -0,0 +1,137 @@
+"""
+hdl-utils command line.
+
+    hdl-utils list
+    hdl-utils generate <core> [options] [--out FILE] [+ <core> [options] ...]
+
+Several variants can be generated in a single invocation by separating them
+with a standalone "+". Cores are registered by module path and only the
+modules of the selected cores are imported, so the cost of importing
+amaranth is paid once per invocation and only if something is generated.
+
+Every registered module must provide:
+    add_arguments(parser): add the core options to an argparse parser.
+    create_core(args) -> (core, name): build the elaboratable and its name.
+"""
+
+import argparse
+import importlib
+import sys
+
+
+__all__ = [
+    'CORES',
+    'VARIANT_SEPARATOR',
+    'register_core',
+    'load_core_module',
+    'split_variants',
+    'generate',
+    'main',
+]
+
+
+VARIANT_SEPARATOR = '+'
+
+# Core name -> module path. Modules are imported on demand.
+CORES = {
+    'skid_buffer': 'hdl_utils.amaranth_utils.skid_buffer',
+    'axi_stream_fifo': 'hdl_utils.amaranth_utils.axi_stream_fifo',
+    'axi_stream_width_converter': 'hdl_utils.amaranth_utils.axi_stream_width_converter',
+    'axi_stream_packet_rate_limiter': 'hdl_utils.amaranth_utils.axi_stream_packet_rate_limiter',
+    'axi_stream_to_full': 'hdl_utils.amaranth_utils.axi_stream_to_full',
+    'axi_lite_interconnect': 'hdl_utils.amaranth_utils.axi_lite_interconnect',
+    'axi_arbiter': 'hdl_utils.amaranth_utils.axi_arbiter',
+}
+
+
+def register_core(name: str, module: str):
+    assert name not in CORES, f'Core already registered: {name}'
+    CORES[name] = module
+
+
+def load_core_module(name: str):
+    if name not in CORES:
+        raise ValueError(
+            f'Unknown core: {name}. Available cores: {", ".join(sorted(CORES))}'
+        )
+    return importlib.import_module(CORES[name])
+
+
+def split_variants(sys_args: list[str]) -> list[list[str]]:
+    variants = [[]]
+    for arg in sys_args:
+        if arg == VARIANT_SEPARATOR:
+            variants.append([])
+        else:
+            variants[-1].append(arg)
+    return [v for v in variants if len(v)]
+
+
+def parse_variant_args(sys_args: list[str]):
+    name, core_args = sys_args[0], sys_args[1:]
+    module = load_core_module(name)
+    parser = argparse.ArgumentParser(prog=f'hdl-utils generate {name}')
+    parser.add_argument('-o', '--out', type=str, default=None,
+                        help='Output file (default: stdout)')
+    module.add_arguments(parser)
+    return module, parser.parse_args(core_args)
+
+
+def generate(sys_args: list[str]) -> list[str]:
+    """Generate the verilog of every variant in sys_args.
+
+    Returns the list of generated outputs, in the same order as the variants.
+    All variants are parsed before generating anything, so a typo in the last
+    one fails fast.
+    """
+    from hdl_utils.amaranth_utils.generate_verilog import generate_verilog
+    parsed = [parse_variant_args(v) for v in split_variants(sys_args)]
+    outputs = []
+    for module, args in parsed:
+        core, name = module.create_core(args)
+        output = generate_verilog(
+            core=core,
+            name=name,
+            ports=core.get_ports(),
+            prefix=args.prefix,
+        )
+        if args.out:
+            with open(args.out, 'w') as f:
+                f.write(output)
+        else:
+            print(output)
+        outputs.append(output)
+    return outputs
+
+
+def parse_args(sys_args=None):
+    parser = argparse.ArgumentParser(prog='hdl-utils')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='List available cores')
+    generate_parser = subparsers.add_parser(
+        'generate',
+        help='Generate verilog of one or more core variants',
+        description=(
+            'Generate verilog of one or more core variants. Separate variants '
+            f'with a standalone "{VARIANT_SEPARATOR}".'
+        ),
+    )
+    generate_parser.add_argument('core', choices=sorted(CORES),
+                                 help='Core name')
+    generate_parser.add_argument('core_args', nargs=argparse.REMAINDER,
+                                 help='Core options (see "<core> --help")')
+    return parser.parse_args(sys_args)
+
+
+def main(sys_args=None):
+    sys_args = sys.argv[1:] if sys_args is None else sys_args
+    args = parse_args(sys_args)
+    if args.command == 'list':
+        for name in sorted(CORES):
+            print(name)
+    elif args.command == 'generate':
+        generate([args.core, *args.core_args])
+
+
+if __name__ == '__main__':
+    main()
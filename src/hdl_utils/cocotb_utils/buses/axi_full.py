@@ -3,6 +3,7 @@ import cocotb
 from cocotb.binary import BinaryValue
 from cocotb.handle import SimHandleBase
 from cocotb.triggers import RisingEdge
+from typing import Callable
 
 from .bus import Bus, SignalInfo, DIR_OUTPUT, DIR_INPUT
 
@@ -72,6 +73,14 @@ class AXI4MasterBus(AXI4SlaveBus.flipped_bus()):
 
 
 class AXI4SlaveDriver:
+    """AXI4 memory slave.
+
+    write_response(awaddr, awlen) returns the BRESP of every write burst
+    (OKAY by default; the data is written anyway). With b_latency, the
+    write responses are sent by their own coroutine, in order, b_latency
+    cycles after the last beat of their burst, and the next burst is
+    accepted meanwhile. Otherwise every burst waits for its response.
+    """
 
     def __init__(
         self,
@@ -82,6 +91,8 @@ class AXI4SlaveDriver:
         baseaddr: int = 0,
         big_endian: bool = False,
         run_drivers: bool = True,
+        write_response: Callable[[int, int], int] = None,
+        b_latency: int = None,
     ):
         self.entity = entity
         self.name = name
@@ -89,6 +100,10 @@ class AXI4SlaveDriver:
         self.big_endian = big_endian
         self.baseaddr = baseaddr
         self._memory = memory
+        self.write_response = write_response
+        self.b_latency = b_latency
+        self._b_queue = []  # (cycle, BRESP, BID) of the pending responses
+        self._cycle = 0
         self.bus = AXI4SlaveBus(entity, name, clock)
         self.bus.init_signals()
 
@@ -98,6 +113,9 @@ class AXI4SlaveDriver:
     def run_drivers(self):
         cocotb.start_soon(self._read_data())
         cocotb.start_soon(self._write_data())
+        if self.b_latency is not None:
+            cocotb.start_soon(self._count_cycles())
+            cocotb.start_soon(self._write_responses())
 
     def _size_to_bytes_in_beat(self, AxSIZE):
         if AxSIZE <= 7:
@@ -107,9 +125,10 @@ class AXI4SlaveDriver:
     async def _write_data(self):
         await RisingEdge(self.clock)
         while True:
-            self.bus.BRESP.value = 0
+            if self.b_latency is None:
+                self.bus.BRESP.value = 0
+                self.bus.BVALID.value = 0
             self.bus.WREADY.value = 0
-            self.bus.BVALID.value = 0
             self.bus.AWREADY.value = 1
             await RisingEdge(self.clock)
             while not self.bus.AWVALID.value:
@@ -117,6 +136,7 @@ class AXI4SlaveDriver:
             _awaddr = int(self.bus.AWADDR)
             _awlen = int(self.bus.AWLEN)
             _awsize = int(self.bus.AWSIZE)
+            _awid = int(self.bus.AWID) if hasattr(self.bus, 'AWID') else 0
             self.bus.AWREADY.value = 0
 
             burst_length = _awlen + 1
@@ -135,18 +155,50 @@ class AXI4SlaveDriver:
                 start_addr = _awaddr + b * bytes_in_beat
                 end_addr = start_addr + bytes_in_beat
                 assert end_addr <= len(self._memory), f"out of range: {hex(end_addr)} > {hex(len(self._memory))}"
-                self._memory[start_addr:end_addr] = array.array('B', word.buff)
+                if hasattr(self.bus, 'WSTRB'):
+                    # Only the byte lanes with their strobe asserted are written
+                    strb = int(self.bus.WSTRB.value)
+                    for i, value in enumerate(word.buff):
+                        lane = bytes_in_beat - 1 - i if self.big_endian else i
+                        if (strb >> lane) & 1:
+                            self._memory[start_addr + i] = value
+                else:
+                    self._memory[start_addr:end_addr] = array.array('B', word.buff)
 
             if not self.bus.WLAST.value:
                 raise AXIProtocolError('WLAST != 1 when BURST Finished')
 
             self.bus.WREADY.value = 0
-            self.bus.BVALID.value = 1
-            self.bus.BRESP.value = 0
-            while not self.bus.BREADY.value:
+            bresp = 0 if self.write_response is None else self.write_response(_awaddr, _awlen)
+            if self.b_latency is not None:
+                self._b_queue.append((self._cycle + self.b_latency, bresp, _awid))
+                continue
+            await self._send_write_response(bresp, _awid)
+
+    async def _send_write_response(self, bresp: int, bid: int):
+        self.bus.BVALID.value = 1
+        self.bus.BRESP.value = bresp
+        if hasattr(self.bus, 'BID'):
+            # Responses carry the ID of the transaction
+            self.bus.BID.value = bid
+        await RisingEdge(self.clock)
+        while not self.bus.BREADY.value:
+            await RisingEdge(self.clock)
+        self.bus.BVALID.value = 0
+
+    async def _write_responses(self):
+        self.bus.BVALID.value = 0
+        while True:
+            if self._b_queue and self._b_queue[0][0] <= self._cycle:
+                _, bresp, bid = self._b_queue.pop(0)
+                await self._send_write_response(bresp, bid)
+            else:
                 await RisingEdge(self.clock)
 
-            self.bus.BVALID.value = 0
+    async def _count_cycles(self):
+        while True:
+            await RisingEdge(self.clock)
+            self._cycle += 1
 
     async def _read_data(self):
         await RisingEdge(self.clock)
@@ -163,6 +215,7 @@ class AXI4SlaveDriver:
             _arsize = int(self.bus.ARSIZE)
             _arburst = int(self.bus.ARBURST)
             _arprot = int(self.bus.ARPROT)
+            _arid = int(self.bus.ARID) if hasattr(self.bus, 'ARID') else 0
             # FIXME: ARBURST ignored and assumed to be INCR.
 
             burst_length = _arlen + 1
@@ -185,6 +238,8 @@ class AXI4SlaveDriver:
                 self.bus.RDATA.value = int(word, 16)
                 self.bus.RVALID.value = 1
                 self.bus.RLAST.value = 1 if (burst_count == 1) else 0
+                if hasattr(self.bus, 'RID'):
+                    self.bus.RID.value = _arid
                 await RisingEdge(self.clock)
                 while not (self.bus.RREADY.value.integer):
                     await RisingEdge(self.clock)
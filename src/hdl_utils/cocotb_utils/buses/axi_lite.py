@@ -115,6 +115,14 @@ class AXI4LiteBase:
     def rdata(self):
         return self.bus.RDATA.value.integer
 
+    @property
+    def bresp(self):
+        return self.bus.BRESP.value.integer
+
+    @property
+    def rresp(self):
+        return self.bus.RRESP.value.integer
+
 
 class AXI4LiteMasterDriver(AXI4LiteBase):
 
@@ -132,6 +140,9 @@ class AXI4LiteMasterDriver(AXI4LiteBase):
         # Mutex for each channel to prevent contention
         self.wr_busy = Lock(name + "_wr_busy")
         self.rd_busy = Lock(name + "_rd_busy")
+        # Response of the last write and read
+        self.last_bresp = None
+        self.last_rresp = None
 
     def create_reg_map(self, reg_map: list[tuple | list | Reg | None]):
         reg_map = reg_map or []
@@ -139,7 +150,15 @@ class AXI4LiteMasterDriver(AXI4LiteBase):
         reg_map_cls = RegMap.from_reg_map_raw_list if is_raw_list else RegMap
         return reg_map_cls(reg_map)
 
-    async def write_reg(self, addr: int, value: int):
+    @property
+    def strb_all_ones(self) -> int:
+        return (1 << len(self.bus.WSTRB)) - 1
+
+    async def write_reg(self, addr: int, value: int, strb: int = None):
+        """Write a register. strb selects the byte lanes to be written
+        (default: all of them).
+        """
+        strb = self.strb_all_ones if strb is None else strb
         async with self.wr_busy:
             self.bus.AWADDR.value = addr
             self.bus.AWVALID.value = 1
@@ -148,6 +167,7 @@ class AXI4LiteMasterDriver(AXI4LiteBase):
                 await RisingEdge(self.clock)
             self.bus.AWVALID.value = 0
             self.bus.WDATA.value = value
+            self.bus.WSTRB.value = strb
             self.bus.WVALID.value = 1
             await RisingEdge(self.clock)
             while not self.w_accepted():
@@ -156,6 +176,7 @@ class AXI4LiteMasterDriver(AXI4LiteBase):
             self.bus.BREADY.value = 1
             while not self.b_accepted():
                 await RisingEdge(self.clock)
+            self.last_bresp = self.bresp
             self.bus.BREADY.value = 0
             await RisingEdge(self.clock)
 
@@ -173,6 +194,7 @@ class AXI4LiteMasterDriver(AXI4LiteBase):
                 await RisingEdge(self.clock)
             self.bus.RREADY.value = 0
             rd = self.rdata
+            self.last_rresp = self.rresp
             await RisingEdge(self.clock)
         return rd
 
@@ -190,9 +212,9 @@ class AXI4LiteMasterDriver(AXI4LiteBase):
 
         raise TypeError(f'Invalid register type: {reg} ({type(reg)})')
 
-    async def write(self, reg: int | str | Reg, value: int):
+    async def write(self, reg: int | str | Reg, value: int, strb: int = None):
         addr = self._get_reg_addr(reg)
-        ret = await self.write_reg(addr, value)
+        ret = await self.write_reg(addr, value, strb=strb)
         return ret
 
     async def read(self, reg: int | str | Reg):
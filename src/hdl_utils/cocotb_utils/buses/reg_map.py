@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+import importlib.util
+import json
 
 
 @dataclass(kw_only=True)
@@ -15,6 +17,8 @@ class Reg:
 class RegMap:
     def __init__(self, reg_map: list[Reg]):
         self.reg_map = reg_map
+        self._by_name = {reg.name: reg for reg in reg_map}
+        self._by_addr = {reg.addr: reg for reg in reg_map}
 
     @classmethod
     def from_reg_map_raw_list(cls, reg_map_raw_list: list[tuple]) -> RegMap:
@@ -23,14 +27,32 @@ class RegMap:
             for name, dir, addr, default, fields in reg_map_raw_list
         ])
 
+    @classmethod
+    def from_json(cls, path: str) -> RegMap:
+        """Load a register map exported with export_register_map()."""
+        with open(path) as f:
+            data = json.load(f)
+        return cls([
+            Reg(
+                name=r['name'],
+                dir=r['dir'],
+                addr=r['addr'],
+                default=r['default'],
+                fields=[(f['name'], f['width'], f['offset']) for f in r['fields']],
+            )
+            for r in data['registers']
+        ])
+
+    @classmethod
+    def from_py_module(cls, path: str) -> RegMap:
+        """Load a python module exported with export_register_map()."""
+        spec = importlib.util.spec_from_file_location('_reg_map', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return cls.from_reg_map_raw_list(module.REG_MAP)
+
     def get_reg_by_name(self, name: str) -> Reg:
-        for reg in self.reg_map:
-            if reg.name == name:
-                return reg
-        return None
+        return self._by_name.get(name)
 
     def get_reg_by_addr(self, addr: int) -> Reg:
-        for reg in self.reg_map:
-            if reg.addr == addr:
-                return reg
-        return None
+        return self._by_addr.get(addr)
@@ -1,18 +1,24 @@
 from cocotb.handle import SimHandleBase
 from cocotb.triggers import RisingEdge
+import math
+import numpy as np
 import random
 
 from hdl_utils.cocotb_utils.buses.axi_stream import (
     AXIStreamMaster,
 )
 from hdl_utils.cocotb_utils.buses.bus import Bus
+from hdl_utils.models.stream import as_words, split_words, join_words
 
 
 __all__ = [
     'pack',
     'unpack',
+    'pack_array',
+    'unpack_array',
     'width_converter_up',
     'width_converter_down',
+    'width_converter',
 ]
 
 
@@ -29,13 +35,7 @@ def pack(buffer, elements, element_width):
             b = [p for p in pack(a, 3, 8)]
             result: [0x020100, 0x050403]
     """
-    adicionales = (elements - (len(buffer) % elements)) % elements
-    buff = buffer + [0]*adicionales
-    for i in range(0, len(buff), elements):
-        b = 0
-        for j in range(elements):
-            b = (b << element_width) + buff[i+elements-j-1]
-        yield b
+    yield from pack_array(buffer, elements, element_width).tolist()
 
 
 def unpack(buffer, elements, element_width):
@@ -51,11 +51,70 @@ def unpack(buffer, elements, element_width):
             b = [p for p in unpack(a, 3, 8)]
             result: [0, 1, 2, 3, 4, 5,]]
     """
-    mask = (1 << element_width) - 1
-    for b in buffer:
-        for _ in range(elements):
-            yield (b & mask)
-            b = b >> element_width
+    yield from unpack_array(buffer, elements, element_width).tolist()
+
+
+_NUMPY_WIDTHS = (8, 16, 32, 64)
+
+
+def _as_sequence(buffer):
+    return buffer if isinstance(buffer, (list, tuple, np.ndarray)) else list(buffer)
+
+
+def _words_to_bytes(words, width: int) -> bytes:
+    """Little endian bytes of words of "width" bits (a multiple of 8)."""
+    if width in _NUMPY_WIDTHS:
+        return np.asarray(words, dtype=f'<u{width // 8}').tobytes()
+    if width <= 64:
+        return split_words(as_words(words, width), width // 8, 8).astype(np.uint8).tobytes()
+    return b''.join(int(w).to_bytes(width // 8, 'little') for w in words)
+
+
+def _bytes_to_words(data: bytes, width: int) -> np.ndarray:
+    """Inverse of _words_to_bytes."""
+    if width in _NUMPY_WIDTHS:
+        return np.frombuffer(data, dtype=f'<u{width // 8}').astype(np.uint64)
+    if width <= 64:
+        return join_words(np.frombuffer(data, dtype=np.uint8).reshape(-1, width // 8), 8)
+    n = width // 8
+    return np.array(
+        [int.from_bytes(data[i:i + n], 'little') for i in range(0, len(data), n)],
+        dtype=object,
+    )
+
+
+def pack_array(buffer, elements, element_width) -> np.ndarray:
+    """
+        Same as pack, returning a numpy array (uint64, or object for
+        packed widths over 64 bits). buffer can be a list, a numpy array
+        or, with element_width=8, a bytes object.
+    """
+    packed_w = elements * element_width
+    if isinstance(buffer, (bytes, bytearray, memoryview)):
+        assert element_width == 8
+        data = bytes(buffer)
+        return _bytes_to_words(data + bytes(-len(data) % elements), packed_w)
+    buffer = _as_sequence(buffer)
+    if element_width % 8 == 0:
+        data = _words_to_bytes(buffer, element_width)
+        data += bytes(-len(data) % (packed_w // 8))
+        return _bytes_to_words(data, packed_w)
+    units = as_words(buffer, element_width)
+    units = np.concatenate([units, np.zeros(-len(units) % elements, dtype=units.dtype)])
+    return join_words(units.reshape(-1, elements), element_width)
+
+
+def unpack_array(buffer, elements, element_width) -> np.ndarray:
+    """
+        Same as unpack, returning a numpy array (uint64, or object for
+        element widths over 64 bits). The items of buffer must fit in
+        elements * element_width bits.
+    """
+    packed_w = elements * element_width
+    buffer = _as_sequence(buffer)
+    if element_width % 8 == 0:
+        return _bytes_to_words(_words_to_bytes(buffer, packed_w), element_width)
+    return split_words(as_words(buffer, packed_w), elements, element_width).reshape(-1)
 
 
 def width_converter_up(data_in, width_in, width_out):
@@ -74,6 +133,17 @@ def width_converter_down(data_in, width_in, width_out):
     return list(unpack(buffer=data_in, elements=scale, element_width=width_out))
 
 
+def width_converter(data_in, width_in, width_out):
+    """Repack data_in between arbitrary widths, in units of
+    gcd(width_in, width_out) bits. The last output item is zero padded.
+    """
+    if (width_in == width_out == 0):
+        return []
+    unit_w = math.gcd(width_in, width_out)
+    units = list(unpack(buffer=data_in, elements=width_in // unit_w, element_width=unit_w))
+    return list(pack(buffer=units, elements=width_out // unit_w, element_width=unit_w))
+
+
 def as_int(x):
     assert x == int(x)
     return int(x)
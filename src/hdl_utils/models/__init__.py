@@ -0,0 +1,24 @@
+"""Vectorized (NumPy) reference models of the cores, to compute the expected
+output of a testbench. Streams are handled as Beats (one array per signal),
+see hdl_utils.models.stream.
+"""
+
+from .stream import (
+    Beats,
+    as_words,
+    split_words,
+    join_words,
+    packet_ids,
+    from_packets,
+    to_packets,
+)
+from .width_converter import (
+    width_converter_up,
+    width_converter_down,
+    width_converter_gearbox,
+    width_converter,
+)
+from .splitter import splitter
+from .fifo import fifo_packet_mode
+from .rate_limiter import rate_limiter_starts
+from .dma import bytes_to_beats, beats_to_bytes, memory_image, burst_lengths
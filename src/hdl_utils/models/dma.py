@@ -0,0 +1,84 @@
+import numpy as np
+
+from .stream import Beats, split_words, join_words
+
+
+__all__ = [
+    'bytes_to_beats',
+    'beats_to_bytes',
+    'memory_image',
+    'burst_lengths',
+]
+
+
+def _as_bytes(data) -> np.ndarray:
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return np.frombuffer(data, dtype=np.uint8)
+    return np.asarray(data, dtype=np.uint8).reshape(-1)
+
+
+def bytes_to_beats(data, data_w: int) -> Beats:
+    """Single packet stream of a byte array, with a partial tkeep in the
+    last beat if the length is not a multiple of the beat size.
+    """
+    bytes_per_beat = data_w // 8
+    data = _as_bytes(data)
+    n_beats = -(-len(data) // bytes_per_beat)
+    padded = np.zeros(n_beats * bytes_per_beat, dtype=np.uint8)
+    padded[:len(data)] = data
+    keep = np.zeros(n_beats * bytes_per_beat, dtype=np.uint8)
+    keep[:len(data)] = 1
+    last = np.zeros(n_beats, dtype=bool)
+    last[-1:] = True
+    return Beats(
+        data=join_words(padded.reshape(n_beats, bytes_per_beat), 8),
+        last=last,
+        keep=join_words(keep.reshape(n_beats, bytes_per_beat), 1),
+    )
+
+
+def beats_to_bytes(beats: Beats, data_w: int) -> np.ndarray:
+    """Bytes of a stream, skipping the lanes with tkeep = 0."""
+    bytes_per_beat = data_w // 8
+    lanes = split_words(beats.data, bytes_per_beat, 8).astype(np.uint8)
+    if beats.keep is None:
+        return lanes.reshape(-1)
+    return lanes[split_words(beats.keep, bytes_per_beat, 1) != 0]
+
+
+def memory_image(
+    size: int,
+    writes: list[tuple[int, object]],
+    init=None,
+) -> np.ndarray:
+    """Memory contents (uint8 array) after the DMA writes, applied in order.
+    writes are (address, bytes) pairs; init is the initial content (zeros
+    by default).
+    """
+    image = np.zeros(size, dtype=np.uint8) if init is None else _as_bytes(init).copy()
+    assert len(image) == size
+    for addr, data in writes:
+        data = _as_bytes(data)
+        assert 0 <= addr and addr + len(data) <= size, f'Write out of range: {hex(addr)}'
+        image[addr:addr + len(data)] = data
+    return image
+
+
+def burst_lengths(
+    addr: int,
+    n_beats: int,
+    burst_len: int,
+    bytes_per_beat: int,
+) -> list[tuple[int, int]]:
+    """(address, beats) of the bursts of an AxiDma transfer of n_beats at
+    addr (aligned to the beat): up to burst_len beats, cut at every 4KB
+    boundary.
+    """
+    bursts = []
+    while n_beats > 0:
+        to_boundary = (4096 - addr % 4096) // bytes_per_beat
+        beats = min(burst_len, to_boundary, n_beats)
+        bursts.append((addr, beats))
+        addr += beats * bytes_per_beat
+        n_beats -= beats
+    return bursts
@@ -0,0 +1,32 @@
+import numpy as np
+
+from .stream import Beats, packet_ids
+
+
+__all__ = [
+    'fifo_packet_mode',
+]
+
+
+def fifo_packet_mode(
+    beats: Beats,
+    depth: int,
+    drop_on_error: bool = False,
+    error_bit: int = 0,
+) -> tuple[Beats, np.ndarray]:
+    """AXIStreamFIFO with packet_mode. Returns the output stream and a
+    boolean array with the dropped packets.
+
+    Packets go through unchanged. With drop_on_error, packets whose last
+    beat has tuser[error_bit] set are dropped, and so are the ones longer
+    than depth - 1 beats.
+    """
+    last = np.asarray(beats.last, dtype=bool)
+    ids = packet_ids(last)
+    n_packets = int(np.count_nonzero(last))
+    dropped = np.zeros(n_packets, dtype=bool)
+    if drop_on_error:
+        assert beats.user is not None
+        error = (beats.user[last] >> error_bit) & 1
+        dropped = (error != 0) | (np.bincount(ids, minlength=n_packets) > depth - 1)
+    return beats.select(~dropped[ids]), dropped
@@ -0,0 +1,30 @@
+import numpy as np
+
+
+__all__ = [
+    'rate_limiter_starts',
+]
+
+
+def rate_limiter_starts(
+    lengths,
+    max_cycles_per_packet: int,
+    arrivals=None,
+) -> np.ndarray:
+    """AXISPacketRateLimiter: cycle in which the first beat of every packet
+    is accepted, with the output always ready and the beats of a packet sent
+    back to back.
+
+    A packet can't start until max_cycles_per_packet cycles after the
+    previous start. arrivals are the cycles in which the first beats are
+    presented (all of them at cycle 0 by default, i.e. the input always
+    valid), and a packet can't start before the previous one ended.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    arrivals = np.zeros(len(lengths), dtype=np.int64) if arrivals is None else (
+        np.asarray(arrivals, dtype=np.int64))
+    # start[k] = max(arrivals[k], start[k - 1] + period[k - 1]), solved as a
+    # running maximum over the cumulative periods
+    periods = np.maximum(lengths, max_cycles_per_packet)
+    offsets = np.cumsum(periods) - periods
+    return offsets + np.maximum.accumulate(arrivals - offsets)
@@ -0,0 +1,14 @@
+from .stream import Beats
+
+
+__all__ = [
+    'splitter',
+]
+
+
+def splitter(beats: Beats, n_split: int) -> list[Beats]:
+    """AXIStreamSplitter: every output gets a copy of the whole stream."""
+    return [
+        Beats(*[None if x is None else x.copy() for x in beats])
+        for _ in range(n_split)
+    ]
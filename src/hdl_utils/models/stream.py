@@ -0,0 +1,120 @@
+from typing import NamedTuple
+
+import numpy as np
+
+
+__all__ = [
+    'Beats',
+    'word_dtype',
+    'as_words',
+    'split_words',
+    'join_words',
+    'packet_ids',
+    'from_packets',
+    'to_packets',
+]
+
+
+class Beats(NamedTuple):
+    """AXI Stream beats as arrays, one item per beat.
+
+    Words up to 64 bits are stored as uint64, wider ones as Python ints in
+    object arrays. user and keep are None if the stream doesn't have them.
+    """
+    data: np.ndarray
+    last: np.ndarray
+    user: np.ndarray = None
+    keep: np.ndarray = None
+
+    def __len__(self):
+        return len(self.data)
+
+    def select(self, mask) -> 'Beats':
+        return Beats(*[None if x is None else x[mask] for x in self])
+
+
+def word_dtype(width: int):
+    return np.uint64 if width <= 64 else object
+
+
+def as_words(values, width: int) -> np.ndarray:
+    return np.array(values, dtype=word_dtype(width)).reshape(-1)
+
+
+def split_words(words, elements: int, element_width: int) -> np.ndarray:
+    """Split every word in "elements" parts of "element_width" bits, least
+    significant first. Returns an array of shape (len(words), elements).
+    """
+    words = np.asarray(words)
+    if elements * element_width <= 64:
+        words = words.astype(np.uint64)
+        shifts = np.arange(elements, dtype=np.uint64) * np.uint64(element_width)
+        mask = np.uint64((1 << element_width) - 1)
+    else:
+        words = words.astype(object)
+        shifts = np.array([i * element_width for i in range(elements)], dtype=object)
+        mask = (1 << element_width) - 1
+    units = (words[:, None] >> shifts) & mask
+    return units.astype(word_dtype(element_width))
+
+
+def join_words(units, element_width: int) -> np.ndarray:
+    """Inverse of split_words: join the rows of "units" (least significant
+    part first) in words of units.shape[1] * element_width bits.
+    """
+    units = np.asarray(units)
+    elements = units.shape[1]
+    if elements * element_width <= 64:
+        units = units.astype(np.uint64)
+        shifts = np.arange(elements, dtype=np.uint64) * np.uint64(element_width)
+        return np.bitwise_or.reduce(units << shifts, axis=1)
+    units = units.astype(object)
+    shifts = np.array([i * element_width for i in range(elements)], dtype=object)
+    words = np.zeros(len(units), dtype=object)
+    for i in range(elements):
+        words |= units[:, i] << shifts[i]
+    return words
+
+
+def packet_ids(last) -> np.ndarray:
+    """Index of the packet of every beat."""
+    last = np.asarray(last, dtype=bool)
+    ids = np.zeros(len(last), dtype=np.int64)
+    np.cumsum(last[:-1], out=ids[1:])
+    return ids
+
+
+def from_packets(
+    datas: list,
+    data_w: int,
+    users: list = None,
+    user_w: int = 0,
+    keeps: list = None,
+) -> Beats:
+    """Flat stream of a list of packets (lists of words), as accepted by
+    AXIStreamMaster.write_multiple.
+    """
+    lengths = np.array([len(d) for d in datas], dtype=np.int64)
+    assert lengths.all(), 'Empty packet'
+    last = np.zeros(lengths.sum(), dtype=bool)
+    last[np.cumsum(lengths) - 1] = True
+
+    def flat(values, width):
+        return as_words([x for v in values for x in v], width)
+
+    return Beats(
+        data=flat(datas, data_w),
+        last=last,
+        user=flat(users, user_w) if users is not None and user_w else None,
+        keep=flat(keeps, data_w // 8) if keeps is not None else None,
+    )
+
+
+def to_packets(values, last) -> list[list[int]]:
+    """Split a per-beat array in packets of Python ints, to compare with
+    what AXIStreamSlave.read returns.
+    """
+    values = np.asarray(values).tolist()
+    ends = np.flatnonzero(last) + 1
+    starts = np.concatenate([[0], ends[:-1]])
+    return [values[start:end] for start, end in zip(starts, ends)]
@@ -0,0 +1,152 @@
+import math
+
+import numpy as np
+
+from .stream import Beats, split_words, join_words, packet_ids
+
+
+__all__ = [
+    'width_converter_up',
+    'width_converter_down',
+    'width_converter_gearbox',
+    'width_converter',
+]
+
+
+def _regroup(
+    beats: Beats,
+    select: np.ndarray,
+    units_i: int,
+    units_o: int,
+    data_w_i: int,
+    user_w_i: int,
+) -> Beats:
+    """Send the selected units of every input word (select has shape
+    (len(beats), units_i)) in words of units_o units. Every packet starts
+    in a new output word and its last output word is padded with null
+    units.
+    """
+    assert len(beats) == 0 or beats.last[-1], 'The stream must end with tlast'
+    n_units = select.sum(axis=1)
+    unit_packet = np.repeat(packet_ids(beats.last), n_units)
+    counts = np.bincount(unit_packet, minlength=int(np.count_nonzero(beats.last)))
+    n_beats_o = -(-counts // units_o)
+    first_unit = np.cumsum(counts) - counts
+    first_slot = (np.cumsum(n_beats_o) - n_beats_o) * units_o
+    slots = np.arange(len(unit_packet)) - first_unit[unit_packet] + first_slot[unit_packet]
+    last = np.zeros(int(n_beats_o.sum()), dtype=bool)
+    last[np.cumsum(n_beats_o) - 1] = True
+
+    def regroup(words, unit_w):
+        units = split_words(words, units_i, unit_w)[select]
+        slotted = np.zeros(len(last) * units_o, dtype=units.dtype)
+        slotted[slots] = units
+        return join_words(slotted.reshape(-1, units_o), unit_w)
+
+    return Beats(
+        data=regroup(beats.data, data_w_i // units_i),
+        last=last,
+        user=None if beats.user is None else regroup(beats.user, user_w_i // units_i),
+        keep=None if beats.keep is None else regroup(beats.keep, data_w_i // 8 // units_i),
+    )
+
+
+def _not_null(beats: Beats, units: int, data_w: int) -> np.ndarray:
+    """Units of every word with any tkeep bit set (all of them without
+    tkeep).
+    """
+    if beats.keep is None:
+        return np.ones((len(beats), units), dtype=bool)
+    assert (data_w // 8) % units == 0
+    return split_words(beats.keep, units, data_w // 8 // units) != 0
+
+
+def _up_to_highest(not_null: np.ndarray, minimum: int) -> np.ndarray:
+    """Units up to the highest one set in every row, and at least the first
+    "minimum" ones.
+    """
+    units = not_null.shape[1]
+    highest = units - 1 - np.argmax(not_null[:, ::-1], axis=1)
+    highest = np.where(not_null.any(axis=1), highest, 0)
+    return np.arange(units) < np.maximum(highest + 1, minimum)[:, None]
+
+
+def width_converter_up(
+    beats: Beats,
+    data_w_i: int,
+    data_w_o: int,
+    user_w_i: int = 0,
+) -> Beats:
+    """AXIStreamWidthConverterUp: a tlast ends the output word, padded with
+    null sub-words.
+    """
+    assert data_w_o % data_w_i == 0
+    select = np.ones((len(beats), 1), dtype=bool)
+    return _regroup(beats, select, 1, data_w_o // data_w_i, data_w_i, user_w_i)
+
+
+def width_converter_down(
+    beats: Beats,
+    data_w_i: int,
+    data_w_o: int,
+    user_w_i: int = 0,
+    compact: bool = False,
+) -> Beats:
+    """AXIStreamWidthConverterDown: the trailing null sub-words of every
+    word are skipped (the first one is always sent). With compact, all the
+    null sub-words are skipped, and a null word only sends its first
+    sub-word if it has tlast.
+    """
+    assert data_w_i % data_w_o == 0
+    ratio = data_w_i // data_w_o
+    not_null = _not_null(beats, ratio, data_w_i)
+    if compact:
+        select = not_null.copy()
+        select[:, 0] |= beats.last & ~not_null.any(axis=1)
+    else:
+        select = _up_to_highest(not_null, minimum=1)
+    return _regroup(beats, select, ratio, 1, data_w_i, user_w_i)
+
+
+def width_converter_gearbox(
+    beats: Beats,
+    data_w_i: int,
+    data_w_o: int,
+    user_w_i: int = 0,
+) -> Beats:
+    """AXIStreamWidthConverterGearbox: units of gcd(data_w_i, data_w_o)
+    bits. The trailing null units of the tlast word are dropped (the first
+    one is always sent).
+    """
+    unit_w = math.gcd(data_w_i, data_w_o)
+    units_i, units_o = data_w_i // unit_w, data_w_o // unit_w
+    select = np.ones((len(beats), units_i), dtype=bool)
+    last = np.asarray(beats.last, dtype=bool)
+    select[last] = _up_to_highest(_not_null(beats, units_i, data_w_i)[last], minimum=1)
+    return _regroup(beats, select, units_i, units_o, data_w_i, user_w_i)
+
+
+def width_converter(
+    beats: Beats,
+    data_w_i: int,
+    data_w_o: int,
+    user_w_i: int = 0,
+    gearbox: bool = False,
+    compact: bool = False,
+) -> Beats:
+    """AXIStreamWidthConverter with the same options: non-integer ratios
+    go through the up converter to lcm(data_w_i, data_w_o) and the down
+    converter, unless gearbox is set.
+    """
+    if data_w_i == data_w_o:
+        return beats
+    if gearbox:
+        return width_converter_gearbox(beats, data_w_i, data_w_o, user_w_i)
+    if data_w_o % data_w_i == 0:
+        return width_converter_up(beats, data_w_i, data_w_o, user_w_i)
+    if data_w_i % data_w_o == 0:
+        return width_converter_down(beats, data_w_i, data_w_o, user_w_i, compact=compact)
+    data_w_lcm = math.lcm(data_w_i, data_w_o)
+    up = width_converter_up(beats, data_w_i, data_w_lcm, user_w_i)
+    user_w_lcm = user_w_i * (data_w_lcm // data_w_i)
+    return width_converter_down(up, data_w_lcm, data_w_o, user_w_lcm, compact=compact)
@@ -1,4 +1,10 @@
-from hdl_utils.amaranth_utils.reg_map import Field, Register, RegisterMapFactory
+from hdl_utils.amaranth_utils.reg_map import (
+    Field,
+    Register,
+    RegisterArray,
+    RegisterMapComposer,
+    RegisterMapFactory,
+)
 
 
 def get_example_reg_map_factory(data_w: int) -> RegisterMapFactory:
@@ -58,3 +64,20 @@ def get_example_reg_map_factory(data_w: int) -> RegisterMapFactory:
         ),
     ])
     return reg_map_factory
+
+
+def get_example_register_arrays() -> list[RegisterArray]:
+    return [
+        RegisterArray(name='lut', dir='rw', depth=12, width=16),
+        RegisterArray(name='capture', dir='ro', depth=4, width=32),
+    ]
+
+
+def get_example_composer(data_w: int) -> RegisterMapComposer:
+    """Two copies of the example map, one of them with register arrays."""
+    composer = RegisterMapComposer(reg_width=data_w)
+    composer.add_block('blk_a', get_example_reg_map_factory(data_w))
+    blk_b = get_example_reg_map_factory(data_w)
+    blk_b.allocate_register_arrays(get_example_register_arrays())
+    composer.add_block('blk_b', blk_b)
+    return composer
@@ -0,0 +1,156 @@
+import cocotb
+from cocotb.clock import Clock
+from cocotb import start_soon
+from cocotb.triggers import Combine, RisingEdge
+import os
+import random
+
+from hdl_utils.cocotb_utils.buses.axi_full import AXI4MasterBus
+from hdl_utils.cocotb_utils.buses.axi_memory_controller import Memory
+from hdl_utils.cocotb_utils.tb_utils import check_memory_data
+
+
+P_ADDR_W = int(os.environ['P_ADDR_W'])
+P_DATA_W = int(os.environ['P_DATA_W'])
+P_N_MASTERS = int(os.environ['P_N_MASTERS'])
+P_ID_W = int(os.environ['P_ID_W'])
+
+ADDR_JUMP = P_DATA_W // 8
+MEM_SIZE = 0x10000
+MASTER_MEM_SPAN = MEM_SIZE // P_N_MASTERS
+
+
+class Testbench:
+    clk_period = 10
+
+    def __init__(self, dut):
+        self.dut = dut
+        self.memory = Memory(size=MEM_SIZE)
+        self.memory_ctrl = self.memory.create_axi(entity=dut, prefix="m_axi_", clock=dut.clk)
+        self.masters = [
+            AXI4MasterBus(dut, f's_axi_{i:02d}_', dut.clk)
+            for i in range(P_N_MASTERS)
+        ]
+
+    def init_signals(self):
+        for bus in self.masters:
+            bus.init_signals()
+
+    async def init_test(self):
+        start_soon(Clock(self.dut.clk, self.clk_period, units='ns').start())
+        self.init_signals()
+        self.dut.rst.value = 1
+        for _ in range(3):
+            await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+
+    async def handshake(self, valid, ready):
+        while True:
+            await RisingEdge(self.dut.clk)
+            if valid.value and ready.value:
+                return
+
+    async def write_burst(self, i: int, addr: int, data: list[int], qos: int = 0, axi_id: int = 0):
+        bus = self.masters[i]
+        bus.AWADDR.value = addr
+        bus.AWLEN.value = len(data) - 1
+        bus.AWSIZE.value = ADDR_JUMP.bit_length() - 1
+        bus.AWBURST.value = 1
+        bus.AWQOS.value = qos
+        if P_ID_W:
+            bus.AWID.value = axi_id
+        bus.AWVALID.value = 1
+        await self.handshake(bus.AWVALID, bus.AWREADY)
+        bus.AWVALID.value = 0
+        for k, value in enumerate(data):
+            bus.WDATA.value = value
+            bus.WSTRB.value = 2**ADDR_JUMP - 1
+            bus.WLAST.value = int(k == len(data) - 1)
+            bus.WVALID.value = 1
+            await self.handshake(bus.WVALID, bus.WREADY)
+        bus.WVALID.value = 0
+        bus.BREADY.value = 1
+        await self.handshake(bus.BVALID, bus.BREADY)
+        bus.BREADY.value = 0
+        if P_ID_W:
+            assert bus.BID.value.integer == axi_id
+
+    async def read_burst(self, i: int, addr: int, length: int, qos: int = 0, axi_id: int = 0):
+        bus = self.masters[i]
+        bus.ARADDR.value = addr
+        bus.ARLEN.value = length - 1
+        bus.ARSIZE.value = ADDR_JUMP.bit_length() - 1
+        bus.ARBURST.value = 1
+        bus.ARQOS.value = qos
+        if P_ID_W:
+            bus.ARID.value = axi_id
+        bus.ARVALID.value = 1
+        await self.handshake(bus.ARVALID, bus.ARREADY)
+        bus.ARVALID.value = 0
+        bus.RREADY.value = 1
+        data = []
+        while len(data) < length:
+            await self.handshake(bus.RVALID, bus.RREADY)
+            if P_ID_W:
+                assert bus.RID.value.integer == axi_id
+            data.append(bus.RDATA.value.integer)
+        bus.RREADY.value = 0
+        return data
+
+
+async def master_traffic(tb: Testbench, i: int, n_bursts: int, burst_len: int, qos: int):
+    base = i * MASTER_MEM_SPAN
+    bursts = [
+        [random.getrandbits(P_DATA_W) for _ in range(burst_len)]
+        for _ in range(n_bursts)
+    ]
+    for k, data in enumerate(bursts):
+        addr = base + k * burst_len * ADDR_JUMP
+        await tb.write_burst(i, addr, data, qos=qos, axi_id=k % 2**max(P_ID_W, 1))
+    for k, data in enumerate(bursts):
+        addr = base + k * burst_len * ADDR_JUMP
+        check_memory_data(
+            memory=tb.memory,
+            base_addr=addr,
+            expected=data,
+            data_width=P_DATA_W,
+        )
+        rd = await tb.read_burst(i, addr, burst_len, qos=qos, axi_id=k % 2**max(P_ID_W, 1))
+        assert rd == data, f'master {i} burst {k}: read data mismatch'
+
+
+@cocotb.test()
+async def check_concurrent_masters(dut):
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    tasks = [
+        start_soon(master_traffic(tb, i, n_bursts=4, burst_len=8, qos=i % 2))
+        for i in range(P_N_MASTERS)
+    ]
+    await Combine(*tasks)
+
+
+@cocotb.test()
+async def check_qos_priority(dut):
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    # All masters request at the same time: the one with the highest QoS
+    # is granted first.
+    high = P_N_MASTERS - 1
+    for i, bus in enumerate(tb.masters):
+        bus.ARADDR.value = i * MASTER_MEM_SPAN
+        bus.ARLEN.value = 0
+        bus.ARSIZE.value = ADDR_JUMP.bit_length() - 1
+        bus.ARBURST.value = 1
+        bus.ARQOS.value = 0xf if i == high else 0
+        bus.ARVALID.value = 1
+    granted = None
+    while granted is None:
+        await RisingEdge(dut.clk)
+        for i, bus in enumerate(tb.masters):
+            if bus.ARVALID.value and bus.ARREADY.value:
+                granted = i
+    assert granted == high, f'{granted} != {high}'
@@ -16,12 +16,14 @@ from hdl_utils.cocotb_utils.tb_utils import (
     stream_to_hex as to_hex,
     as_int,
 )
+from hdl_utils.models import burst_lengths
 
 
 P_ADDR_W = int(os.environ['P_ADDR_W'])
 P_DATA_W = int(os.environ['P_DATA_W'])
 P_USER_W = int(os.environ['P_USER_W'])
 P_BURST_LEN = int(os.environ['P_BURST_LEN'])
+P_PERF_COUNTERS = int(os.environ['P_PERF_COUNTERS'])
 
 ADDR_JUMP = P_DATA_W // 8
 MEM_SIZE = 0x10000
@@ -46,6 +48,10 @@ class Testbench:
         self.dut.rd_len_beats.value = 0
         self.dut.wr_qos.value = 0
         self.dut.rd_qos.value = 0
+        self.dut.wr_burst_len.value = P_BURST_LEN
+        self.dut.rd_burst_len.value = P_BURST_LEN
+        if P_PERF_COUNTERS:
+            self.dut.perf_clear.value = 0
 
     async def init_test(self):
         start_soon(Clock(self.dut.clk, self.clk_period, units='ns').start())
@@ -89,6 +95,8 @@ async def check_ports(dut):
     assert len(dut.rd_len_beats) == 32
     assert len(dut.wr_qos) == 4
     assert len(dut.rd_qos) == 4
+    assert len(dut.wr_burst_len) == P_BURST_LEN.bit_length()
+    assert len(dut.rd_burst_len) == P_BURST_LEN.bit_length()
     assert len(dut.wr_ack) == 1
     assert len(dut.rd_ack) == 1
     assert len(dut.wr_finish) == 1
@@ -102,12 +110,14 @@ async def dma_write(
     data: list,
     burps: bool,
     qos: int = 0,
+    burst_len: int = P_BURST_LEN,
 ):
     wr_len_beats = len(data)
     dut.wr_start.value = 1
     dut.wr_addr.value = addr
     dut.wr_len_beats.value = wr_len_beats
     dut.wr_qos.value = qos
+    dut.wr_burst_len.value = burst_len
     p_wr = start_soon(tb.m_axis.write(data, burps=burps))
     await RisingEdge(dut.clk)
     while dut.wr_ack.value.integer == 0:
@@ -124,11 +134,13 @@ async def dma_read(
     length: int,
     burps: bool,
     qos: int = 0,
+    burst_len: int = P_BURST_LEN,
 ):
     dut.rd_start.value = 1
     dut.rd_addr.value = addr
     dut.rd_len_beats.value = length
     dut.rd_qos.value = qos
+    dut.rd_burst_len.value = burst_len
     p_rd = start_soon(tb.s_axis.read(burps=burps))
     await RisingEdge(dut.clk)
     while dut.rd_ack.value.integer == 0:
@@ -139,12 +151,49 @@ async def dma_read(
     return rd
 
 
+async def check_burst_lengths(dut, ch: str, addr: int, length: int, burst_len: int):
+    """Check the address and length of every burst of a dma transfer of
+    length beats (cut at burst_len and at 4KB boundaries).
+    """
+    valid = getattr(dut, f'm_axi__{ch}VALID')
+    ready = getattr(dut, f'm_axi__{ch}READY')
+    axaddr = getattr(dut, f'm_axi__{ch}ADDR')
+    axlen = getattr(dut, f'm_axi__{ch}LEN')
+    bursts = burst_lengths(addr, length, burst_len, ADDR_JUMP)
+    while bursts:
+        await RisingEdge(dut.clk)
+        if valid.value.integer and ready.value.integer:
+            expected_addr, expected = bursts.pop(0)
+            assert axaddr.value.integer == expected_addr, (
+                f'{ch}ADDR mismatch: {hex(axaddr.value.integer)} != {hex(expected_addr)}'
+            )
+            assert axlen.value.integer == expected - 1, (
+                f'{ch}LEN mismatch: {axlen.value.integer} != {expected - 1}'
+            )
+
+
+async def clear_perf_counters(dut):
+    dut.perf_clear.value = 1
+    await RisingEdge(dut.clk)
+    dut.perf_clear.value = 0
+
+
+def check_perf_counters(dut, direction: str, addr: int, length: int, burst_len: int):
+    bursts = dut.perf_wr_bursts if direction == 'wr' else dut.perf_rd_bursts
+    beats = dut.perf_wr_beats if direction == 'wr' else dut.perf_rd_beats
+    expected_bursts = len(burst_lengths(addr, length, burst_len, ADDR_JUMP))
+    assert bursts.value.integer == expected_bursts, (
+        f'{direction} bursts: {bursts.value.integer} != {expected_bursts}'
+    )
+    assert beats.value.integer == length, f'{direction} beats: {beats.value.integer} != {length}'
+
 
 async def tb_check_write(
     dut,
     burps_wr: bool,
     length: int,
     addr: int = 0x200,
+    burst_len: int = P_BURST_LEN,
 ):
     tb = Testbench(dut)
     await tb.init_test()
@@ -170,6 +219,9 @@ async def tb_check_write(
         data = get_rand_stream(width=P_DATA_W, length=length)
 
         dut._log.info(f'Dma Write')
+        if P_PERF_COUNTERS:
+            await clear_perf_counters(dut)
+        p_bursts = start_soon(check_burst_lengths(dut, 'AW', addr, length, burst_len))
         await dma_write(
             dut=dut,
             tb=tb,
@@ -177,7 +229,12 @@ async def tb_check_write(
             data=data,
             qos=1,
             burps=burps_wr,
+            burst_len=burst_len,
         )
+        await p_bursts
+        if P_PERF_COUNTERS:
+            await RisingEdge(dut.clk)
+            check_perf_counters(dut, 'wr', addr, length, burst_len)
         # Check memory data
         expected_zeros = [0] * (addr // ADDR_JUMP)
         check_memory_data(  # Zeros before
@@ -208,6 +265,7 @@ async def tb_check_read(
     burps_rd: bool,
     length: int,
     addr: int = 0x200,
+    burst_len: int = P_BURST_LEN,
 ):
     tb = Testbench(dut)
     await tb.init_test()
@@ -231,6 +289,9 @@ async def tb_check_read(
 
         # Dma Read
         dut._log.info(f'Dma read.')
+        if P_PERF_COUNTERS:
+            await clear_perf_counters(dut)
+        p_bursts = start_soon(check_burst_lengths(dut, 'AR', addr, length, burst_len))
         rd = await dma_read(
             dut=dut,
             tb=tb,
@@ -238,7 +299,12 @@ async def tb_check_read(
             length=length,
             qos=1,
             burps=burps_rd,
+            burst_len=burst_len,
         )
+        await p_bursts
+        if P_PERF_COUNTERS:
+            await RisingEdge(dut.clk)
+            check_perf_counters(dut, 'rd', addr, length, burst_len)
         dut._log.info(f'Done.')
 
         # Check memory data (no changes expected)
@@ -311,7 +377,8 @@ else:
         4 * P_BURST_LEN + 1,
         4 * P_BURST_LEN + 2,
     ])
-    tf_tb_check_write.add_option('addr', [0x200])
+    tf_tb_check_write.add_option('addr', [0x200, 0x1000 - 5 * ADDR_JUMP])
+    tf_tb_check_write.add_option('burst_len', sorted({P_BURST_LEN, max(P_BURST_LEN // 2, 1), min(P_BURST_LEN, 3)}))
     tf_tb_check_write_postfix = '_full'
 
     tf_tb_check_read.add_option('burps_rd', [False, True])
@@ -321,7 +388,8 @@ else:
         4 * P_BURST_LEN + 1,
         4 * P_BURST_LEN + 2,
     ])
-    tf_tb_check_read.add_option('addr', [0x200])
+    tf_tb_check_read.add_option('addr', [0x200, 0x1000 - 5 * ADDR_JUMP])
+    tf_tb_check_read.add_option('burst_len', sorted({P_BURST_LEN, max(P_BURST_LEN // 2, 1), min(P_BURST_LEN, 3)}))
     tf_tb_check_read_postfix = '_full'
 
 
@@ -28,6 +28,7 @@ P_USER_W = int(os.environ['P_USER_W'])
 P_BURST_LEN = int(os.environ['P_BURST_LEN'])
 P_IGNORE_RD_SIZE_SIGNAL = int(os.environ['P_IGNORE_RD_SIZE_SIGNAL'])
 P_INIT_RD_SIZE = int(os.environ['P_INIT_RD_SIZE'])
+P_RD_PREFETCH_DEPTH = int(os.environ['P_RD_PREFETCH_DEPTH'])
 
 ADDR_JUMP = P_DATA_W // 8
 MEM_SIZE = 0x10000
@@ -51,6 +52,8 @@ class Testbench:
         self.dut.base_addr_2.value = 0
         self.dut.wr_qos.value = 0
         self.dut.rd_qos.value = 0
+        self.dut.wr_burst_len.value = P_BURST_LEN
+        self.dut.rd_burst_len.value = P_BURST_LEN
         self.dut.wr_len_beats.value = 0
         self.dut.rd_len_beats.value = 0
         self.dut.wr_dont_change_buffer_if_incomplete.value = 0
@@ -337,6 +340,24 @@ async def initialize_first_buffer(
     dut.wr_enable.value = 0
 
 
+async def record_frame_gaps(dut, gaps: list):
+    """Append, for every last beat sent by m_axis, the cycles without
+    tvalid before the first beat of the next frame.
+    """
+    gap = None
+    while True:
+        await RisingEdge(dut.clk)
+        valid = dut.m_axis__tvalid.value.integer
+        if gap is not None:
+            if valid:
+                gaps.append(gap)
+                gap = None
+            else:
+                gap += 1
+        if valid and dut.m_axis__tready.value.integer and dut.m_axis__tlast.value.integer:
+            gap = 0
+
+
 async def tb_check_throughput(
     dut,
     length: int,
@@ -373,6 +394,8 @@ async def tb_check_throughput(
     start_soon(tb.s_axis.read_driver(burps=False))
     dut.wr_enable.value = 1
     dut.rd_enable.value = 1
+    frame_gaps = []
+    start_soon(record_frame_gaps(dut, frame_gaps))
     await wait_n_streams(bus=tb.s_axis.bus, clock=dut.clk, n_streams=1)
     t_start = get_sim_time('ns')
     await wait_n_streams(bus=tb.s_axis.bus, clock=dut.clk, n_streams=n_streams)
@@ -381,6 +404,11 @@ async def tb_check_throughput(
     elapsed_clk_cycles = elapsed_ns / tb.clk_period
     tolerance = 2 / P_BURST_LEN  # 2 clock cycles on each burst
     assert elapsed_clk_cycles == pytest.approx(n_streams * length, rel=tolerance)
+    if P_RD_PREFETCH_DEPTH:
+        # The consumer is always ready: with prefetch, every frame follows
+        # the previous one without a gap
+        assert len(frame_gaps) >= n_streams
+        assert not any(frame_gaps), f'Gaps between frames: {frame_gaps}'
 
     recv_streams = tb.s_axis.get_data_streams_from_monitor()
     recv_streams = recv_streams[2:-1]  # discard first two (memory garbage) and last (incomplete)
@@ -0,0 +1,195 @@
+import cocotb
+from cocotb.clock import Clock
+from cocotb import start_soon
+from cocotb.regression import TestFactory
+from cocotb.triggers import RisingEdge
+import numpy as np
+import os
+import random
+
+from hdl_utils.cocotb_utils.buses.axi_memory_controller import Memory, memory_init
+from hdl_utils.cocotb_utils.buses.axi_stream import AXIStreamMaster, AXIStreamSlave
+from hdl_utils.cocotb_utils.tb_utils import (
+    check_axi_stream_iface,
+    check_axi_full_iface,
+    check_memory_bytes,
+)
+from hdl_utils.models import (
+    Beats,
+    as_words,
+    bytes_to_beats,
+    beats_to_bytes,
+    memory_image,
+)
+
+
+P_ADDR_W = int(os.environ['P_ADDR_W'])
+P_DATA_W = int(os.environ['P_DATA_W'])
+P_USER_W = int(os.environ['P_USER_W'])
+P_BURST_LEN = int(os.environ['P_BURST_LEN'])
+
+BYTES_PER_BEAT = P_DATA_W // 8
+MEM_SIZE = 0x10000
+
+
+class Testbench:
+    clk_period = 10
+
+    def __init__(self, dut):
+        self.dut = dut
+        self.memory = Memory(size=MEM_SIZE)
+        self.memory_ctrl = self.memory.create_axi(entity=dut, prefix="m_axi_", clock=dut.clk)
+        self.m_axis = AXIStreamMaster(dut, "s_axis_", dut.clk)
+        self.s_axis = AXIStreamSlave(dut, "m_axis_", dut.clk)
+
+    def init_signals(self):
+        self.dut.wr_start.value = 0
+        self.dut.rd_start.value = 0
+        self.dut.wr_addr.value = 0
+        self.dut.rd_addr.value = 0
+        self.dut.wr_len_bytes.value = 0
+        self.dut.rd_len_bytes.value = 0
+        self.dut.wr_qos.value = 0
+        self.dut.rd_qos.value = 0
+        self.dut.wr_burst_len.value = P_BURST_LEN
+        self.dut.rd_burst_len.value = P_BURST_LEN
+
+    async def init_test(self):
+        start_soon(Clock(self.dut.clk, self.clk_period, units='ns').start())
+        self.init_signals()
+        self.dut.rst.value = 1
+        for _ in range(3):
+            await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+
+
+@cocotb.test()
+async def check_ports(dut):
+    check_axi_full_iface(
+        dut=dut,
+        prefix='m_axi__',
+        data_w=P_DATA_W,
+        addr_w=P_ADDR_W,
+    )
+    check_axi_stream_iface(
+        dut=dut,
+        prefix='s_axis__',
+        data_w=P_DATA_W,
+        user_w=P_USER_W,
+    )
+    check_axi_stream_iface(
+        dut=dut,
+        prefix='m_axis__',
+        data_w=P_DATA_W,
+        user_w=P_USER_W,
+    )
+    assert len(dut.wr_len_bytes) == 32
+    assert len(dut.rd_len_bytes) == 32
+
+
+async def check_4k_boundaries(dut, ch: str):
+    """Check that no burst crosses a 4KB boundary."""
+    valid = getattr(dut, f'm_axi__{ch}VALID')
+    ready = getattr(dut, f'm_axi__{ch}READY')
+    axaddr = getattr(dut, f'm_axi__{ch}ADDR')
+    axlen = getattr(dut, f'm_axi__{ch}LEN')
+    while True:
+        await RisingEdge(dut.clk)
+        if valid.value.integer and ready.value.integer:
+            first = axaddr.value.integer
+            last = first + axlen.value.integer * BYTES_PER_BEAT
+            assert first // 4096 == last // 4096, (
+                f'{ch} burst crosses a 4KB boundary: {hex(first)}, {ch}LEN={axlen.value.integer}'
+            )
+
+
+async def dma_write(dut, tb: Testbench, addr: int, data: list[int], burps: bool):
+    beats = bytes_to_beats(data, P_DATA_W)
+    dut.wr_start.value = 1
+    dut.wr_addr.value = addr
+    dut.wr_len_bytes.value = len(data)
+    p_wr = start_soon(tb.m_axis.write(beats.data.tolist(), keep=beats.keep.tolist(), burps=burps))
+    await RisingEdge(dut.clk)
+    while dut.wr_ack.value.integer == 0:
+        await RisingEdge(dut.clk)
+    dut.wr_start.value = 0
+    await p_wr
+    while dut.wr_finish.value.integer == 0:
+        await RisingEdge(dut.clk)
+
+
+async def dma_read(dut, tb: Testbench, addr: int, length: int, burps: bool) -> list[int]:
+    dut.rd_start.value = 1
+    dut.rd_addr.value = addr
+    dut.rd_len_bytes.value = length
+    p_rd = start_soon(tb.s_axis.read(all_signals=True, burps=burps))
+    await RisingEdge(dut.clk)
+    while dut.rd_ack.value.integer == 0:
+        await RisingEdge(dut.clk)
+    dut.rd_start.value = 0
+    rd = await p_rd
+    for _, _, tkeep in rd[:-1]:
+        assert tkeep == 2**BYTES_PER_BEAT - 1, f'Partial beat before the last one: {hex(tkeep)}'
+    beats = Beats(
+        data=as_words([tdata for tdata, _, _ in rd], P_DATA_W),
+        last=np.arange(len(rd)) == len(rd) - 1,
+        keep=as_words([tkeep for _, _, tkeep in rd], BYTES_PER_BEAT),
+    )
+    return beats_to_bytes(beats, P_DATA_W).tolist()
+
+
+async def tb_check_write_read(
+    dut,
+    burps: bool,
+    addr_offset: int,
+    length: int,
+    base_addr: int = 0x200,
+    burst_len: int = P_BURST_LEN,
+):
+    tb = Testbench(dut)
+    await tb.init_test()
+    dut.wr_burst_len.value = burst_len
+    dut.rd_burst_len.value = burst_len
+    start_soon(check_4k_boundaries(dut, 'AW'))
+    start_soon(check_4k_boundaries(dut, 'AR'))
+
+    addr = base_addr + addr_offset
+    for i in range(3):
+        background = [random.getrandbits(8) for _ in range(MEM_SIZE)]
+        memory_init(memory=tb.memory, addr=0, data=background, element_size_bits=8)
+        data = [random.getrandbits(8) for _ in range(length)]
+
+        dut._log.info(f'Dma write #{i}: {length} bytes at {hex(addr)}')
+        await dma_write(dut=dut, tb=tb, addr=addr, data=data, burps=burps)
+        # Bytes around the transfer are untouched
+        start = addr - 2 * BYTES_PER_BEAT
+        end = addr + length + 2 * BYTES_PER_BEAT
+        expected = memory_image(MEM_SIZE, [(addr, data)], init=background)[start:end]
+        check_memory_bytes(memory=tb.memory, base_addr=start, expected=expected.tolist())
+
+        dut._log.info(f'Dma read #{i}')
+        rd = await dma_read(dut=dut, tb=tb, addr=addr, length=length, burps=burps)
+        assert rd == data, f'Data mismatch in read #{i}:\n{rd}\n!=\n{data}'
+
+
+tf_tb_check_write_read = TestFactory(test_function=tb_check_write_read)
+tf_tb_check_write_read.add_option('burps', [False, True])
+tf_tb_check_write_read.add_option('addr_offset', sorted({0, 1, BYTES_PER_BEAT - 1}))
+tf_tb_check_write_read.add_option('length', [
+    1,
+    BYTES_PER_BEAT - 1,
+    2 * P_BURST_LEN * BYTES_PER_BEAT,
+    2 * P_BURST_LEN * BYTES_PER_BEAT + 3,
+])
+tf_tb_check_write_read.generate_tests()
+
+# Bursts that are not a power of two, starting a few beats below a 4KB
+# boundary
+tf_tb_check_4k_boundary = TestFactory(test_function=tb_check_write_read)
+tf_tb_check_4k_boundary.add_option('burps', [False])
+tf_tb_check_4k_boundary.add_option('addr_offset', sorted({0, 1, BYTES_PER_BEAT - 1}))
+tf_tb_check_4k_boundary.add_option('length', [2 * P_BURST_LEN * BYTES_PER_BEAT + 3])
+tf_tb_check_4k_boundary.add_option('base_addr', [0x1000 - 5 * BYTES_PER_BEAT])
+tf_tb_check_4k_boundary.add_option('burst_len', [min(P_BURST_LEN, 3)])
+tf_tb_check_4k_boundary.generate_tests(postfix='_4k')
@@ -12,6 +12,8 @@ from hdl_utils.test.example_reg_map import get_example_reg_map_factory
 P_ADDR_W = int(os.environ['P_ADDR_W'])
 P_DATA_W = int(os.environ['P_DATA_W'])
 P_HIGHEST_ADDR = int(os.environ['P_HIGHEST_ADDR'])
+P_PIPELINED = bool(int(os.environ.get('P_PIPELINED', 0)))
+P_READ_LATENCY = int(os.environ.get('P_READ_LATENCY', 1))
 
 ADDR_JUMP = P_DATA_W // 8
 
@@ -135,3 +137,65 @@ async def check_core(dut):
     assert rd == 0x0011, f'{hex(rd)} != {hex(0x0011)}'
     rd = await tb.m_axil.read('reg_rw_3')
     assert rd == 0x0011, f'{hex(rd)} != {hex(0x0011)}'
+
+
+@cocotb.test(skip=not P_PIPELINED)
+async def check_back_to_back_reads(dut):
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    await tb.m_axil.write_reg(addr=0x0, value=0x12345678)
+    await tb.m_axil.write_reg(addr=0x4, value=0xaabbccdd)
+    await tb.m_axil.write_reg(addr=0x8, value=0x00000011)
+
+    # Keep ARVALID and RREADY high: one address accepted and one data
+    # returned per cycle.
+    addresses = [0x0, 0x4, 0x8, 0x4, 0x0]
+    expected = [0x12345678, 0xaabbccdd, 0x00000011, 0xaabbccdd, 0x12345678]
+    bus = tb.m_axil.bus
+    bus.RREADY.value = 1
+    bus.ARVALID.value = 1
+    bus.ARADDR.value = addresses[0]
+    rd = []
+    n_accepted = 0
+    n_cycles = 0
+    while len(rd) < len(addresses):
+        await RisingEdge(dut.clk)
+        n_cycles += 1
+        if tb.m_axil.r_accepted():
+            rd.append(tb.m_axil.rdata)
+        if tb.m_axil.ar_accepted():
+            n_accepted += 1
+            if n_accepted < len(addresses):
+                bus.ARADDR.value = addresses[n_accepted]
+            else:
+                bus.ARVALID.value = 0
+    bus.RREADY.value = 0
+    assert rd == expected, f'{[hex(x) for x in rd]} != {[hex(x) for x in expected]}'
+    expected_cycles = len(addresses) + P_READ_LATENCY
+    assert n_cycles == expected_cycles, f'{n_cycles} != {expected_cycles}'
+
+
+@cocotb.test()
+async def check_write_strobes(dut):
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    await tb.m_axil.write('reg_rw_1', 0x12345678)
+    # Single byte
+    await tb.m_axil.write('reg_rw_1', 0xaabbccdd, strb=0b0100)
+    rd = await tb.m_axil.read('reg_rw_1')
+    assert rd == 0x12bb5678, f'{hex(rd)} != {hex(0x12bb5678)}'
+    # Half word
+    await tb.m_axil.write('reg_rw_1', 0xaabbccdd, strb=0b0011)
+    rd = await tb.m_axil.read('reg_rw_1')
+    assert rd == 0x12bbccdd, f'{hex(rd)} != {hex(0x12bbccdd)}'
+    # No strobes, no change
+    await tb.m_axil.write('reg_rw_1', 0x00000000, strb=0b0000)
+    rd = await tb.m_axil.read('reg_rw_1')
+    assert rd == 0x12bbccdd, f'{hex(rd)} != {hex(0x12bbccdd)}'
+    # Field update in a single transaction: field_4 is reg_rw_2[31:16]
+    await tb.m_axil.write('reg_rw_2', 0x00000001)
+    await tb.m_axil.write('reg_rw_2', 0xbeef << 16, strb=0b1100)
+    assert dut.field_4.value.integer == 0xbeef
+    assert dut.field_2.value.integer == 1
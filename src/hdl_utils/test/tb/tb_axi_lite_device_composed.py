@@ -0,0 +1,83 @@
+import cocotb
+from cocotb.clock import Clock
+from cocotb import start_soon
+from cocotb.triggers import RisingEdge
+import random
+
+from hdl_utils.cocotb_utils.buses.axi_lite import AXI4LiteMaster
+
+from hdl_utils.test.example_reg_map import get_example_composer
+
+
+ADDR_JUMP = 4
+
+
+composer = get_example_composer(32)
+reg_map = composer.generate_register_map()
+register_arrays = {
+    name: (dir, addr, depth, width)
+    for name, dir, addr, depth, width in composer.generate_register_arrays()
+}
+
+
+class Testbench:
+    clk_period = 10
+
+    def __init__(self, dut):
+        self.dut = dut
+        self.m_axil = AXI4LiteMaster(entity=dut, name='s_axil_', clock=dut.clk, reg_map=reg_map)
+
+    def init_signals(self):
+        for blk in ('blk_a', 'blk_b'):
+            for field in ('field_10', 'field_20', 'field_30', 'field_40', 'field_50'):
+                getattr(self.dut, f'{blk}_{field}').value = 0
+        self.dut.blk_b_lut_addr.value = 0
+        self.dut.blk_b_capture_addr.value = 0
+        self.dut.blk_b_capture_data.value = 0
+        self.dut.blk_b_capture_we.value = 0
+
+    async def init_test(self):
+        start_soon(Clock(self.dut.clk, self.clk_period, units='ns').start())
+        self.init_signals()
+        self.dut.rst.value = 1
+        for _ in range(3):
+            await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+
+
+@cocotb.test()
+async def check_blocks(dut):
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    # Same register in both blocks holds independent values
+    await tb.m_axil.write('blk_a_reg_rw_1', 0x12345678)
+    await tb.m_axil.write('blk_b_reg_rw_1', 0xaabbccdd)
+    rd = await tb.m_axil.read('blk_a_reg_rw_1')
+    assert rd == 0x12345678, f'{hex(rd)} != {hex(0x12345678)}'
+    rd = await tb.m_axil.read('blk_b_reg_rw_1')
+    assert rd == 0xaabbccdd, f'{hex(rd)} != {hex(0xaabbccdd)}'
+    assert dut.blk_a_field_1.value.integer == 0x12345678
+    assert dut.blk_b_field_1.value.integer == 0xaabbccdd
+
+    dut.blk_a_field_10.value = 0x40302010
+    dut.blk_b_field_10.value = 0x01020304
+    await RisingEdge(dut.clk)
+    rd = await tb.m_axil.read('blk_a_reg_ro_1')
+    assert rd == 0x40302010, f'{hex(rd)} != {hex(0x40302010)}'
+    rd = await tb.m_axil.read('blk_b_reg_ro_1')
+    assert rd == 0x01020304, f'{hex(rd)} != {hex(0x01020304)}'
+
+    # Register array inside a block window
+    _, lut_addr, lut_depth, lut_width = register_arrays['blk_b_lut']
+    lut = [random.getrandbits(lut_width) for _ in range(lut_depth)]
+    for i, value in enumerate(lut):
+        await tb.m_axil.write_reg(addr=lut_addr + i * ADDR_JUMP, value=value)
+    for i, value in enumerate(lut):
+        rd = await tb.m_axil.read_reg(addr=lut_addr + i * ADDR_JUMP)
+        assert rd == value, f'lut[{i}]: {hex(rd)} != {hex(value)}'
+
+    # Registers keep their values after accessing the array
+    rd = await tb.m_axil.read('blk_a_reg_rw_1')
+    assert rd == 0x12345678, f'{hex(rd)} != {hex(0x12345678)}'
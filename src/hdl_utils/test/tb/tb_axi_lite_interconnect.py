@@ -0,0 +1,102 @@
+import cocotb
+from cocotb import start_soon
+from cocotb.triggers import Combine, RisingEdge
+
+from hdl_utils.test.example_reg_map import get_example_composer
+
+# check_blocks runs here too: the interconnect with one device per block
+# behaves as the composed device
+from tb.tb_axi_lite_device_composed import Testbench, check_blocks
+
+
+RESP_OKAY = 0b00
+RESP_DECERR = 0b11
+
+composer = get_example_composer(32)
+windows = composer.generate_windows()
+
+
+def unmapped_addresses() -> list[int]:
+    """Addresses outside every window."""
+    addr_w = composer.get_min_addr_width()
+    return [
+        addr for addr in range(0, 2**addr_w, 4)
+        if not any(w_addr <= addr < w_addr + w_size for _, w_addr, w_size in windows)
+    ]
+
+
+async def record_transactions(tb: Testbench, in_flight: list):
+    """Append, every cycle, the number of writes (AW to B) and reads (AR to
+    R) in flight.
+    """
+    writes = reads = 0
+    while True:
+        await RisingEdge(tb.dut.clk)
+        writes += tb.m_axil.aw_accepted() - tb.m_axil.b_accepted()
+        reads += tb.m_axil.ar_accepted() - tb.m_axil.r_accepted()
+        in_flight.append((writes, reads))
+
+
+@cocotb.test()
+async def check_unmapped(dut):
+    # Accesses outside every window are answered with DECERR, reads with 0
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    addresses = unmapped_addresses()
+    assert len(addresses)
+    await tb.m_axil.write('blk_a_reg_rw_1', 0x12345678)
+    for addr in (addresses[0], addresses[-1]):
+        await tb.m_axil.write_reg(addr=addr, value=0xffffffff)
+        assert tb.m_axil.last_bresp == RESP_DECERR, f'{hex(addr)}: bresp {tb.m_axil.last_bresp}'
+        rd = await tb.m_axil.read_reg(addr=addr)
+        assert tb.m_axil.last_rresp == RESP_DECERR, f'{hex(addr)}: rresp {tb.m_axil.last_rresp}'
+        assert rd == 0, f'{hex(addr)}: {hex(rd)} != 0'
+
+    # Mapped registers are untouched and still answer OKAY
+    rd = await tb.m_axil.read('blk_a_reg_rw_1')
+    assert tb.m_axil.last_rresp == RESP_OKAY
+    assert rd == 0x12345678, f'{hex(rd)} != {hex(0x12345678)}'
+    await tb.m_axil.write('blk_b_reg_rw_1', 0xaabbccdd)
+    assert tb.m_axil.last_bresp == RESP_OKAY
+
+
+@cocotb.test()
+async def check_read_write_in_flight(dut):
+    # A read and a write at the same time, to different and to the same
+    # slave, and with an unmapped address on one side
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    await tb.m_axil.write('blk_a_reg_rw_1', 0x11111111)
+    await tb.m_axil.write('blk_b_reg_rw_1', 0x22222222)
+    in_flight = []
+    start_soon(record_transactions(tb, in_flight))
+
+    cases = [
+        # (write register, value, read register, expected read)
+        ('blk_a_reg_rw_2', 0x33333333, 'blk_b_reg_rw_1', 0x22222222),
+        ('blk_b_reg_rw_2', 0x44444444, 'blk_a_reg_rw_1', 0x11111111),
+        ('blk_a_reg_rw_3', 0x55555555, 'blk_a_reg_rw_1', 0x11111111),
+        (unmapped_addresses()[0], 0x66666666, 'blk_b_reg_rw_1', 0x22222222),
+        ('blk_b_reg_rw_3', 0x77777777, unmapped_addresses()[0], 0),
+    ]
+    for wr_reg, value, rd_reg, expected in cases:
+        in_flight.clear()
+        p_wr = start_soon(tb.m_axil.write(wr_reg, value))
+        p_rd = start_soon(tb.m_axil.read(rd_reg))
+        await Combine(p_wr, p_rd)
+        rd = p_rd.result()
+        assert rd == expected, f'{rd_reg}: {hex(rd)} != {hex(expected)}'
+        assert any(writes and reads for writes, reads in in_flight), (
+            f'{wr_reg}/{rd_reg}: the write and the read were never in flight together'
+        )
+
+    for reg, expected in [
+        ('blk_a_reg_rw_2', 0x33333333),
+        ('blk_b_reg_rw_2', 0x44444444),
+        ('blk_a_reg_rw_3', 0x55555555),
+        ('blk_b_reg_rw_3', 0x77777777),
+    ]:
+        rd = await tb.m_axil.read(reg)
+        assert rd == expected, f'{reg}: {hex(rd)} != {hex(expected)}'
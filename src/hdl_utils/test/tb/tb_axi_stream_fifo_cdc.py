@@ -17,6 +17,7 @@ from hdl_utils.cocotb_utils.buses.axi_stream import (
 P_DATA_W = int(os.environ['P_DATA_W'])
 P_USER_W = int(os.environ['P_USER_W'])
 P_DEPTH = int(os.environ['P_DEPTH'])
+P_PACKET_MODE = bool(int(os.environ['P_PACKET_MODE']))
 
 
 class Testbench:
@@ -103,6 +104,35 @@ async def check_ports(dut):
         assert len(dut.wr_domain_rst) == 1
     else:
         assert len(dut.wr_domain_rstn) == 1
+    if P_PACKET_MODE:
+        assert len(dut.packet_count) == (P_DEPTH + 1).bit_length()
+        assert len(dut.w_packet_count) == (P_DEPTH + 1).bit_length()
+        assert len(dut.w_beats_free) == (P_DEPTH + 1).bit_length()
+
+
+@cocotb.test(skip=not P_PACKET_MODE)
+async def check_packet_occupancy(dut):
+    tb = Testbench(dut, period_ns_w=10, period_ns_r=22)
+    await tb.init_test()
+    tb.slave.bus.tready.value = 0
+
+    # Single beat packets fill the fifo, counted on both sides
+    datas = [_getrandbits(P_DATA_W, 1) for _ in range(P_DEPTH)]
+    await tb.master.write_multiple(datas)
+    for _ in range(10):
+        await RisingEdge(dut.rd_domain_clk)
+    assert int(dut.packet_count.value) == P_DEPTH
+    assert int(dut.w_packet_count.value) == P_DEPTH
+    assert int(dut.w_beats_free.value) == 0
+
+    for data in datas:
+        rd = await tb.slave.read()
+        assert rd == data
+    for _ in range(10):
+        await RisingEdge(dut.wr_domain_clk)
+    assert int(dut.packet_count.value) == 0
+    assert int(dut.w_packet_count.value) == 0
+    assert int(dut.w_beats_free.value) == P_DEPTH
 
 
 async def tb_check_core(
@@ -0,0 +1,143 @@
+import cocotb
+from cocotb import start_soon
+from cocotb.clock import Clock
+from cocotb.regression import TestFactory
+from cocotb.triggers import RisingEdge
+import os
+import random
+
+from hdl_utils.cocotb_utils.buses.axi_stream import (
+    AXIStreamMaster,
+    AXIStreamSlave,
+)
+
+P_DATA_W = int(os.environ['P_DATA_W'])
+P_USER_W = int(os.environ['P_USER_W'])
+P_DEPTH = int(os.environ['P_DEPTH'])
+P_CUT_THROUGH = int(os.environ['P_CUT_THROUGH'])  # -1: disabled
+P_DROP_ON_ERROR = bool(int(os.environ['P_DROP_ON_ERROR']))
+
+
+class Testbench:
+
+    period_ns = 10
+
+    def __init__(self, dut):
+        self.dut = dut
+        self.master = AXIStreamMaster(entity=dut, name='s_axis_', clock=dut.clk)
+        self.slave = AXIStreamSlave(entity=dut, name='m_axis_', clock=dut.clk)
+
+    def _init_signals(self):
+        if P_USER_W:
+            self.master.bus.tuser.value = 0
+        if P_CUT_THROUGH >= 0:
+            assert int(self.dut.cut_through_threshold.value) == P_CUT_THROUGH
+
+    async def init_test(self):
+        start_soon(Clock(self.dut.clk, self.period_ns, 'ns').start())
+        self.dut.rst.value = 1
+        for _ in range(3):
+            await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        for _ in range(2):
+            await RisingEdge(self.dut.clk)
+        self._init_signals()
+
+
+def _getrandbits(width: int, length: int):
+    return [
+        random.getrandbits(width)
+        for _ in range(length)
+    ]
+
+
+@cocotb.test(skip=P_CUT_THROUGH < 0)
+async def check_cut_through(dut):
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    async def write_without_tlast(data: list[int]):
+        for d in data:
+            tb.master.bus.tdata.value = d
+            tb.master.bus.tlast.value = 0
+            tb.master.bus.tvalid.value = 1
+            await RisingEdge(dut.clk)
+            while not tb.master.accepted():
+                await RisingEdge(dut.clk)
+        tb.master.bus.tvalid.value = 0
+
+    # Beats below the threshold are held
+    data = _getrandbits(P_DATA_W, P_DEPTH - 1)
+    await write_without_tlast(data[:P_CUT_THROUGH - 1])
+    for _ in range(5):
+        await RisingEdge(dut.clk)
+        assert int(dut.m_axis__tvalid.value) == 0
+    assert int(dut.packet_count.value) == 0
+
+    # The packet starts once the threshold is reached, before its tlast
+    p_rd = start_soon(tb.slave.read())
+    await write_without_tlast(data[P_CUT_THROUGH - 1:P_CUT_THROUGH])
+    for _ in range(5):
+        await RisingEdge(dut.clk)
+    assert int(dut.m_axis__tvalid.value) == 0  # Already read what was there
+    await tb.master.write(data[P_CUT_THROUGH:])
+    rd = await p_rd
+    assert rd == data
+
+
+@cocotb.test(skip=not P_DROP_ON_ERROR)
+async def check_drop_on_error(dut):
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    # Packets flagged with an error at tlast and oversize packets are dropped
+    packets = []
+    for _ in range(20):
+        length = random.choice([1, P_DEPTH // 2, P_DEPTH - 1, P_DEPTH + 2])
+        error = random.random() < 0.3
+        packets.append((_getrandbits(P_DATA_W, length), error))
+    expected = [d for d, error in packets if not error and len(d) < P_DEPTH]
+
+    n_dropped = 0
+
+    async def count_drops():
+        nonlocal n_dropped
+        while True:
+            await RisingEdge(dut.clk)
+            n_dropped += int(dut.packet_dropped.value)
+
+    start_soon(count_drops())
+
+    async def write_packets():
+        for data, error in packets:
+            user = [0] * (len(data) - 1) + [int(error)]
+            await tb.master.write(data, user=user, burps=True)
+
+    p_wr = start_soon(write_packets())
+    for data in expected:
+        rd = await tb.slave.read(burps=True)
+        assert rd == data
+    await p_wr
+    for _ in range(5):
+        await RisingEdge(dut.clk)
+    assert int(dut.m_axis__tvalid.value) == 0
+    assert int(dut.packet_count.value) == 0
+    assert n_dropped == len(packets) - len(expected)
+
+
+async def tb_check_packets(dut, burps_in: bool, burps_out: bool):
+    # Good packets go through whatever the option
+    tb = Testbench(dut)
+    await tb.init_test()
+    datas = [_getrandbits(P_DATA_W, random.randint(1, P_DEPTH - 1)) for _ in range(20)]
+    p_wr = start_soon(tb.master.write_multiple(datas, burps=burps_in))
+    for data in datas:
+        rd = await tb.slave.read(burps=burps_out)
+        assert rd == data
+    await p_wr
+
+
+tf_check_packets = TestFactory(test_function=tb_check_packets)
+tf_check_packets.add_option('burps_in', [False, True])
+tf_check_packets.add_option('burps_out', [False, True])
+tf_check_packets.generate_tests()
@@ -0,0 +1,114 @@
+import cocotb
+from cocotb import start_soon
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+import os
+import random
+
+from hdl_utils.cocotb_utils.buses.axi_stream import (
+    AXIStreamMaster,
+    AXIStreamSlave,
+)
+
+P_DATA_W = int(os.environ['P_DATA_W'])
+P_DEPTH = int(os.environ['P_DEPTH'])
+P_ALMOST_FULL = int(os.environ['P_ALMOST_FULL'])
+P_ALMOST_EMPTY = int(os.environ['P_ALMOST_EMPTY'])
+P_RUNTIME_THRESHOLDS = bool(int(os.environ['P_RUNTIME_THRESHOLDS']))
+P_CDC = bool(int(os.environ['P_CDC']))
+
+
+class Testbench:
+
+    period_ns_w = 10
+    period_ns_r = 22
+
+    def __init__(self, dut):
+        self.dut = dut
+        if P_CDC:
+            self.clk_w = dut.wr_domain_clk
+            self.clk_r = dut.rd_domain_clk
+            self.rst = [dut.wr_domain_rst, dut.rd_domain_rst]
+        else:
+            self.clk_w = dut.clk
+            self.clk_r = dut.clk
+            self.rst = [dut.rst]
+        self.master = AXIStreamMaster(entity=dut, name='s_axis_', clock=self.clk_w)
+        self.slave = AXIStreamSlave(entity=dut, name='m_axis_', clock=self.clk_r)
+
+    def _init_signals(self):
+        self.slave.bus.tready.value = 0
+        if P_RUNTIME_THRESHOLDS:
+            self.dut.almost_full_threshold.value = P_ALMOST_FULL
+            self.dut.almost_empty_threshold.value = P_ALMOST_EMPTY
+
+    async def init_test(self):
+        start_soon(Clock(self.clk_w, self.period_ns_w, 'ns').start())
+        if P_CDC:
+            start_soon(Clock(self.clk_r, self.period_ns_r, 'ns').start())
+        self._init_signals()
+        for rst in self.rst:
+            rst.value = 1
+        for _ in range(3):
+            await RisingEdge(self.clk_r)
+        for rst in self.rst:
+            rst.value = 0
+        await self.settle()
+
+    async def settle(self):
+        # Let the levels cross the domains and the flags register
+        for _ in range(6):
+            await RisingEdge(self.clk_r)
+        await RisingEdge(self.clk_w)
+
+    def check_flags(self, level: int, almost_full: int, almost_empty: int):
+        expected_full = int(level >= almost_full)
+        expected_empty = int(level <= almost_empty)
+        assert int(self.dut.almost_full.value) == expected_full, f'level {level}'
+        assert int(self.dut.almost_empty.value) == expected_empty, f'level {level}'
+        if P_CDC:
+            assert int(self.dut.r_almost_full.value) == expected_full, f'level {level}'
+            assert int(self.dut.w_almost_empty.value) == expected_empty, f'level {level}'
+
+
+@cocotb.test()
+async def check_ports(dut):
+    assert len(dut.almost_full) == 1
+    assert len(dut.almost_empty) == 1
+    assert hasattr(dut, 'r_almost_full') == P_CDC
+    assert hasattr(dut, 'w_almost_empty') == P_CDC
+    assert hasattr(dut, 'almost_full_threshold') == P_RUNTIME_THRESHOLDS
+    assert hasattr(dut, 'almost_empty_threshold') == P_RUNTIME_THRESHOLDS
+
+
+async def fill_and_drain(tb: Testbench, almost_full: int, almost_empty: int):
+    datas = [[random.getrandbits(P_DATA_W)] for _ in range(P_DEPTH)]
+    tb.check_flags(0, almost_full, almost_empty)
+    for i, data in enumerate(datas):
+        await tb.master.write(data)
+        await tb.settle()
+        tb.check_flags(i + 1, almost_full, almost_empty)
+    for i, data in enumerate(datas):
+        rd = await tb.slave.read()
+        assert rd == data
+        tb.slave.bus.tready.value = 0
+        await tb.settle()
+        tb.check_flags(P_DEPTH - i - 1, almost_full, almost_empty)
+
+
+@cocotb.test()
+async def check_thresholds(dut):
+    tb = Testbench(dut)
+    await tb.init_test()
+    await fill_and_drain(tb, P_ALMOST_FULL, P_ALMOST_EMPTY)
+
+
+@cocotb.test(skip=not P_RUNTIME_THRESHOLDS)
+async def check_runtime_thresholds(dut):
+    tb = Testbench(dut)
+    await tb.init_test()
+    almost_full, almost_empty = P_DEPTH // 4, P_DEPTH - 2
+    dut.almost_full_threshold.value = almost_full
+    dut.almost_empty_threshold.value = almost_empty
+    await tb.settle()
+    await fill_and_drain(tb, almost_full, almost_empty)
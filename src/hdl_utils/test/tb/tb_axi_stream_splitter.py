@@ -22,6 +22,7 @@ P_DATA_W = int(os.environ.get('P_DATA_W'))
 P_USER_W = int(os.environ.get('P_USER_W'))
 P_NO_TKEEP = int(os.environ.get('P_NO_TKEEP'))
 P_N_SPLIT = int(os.environ.get('P_N_SPLIT'))
+P_FIFO_DEPTH = int(os.environ.get('P_FIFO_DEPTH', 0))  # 0: no fifos
 
 
 class Testbench:
@@ -224,6 +225,25 @@ async def tb_check_core(
 
 
 
+@cocotb.test(skip=not P_FIFO_DEPTH)
+async def tb_check_independent_outputs(dut):
+    # A stalled output doesn't stop the others while its FIFO has room
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    length = P_FIFO_DEPTH - 2
+    data = _getrandbits(P_DATA_W, length)
+    p_wr = start_soon(tb.master.write(data))
+    rds = [
+        await with_timeout(slave.read(), 100 * length * tb.clk_period, 'ns')
+        for slave in tb.slaves[1:]
+    ]
+    await p_wr
+    for rd in rds:
+        assert rd == data
+    assert int(tb.slaves[0].bus.tvalid.value) == 1
+    assert await tb.slaves[0].read() == data
+
 
 tf_tb_check_core_basic = TestFactory(test_function=tb_check_core)
 tf_tb_check_core_basic.add_option('burps_in', [True])
@@ -1,7 +1,7 @@
 import cocotb
 from cocotb.clock import Clock
 from cocotb import start_soon
-from cocotb.triggers import RisingEdge
+from cocotb.triggers import FallingEdge, RisingEdge
 import os
 import random
 
@@ -16,15 +16,20 @@ P_USER_W = int(os.environ['P_USER_W'])
 
 ADDR_JUMP = P_DATA_W // 8
 MEM_SIZE = 0x10000
+RESP_OKAY = 0b00
+RESP_SLVERR = 0b10
+RESP_DECERR = 0b11
 
 
 class Testbench:
     clk_period = 10
 
-    def __init__(self, dut):
+    def __init__(self, dut, **memory_kwargs):
         self.dut = dut
         self.memory = Memory(size=MEM_SIZE)
-        self.memory_ctrl = self.memory.create_axi(entity=dut, prefix="m_axi_", clock=dut.clk)
+        self.memory_ctrl = self.memory.create_axi(
+            entity=dut, prefix="m_axi_", clock=dut.clk, **memory_kwargs,
+        )
         self.m_axis = AXIStreamMaster(dut, "s_axis_", dut.clk)
         self.s_axis = AXIStreamSlave(dut, "m_axis_", dut.clk)
 
@@ -37,6 +42,7 @@ class Testbench:
         self.dut.rd_addr.value = 0
         self.dut.wr_valid.value = 0
         self.dut.rd_valid.value = 0
+        self.dut.wr_error_clear.value = 0
 
     async def init_test(self):
         start_soon(Clock(self.dut.clk, self.clk_period, units='ns').start())
@@ -126,6 +132,9 @@ async def check_ports(dut):
     assert len(dut.wr_ready) == 1
     assert len(dut.rd_valid) == 1
     assert len(dut.rd_ready) == 1
+    assert len(dut.wr_error) == 1
+    assert len(dut.wr_error_resp) == 2
+    assert len(dut.wr_error_clear) == 1
 
 
 async def write_burst(
@@ -434,6 +443,132 @@ async def check_multiple_writes_reads(dut):
         assert rd == expected_data, f"{rd}\n!=\n{expected_data}"
 
 
+async def record_handshakes(dut, ch: str, cycles: list):
+    """Append the cycle of every handshake of an m_axi channel."""
+    valid = getattr(dut, f'm_axi__{ch}VALID')
+    ready = getattr(dut, f'm_axi__{ch}READY')
+    cycle = 0
+    while True:
+        await RisingEdge(dut.clk)
+        cycle += 1
+        if valid.value.integer and ready.value.integer:
+            cycles.append(cycle)
+
+
+async def clear_on_response(dut, bresp: int):
+    """Assert wr_error_clear in the cycle of the next B handshake with
+    bresp.
+    """
+    while True:
+        await FallingEdge(dut.clk)
+        if (dut.m_axi__BVALID.value.integer and dut.m_axi__BREADY.value.integer
+                and dut.m_axi__BRESP.value.integer == bresp):
+            break
+    dut.wr_error_clear.value = 1
+    await RisingEdge(dut.clk)
+    dut.wr_error_clear.value = 0
+
+
+@cocotb.test()
+async def check_write_responses(dut):
+    # Back to back writes don't wait for the write responses
+    b_latency = 16
+    tb = Testbench(dut, b_latency=b_latency)
+    await tb.init_test()
+
+    burst_len = 4
+    n_bursts = 8
+    datas = [
+        [random.getrandbits(P_DATA_W) for _ in range(burst_len)]
+        for _ in range(n_bursts)
+    ]
+    aw_cycles = []
+    b_cycles = []
+    start_soon(record_handshakes(dut, 'AW', aw_cycles))
+    start_soon(record_handshakes(dut, 'B', b_cycles))
+    for i, data in enumerate(datas):
+        await write_burst(
+            dut=dut,
+            tb=tb,
+            addr=0x200 + i * burst_len * ADDR_JUMP,
+            data=data,
+        )
+
+    while dut.wr_outstanding.value.integer != 0:
+        await RisingEdge(dut.clk)
+    assert dut.wr_error.value.integer == 0
+    assert len(aw_cycles) == len(b_cycles) == n_bursts
+    # The address of every burst is sent before the response of the
+    # previous one
+    for i in range(n_bursts - 1):
+        assert aw_cycles[i + 1] < b_cycles[i], (
+            f'AW #{i + 1} (cycle {aw_cycles[i + 1]}) after B #{i} (cycle {b_cycles[i]})'
+        )
+    for i, data in enumerate(datas):
+        check_memory(
+            memory=tb.memory,
+            base_addr=0x200 + i * burst_len * ADDR_JUMP,
+            expected=data,
+        )
+
+
+@cocotb.test()
+async def check_write_error_responses(dut):
+    # wr_error holds the first error response until wr_error_clear, and an
+    # error in the same cycle as the clear sets it again
+    burst_len = 4
+    n_bytes = burst_len * ADDR_JUMP
+    addresses = [0x200 + i * n_bytes for i in range(6)]
+    responses = {
+        addresses[1]: RESP_SLVERR,
+        addresses[2]: RESP_DECERR,
+        addresses[4]: RESP_DECERR,
+        addresses[5]: RESP_SLVERR,
+    }
+
+    def write_response(awaddr: int, awlen: int) -> int:
+        return responses.get(awaddr, RESP_OKAY)
+
+    tb = Testbench(dut, write_response=write_response, b_latency=4)
+    await tb.init_test()
+
+    async def write(i: int):
+        data = [random.getrandbits(P_DATA_W) for _ in range(burst_len)]
+        await write_burst(dut=dut, tb=tb, addr=addresses[i], data=data)
+        while dut.wr_outstanding.value.integer != 0:
+            await RisingEdge(dut.clk)
+        await RisingEdge(dut.clk)
+
+    def check_error(error: int, resp: int):
+        assert dut.wr_error.value.integer == error
+        assert dut.wr_error_resp.value.integer == resp, (
+            f'wr_error_resp: {dut.wr_error_resp.value.integer} != {resp}'
+        )
+
+    await write(0)
+    check_error(0, RESP_OKAY)
+    # The first error is kept
+    await write(1)
+    check_error(1, RESP_SLVERR)
+    await write(2)
+    check_error(1, RESP_SLVERR)
+    # Clear
+    dut.wr_error_clear.value = 1
+    await RisingEdge(dut.clk)
+    dut.wr_error_clear.value = 0
+    await RisingEdge(dut.clk)
+    check_error(0, RESP_OKAY)
+    await write(3)
+    check_error(0, RESP_OKAY)
+    await write(4)
+    check_error(1, RESP_DECERR)
+    # Clear in the same cycle as a new error: the new error wins
+    p_clear = start_soon(clear_on_response(dut, RESP_SLVERR))
+    await write(5)
+    await p_clear
+    check_error(1, RESP_SLVERR)
+
+
 @cocotb.test()
 async def check_write_early_tlast(dut):
     # Perform an incomplete write with early tlast
@@ -19,6 +19,7 @@ from hdl_utils.cocotb_utils.tb_utils import width_converter_down
 P_DWI = int(os.environ.get('P_DWI'))
 P_DWO = int(os.environ.get('P_DWO'))
 P_UWI = int(os.environ.get('P_UWI'))
+P_COMPACT = bool(int(os.environ.get('P_COMPACT', '0')))
 
 
 class Testbench:
@@ -149,6 +150,12 @@ async def run_and_check_result(dut, tb, data_in, user_in, keep_in,
             expected_keep_out.pop()
         else:
             break
+    if P_COMPACT:
+        # Null sub-words are skipped anywhere in the packet
+        not_null = [i for i, keep in enumerate(expected_keep_out) if keep]
+        expected_data_out = [expected_data_out[i] for i in not_null]
+        expected_user_out = [expected_user_out[i] for i in not_null]
+        expected_keep_out = [expected_keep_out[i] for i in not_null]
 
     p_send = start_soon(tb.m_axi.write(
         data=data_in, user=user_in, keep=keep_in, burps=burps_in))
@@ -225,6 +232,28 @@ async def tb_partial_tkeep(dut, burps_in, burps_out):
                                burps_in=burps_in, burps_out=burps_out)
 
 
+async def tb_null_subwords(dut, burps_in, burps_out):
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    # Start monitors
+    start_soon(tb.s_axi.run_monitor())
+    start_soon(tb.m_axi.run_monitor())
+
+    STREAM_LENGTH = 10
+    data_in = [random.getrandbits(tb.data_width_in) for _ in range(STREAM_LENGTH)]
+    user_in = [random.getrandbits(P_UWI) for _ in range(STREAM_LENGTH)]
+    # Null sub-words anywhere, the last word is not null
+    keep_in = [
+        random.getrandbits(P_DWI // 8) & random.getrandbits(P_DWI // 8)
+        for _ in range(STREAM_LENGTH)
+    ]
+    keep_in[-1] |= 0x1
+
+    await run_and_check_result(dut, tb, data_in, user_in, keep_in,
+                               burps_in=burps_in, burps_out=burps_out)
+
+
 # @cocotb.test()
 async def tb_check_no_clock_wasted(dut):
     tb = Testbench(dut)
@@ -288,5 +317,14 @@ tf_tb_partial_tkeep.add_option(
 )
 tf_tb_partial_tkeep.generate_tests()
 
+# Test Null sub-words in the middle of the packet (compact mode)
+if P_COMPACT:
+    tf_tb_null_subwords = TestFactory(test_function=tb_null_subwords)
+    tf_tb_null_subwords.add_option(
+        ("burps_in", "burps_out"),
+        [(False, False), (True, False), (False, True), (True, True)]
+    )
+    tf_tb_null_subwords.generate_tests()
+
 # Test Check No Clock Cycle is Wasted
 TestFactory(test_function=tb_check_no_clock_wasted).generate_tests()
@@ -0,0 +1,155 @@
+import cocotb
+from cocotb import start_soon
+from cocotb.clock import Clock
+from cocotb.regression import TestFactory
+from cocotb.triggers import RisingEdge
+from cocotb.utils import get_sim_time
+import math
+import numpy as np
+import os
+import random
+
+from hdl_utils.cocotb_utils.buses.axi_stream import AXIStreamMaster, AXIStreamSlave
+from hdl_utils.models import from_packets, to_packets, width_converter_gearbox
+
+P_DWI = int(os.environ['P_DWI'])
+P_DWO = int(os.environ['P_DWO'])
+P_UWI = int(os.environ['P_UWI'])
+
+UNIT_W = math.gcd(P_DWI, P_DWO)
+UNITS_I = P_DWI // UNIT_W
+UNITS_O = P_DWO // UNIT_W
+P_UWO = P_UWI // UNITS_I * UNITS_O
+
+
+class Testbench:
+
+    clk_period = 10
+
+    def __init__(self, dut):
+        self.dut = dut
+        self.master = AXIStreamMaster(entity=dut, name='s_axis_', clock=dut.clk)
+        self.slave = AXIStreamSlave(entity=dut, name='m_axis_', clock=dut.clk)
+
+    def _init_signals(self):
+        self.dut.s_axis__tvalid.value = 0
+        self.dut.s_axis__tlast.value = 0
+        self.dut.s_axis__tkeep.value = 0
+        if P_UWI:
+            self.dut.s_axis__tuser.value = 0
+        self.dut.m_axis__tready.value = 0
+
+    async def init_test(self):
+        start_soon(Clock(self.dut.clk, self.clk_period, units='ns').start())
+        self._init_signals()
+        self.dut.rst.value = 1
+        for _ in range(3):
+            await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+
+
+def random_packet(length: int, partial_last: bool):
+    data = [random.getrandbits(P_DWI) for _ in range(length)]
+    user = [random.getrandbits(P_UWI) for _ in range(length)]
+    keep = [2**(P_DWI // 8) - 1] * length
+    if partial_last:
+        keep[-1] = 2**random.randint(1, P_DWI // 8) - 1
+    return data, user, keep
+
+
+def expected_packets(packets: list[tuple]) -> list[list[tuple]]:
+    """Output beats (tdata, tuser, tkeep) of every packet."""
+    beats = from_packets(
+        datas=[p[0] for p in packets],
+        data_w=P_DWI,
+        users=[p[1] for p in packets],
+        user_w=P_UWI,
+        keeps=[p[2] for p in packets],
+    )
+    out = width_converter_gearbox(beats, P_DWI, P_DWO, P_UWI)
+    user = out.user if P_UWI else np.zeros(len(out), dtype=np.uint64)
+    return [
+        list(zip(*fields))
+        for fields in zip(*[to_packets(x, out.last) for x in (out.data, user, out.keep)])
+    ]
+
+
+@cocotb.test()
+async def check_ports(dut):
+    assert len(dut.s_axis__tdata) == P_DWI
+    assert len(dut.s_axis__tkeep) == P_DWI // 8
+    assert len(dut.m_axis__tdata) == P_DWO
+    assert len(dut.m_axis__tkeep) == P_DWO // 8
+    if P_UWI:
+        assert len(dut.s_axis__tuser) == P_UWI
+        assert len(dut.m_axis__tuser) == P_UWO
+
+
+async def tb_write_read(dut, burps_in: bool, burps_out: bool, partial_last: bool):
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    packets = [
+        random_packet(random.randint(1, 4 * UNITS_O), partial_last)
+        for _ in range(20)
+    ]
+    p_wr = start_soon(tb.master.write_multiple(
+        datas=[p[0] for p in packets],
+        users=[p[1] for p in packets] if P_UWI else None,
+        keeps=[p[2] for p in packets],
+        burps=burps_in,
+    ))
+    for i, expected in enumerate(expected_packets(packets)):
+        rd = await tb.slave.read(all_signals=True, burps=burps_out)
+        rd = [(tdata, tuser if P_UWI else 0, tkeep) for tdata, tuser, tkeep in rd]
+        assert rd == expected, f'Packet #{i}:\n{rd}\n!=\n{expected}'
+    await p_wr
+
+
+@cocotb.test()
+async def check_throughput(dut):
+    # One beat per cycle on the slowest side, without bubbles
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    length = 100 * UNITS_O
+    data, user, keep = random_packet(length, partial_last=False)
+    p_rd = start_soon(tb.slave.read())
+    t_start = get_sim_time('ns')
+    await tb.master.write(data=data, user=user if P_UWI else None, keep=keep)
+    await p_rd
+    elapsed = round((get_sim_time('ns') - t_start) / tb.clk_period)
+    expected = max(length, length * UNITS_I // UNITS_O)
+    assert elapsed <= expected + 4, f'{elapsed} cycles > {expected} (+4)'
+
+
+@cocotb.test()
+async def check_throughput_short_packets(dut):
+    # Packet boundaries don't add bubbles: the slowest side still runs at
+    # one beat per cycle with packets of a few beats
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    packets = [random_packet(length, partial_last=False) for length in [1, 2, 3] * 20]
+    n_in = sum(len(p[0]) for p in packets)
+    n_out = sum(math.ceil(len(p[0]) * UNITS_I / UNITS_O) for p in packets)
+    p_rd = start_soon(tb.slave.read_multiple(n_streams=len(packets), force_sync_clk_edge=False))
+    t_start = get_sim_time('ns')
+    await tb.master.write_multiple(
+        datas=[p[0] for p in packets],
+        users=[p[1] for p in packets] if P_UWI else None,
+        keeps=[p[2] for p in packets],
+        force_sync_clk_edge=False,
+    )
+    await p_rd
+    elapsed = round((get_sim_time('ns') - t_start) / tb.clk_period)
+    expected = max(n_in, n_out)
+    assert elapsed <= expected + 4, f'{elapsed} cycles > {expected} (+4)'
+
+
+tf_write_read = TestFactory(test_function=tb_write_read)
+tf_write_read.add_option('burps_in', [False, True])
+tf_write_read.add_option('burps_out', [False, True])
+tf_write_read.add_option('partial_last', [False, True])
+tf_write_read.generate_tests()
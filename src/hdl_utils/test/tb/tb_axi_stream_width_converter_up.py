@@ -239,6 +239,31 @@ async def tb_check_no_clock_wasted(dut):
     ), f'{elapsed_clk_cycles_per_input} != {expected_clk_cycles_per_input}'
 
 
+async def tb_check_no_clock_wasted_packets(dut):
+    # Packets ending mid output word don't stall the input
+    tb = Testbench(dut)
+    await tb.init_test()
+
+    lengths = [random.randint(1, 2 * tb.scale_factor) for _ in range(50)]
+    datas = [[random.getrandbits(tb.data_width_in) for _ in range(n)] for n in lengths]
+    users = [[random.getrandbits(P_UWI) for _ in range(n)] for n in lengths]
+    keeps = [[2**(P_DWI // 8) - 1] * n for n in lengths]
+
+    p_recv = start_soon(tb.s_axi.read_multiple(n_streams=len(datas), force_sync_clk_edge=False))
+    t_start = get_sim_time('ns')
+    await tb.m_axi.write_multiple(datas=datas, users=users, keeps=keeps, force_sync_clk_edge=False)
+    elapsed_clk_cycles = int(np.round((get_sim_time('ns') - t_start) / tb.clk_period))
+    rd = await p_recv
+
+    assert elapsed_clk_cycles == sum(lengths), f'{elapsed_clk_cycles} != {sum(lengths)}'
+    for data, data_out in zip(datas, rd):
+        expected_data_out = width_converter_up(
+            data_in=data,
+            width_in=tb.data_width_in,
+            width_out=tb.data_width_out)
+        assert data_out == expected_data_out, f'{data_out} != {expected_data_out}'
+
+
 # --- Tests Generation ---
 
 # Test Check Signals' length
@@ -262,3 +287,4 @@ tf_tb_write_read_multiple.generate_tests()
 
 # Test Check No Clock Cycle is Wasted
 TestFactory(test_function=tb_check_no_clock_wasted).generate_tests()
+TestFactory(test_function=tb_check_no_clock_wasted_packets).generate_tests()
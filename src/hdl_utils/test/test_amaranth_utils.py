@@ -89,8 +89,13 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
         self.run_testbench(core, test_module, ports,
                            vcd_file=vcd_file, env=env)
 
-    @pytest.mark.parametrize('addr_w,data_w', [(8, 32)])
-    def test_axi_lite_device(self, addr_w, data_w):
+    @pytest.mark.parametrize('addr_w,data_w,pipelined,registered_decode', [
+        (8, 32, False, False),
+        (8, 32, True, False),
+        (8, 32, False, True),
+        (8, 32, True, True),
+    ])
+    def test_axi_lite_device(self, addr_w, data_w, pipelined, registered_decode):
         from hdl_utils.amaranth_utils.axi_lite_device import AxiLiteDevice
         from hdl_utils.test.example_reg_map import get_example_reg_map_factory
         reg_map_factory = get_example_reg_map_factory(data_w)
@@ -102,24 +107,132 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
         core = AxiLiteDevice(
             addr_w=addr_w,
             data_w=data_w,
-            registers_map=registers_map
+            registers_map=registers_map,
+            pipelined=pipelined,
+            registered_decode=registered_decode,
         )
         ports = core.get_ports()
         test_module = 'tb.tb_axi_lite_device'
-        vcd_file = in_waveform_dir('axi_lite_device.py.vcd')
+        postfix = '_pipelined' if pipelined else ''
+        postfix += '_rdec' if registered_decode else ''
+        vcd_file = in_waveform_dir(f'axi_lite_device{postfix}.py.vcd')
         env = {
             'P_ADDR_W': str(addr_w),
             'P_DATA_W': str(data_w),
-            'P_HIGHEST_ADDR': str(highest_addr)
+            'P_HIGHEST_ADDR': str(highest_addr),
+            'P_PIPELINED': str(int(pipelined)),
+            'P_READ_LATENCY': str(1 + int(registered_decode)),
         }
         self.run_testbench(core, test_module, ports,
                            vcd_file=vcd_file, env=env)
 
-    @pytest.mark.parametrize('data_w,user_w,depth,packet_mode', [
-        (8, 2, 16, False),
-        (8, 2, 16, True),
+    @pytest.mark.parametrize('data_w,pipelined', [(32, False), (32, True)])
+    def test_axi_lite_device_register_array(self, data_w, pipelined):
+        from hdl_utils.amaranth_utils.axi_lite_device import AxiLiteDevice
+        from hdl_utils.test.example_reg_map import (
+            get_example_reg_map_factory,
+            get_example_register_arrays,
+        )
+        reg_map_factory = get_example_reg_map_factory(data_w)
+        reg_map_factory.allocate_register_arrays(get_example_register_arrays())
+        core = AxiLiteDevice(
+            addr_w=reg_map_factory.get_min_addr_width(),
+            data_w=data_w,
+            registers_map=reg_map_factory.generate_register_map(),
+            register_arrays=reg_map_factory.generate_register_arrays(),
+            pipelined=pipelined,
+        )
+        ports = core.get_ports()
+        test_module = 'tb.tb_axi_lite_device_register_array'
+        postfix = '_pipelined' if pipelined else ''
+        vcd_file = in_waveform_dir(f'axi_lite_device_register_array{postfix}.py.vcd')
+        env = {
+            'P_DATA_W': str(data_w),
+        }
+        self.run_testbench(core, test_module, ports,
+                           vcd_file=vcd_file, env=env)
+
+    @pytest.mark.parametrize('pipelined', [False, True])
+    def test_axi_lite_device_composed(self, pipelined):
+        from hdl_utils.amaranth_utils.axi_lite_device import AxiLiteDevice
+        from hdl_utils.test.example_reg_map import get_example_composer
+        composer = get_example_composer(32)
+        core = AxiLiteDevice(
+            addr_w=composer.get_min_addr_width(),
+            data_w=32,
+            registers_map=composer.generate_register_map(),
+            register_arrays=composer.generate_register_arrays(),
+            windows=composer.generate_windows(),
+            pipelined=pipelined,
+        )
+        ports = core.get_ports()
+        test_module = 'tb.tb_axi_lite_device_composed'
+        postfix = '_pipelined' if pipelined else ''
+        vcd_file = in_waveform_dir(f'axi_lite_device_composed{postfix}.py.vcd')
+        self.run_testbench(core, test_module, ports, vcd_file=vcd_file)
+
+    @pytest.mark.parametrize('registered_channels', [(), ('aw', 'w', 'b', 'ar', 'r')])
+    def test_axi_lite_interconnect(self, registered_channels):
+        from amaranth import Elaboratable, Module
+        from amaranth.lib import wiring
+        from hdl_utils.amaranth_utils.axi_lite_device import AxiLiteDevice
+        from hdl_utils.amaranth_utils.axi_lite_interconnect import AxiLiteInterconnect
+        from hdl_utils.test.example_reg_map import get_example_composer
+        # Same blocks as test_axi_lite_device_composed, one device per block
+        composer = get_example_composer(32)
+        interconnect = AxiLiteInterconnect(
+            addr_w=composer.get_min_addr_width(),
+            data_w=32,
+            address_map=composer.generate_windows(),
+            registered_channels=registered_channels,
+        )
+        devices = {
+            name: AxiLiteDevice(
+                addr_w=interconnect.window_addr_w(size),
+                data_w=32,
+                registers_map=composer.generate_block_register_map(name),
+                register_arrays=composer.generate_block_register_arrays(name),
+            )
+            for name, _, size in composer.generate_windows()
+        }
+
+        class Dummy(Elaboratable):
+            def elaborate(self, platform):
+                m = Module()
+                m.submodules.interconnect = interconnect
+                for name, device in devices.items():
+                    m.submodules[name] = device
+                    wiring.connect(m, interconnect.masters[name], device.axi_lite)
+                return m
+
+        core = Dummy()
+        ports = interconnect.axi_lite.extract_signals()
+        for device in devices.values():
+            ports += list(device.reg_fields.values())
+            for array in device.arrays.values():
+                ports += array.get_ports()
+        test_module = 'tb.tb_axi_lite_interconnect'
+        postfix = '_registered' if registered_channels else ''
+        vcd_file = in_waveform_dir(f'axi_lite_interconnect{postfix}.py.vcd')
+        self.run_testbench(core, test_module, ports, vcd_file=vcd_file)
+
+    @pytest.mark.parametrize('data_w,user_w,depth,packet_mode,ram_style,reg_output', [
+        (8, 2, 16, False, None, False),
+        (8, 2, 16, True, None, False),
+        (8, 2, 16, False, 'lutram', False),
+        (8, 2, 16, False, 'lutram', True),
+        (8, 2, 128, False, 'auto', True),
+        (8, 2, 16, False, 'bram', True),
     ])
-    def test_axi_stream_fifo(self, data_w: int, user_w: int, depth: int, packet_mode: bool):
+    def test_axi_stream_fifo(
+        self,
+        data_w: int,
+        user_w: int,
+        depth: int,
+        packet_mode: bool,
+        ram_style: str,
+        reg_output: bool,
+    ):
         from hdl_utils.amaranth_utils.axi_stream_fifo import AXIStreamFIFO
 
         core = AXIStreamFIFO(
@@ -127,12 +240,18 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
             user_w=user_w,
             depth=depth,
             packet_mode=packet_mode,
+            ram_style=ram_style,
+            reg_output=reg_output,
         )
         ports = core.get_ports()
         test_module = 'tb.tb_axi_stream_pass_through'
         base_name = f'tb_axi_stream_fifo_{data_w}_{user_w}_{depth}'
         if packet_mode:
             base_name += '_packet'
+        if ram_style is not None:
+            base_name += f'_{ram_style}'
+        if reg_output:
+            base_name += '_reg'
         vcd_file = in_waveform_dir(f'{base_name}.vcd')
         env = {
             'P_DATA_W': str(data_w),
@@ -151,12 +270,129 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
             vcd_file = in_waveform_dir(f'{base_name}.vcd')
             self.run_testbench(core, test_module, ports, vcd_file=vcd_file, env=env)
 
-    @pytest.mark.parametrize('data_w,user_w,depth,max_fifo_depth', [
-        (8, 2, 16, 8),
-        (8, 2, 16, 7),
+    @pytest.mark.parametrize('data_w,user_w,depth,cut_through,drop_on_error', [
+        (8, 2, 16, 4, False),
+        (8, 1, 16, None, True),
+        (8, 1, 9, None, True),
     ])
-    def test_fast_clk_axi_stream_fifo(self, data_w: int, user_w: int, depth: int, max_fifo_depth: int):
-        from hdl_utils.amaranth_utils.axi_stream_fifo import FastClkAXIStreamFIFO
+    def test_axi_stream_fifo_packet_options(
+        self,
+        data_w: int,
+        user_w: int,
+        depth: int,
+        cut_through: int,
+        drop_on_error: bool,
+    ):
+        from hdl_utils.amaranth_utils.axi_stream_fifo import AXIStreamFIFO
+
+        core = AXIStreamFIFO(
+            data_w=data_w,
+            user_w=user_w,
+            depth=depth,
+            packet_mode=True,
+            cut_through=cut_through,
+            drop_on_error=drop_on_error,
+        )
+        ports = core.get_ports()
+        test_module = 'tb.tb_axi_stream_fifo_packet_options'
+        base_name = f'tb_axi_stream_fifo_packet_options_{data_w}_{user_w}_{depth}'
+        base_name += f'_{cut_through}_{int(drop_on_error)}'
+        vcd_file = in_waveform_dir(f'{base_name}.vcd')
+        env = {
+            'P_DATA_W': str(data_w),
+            'P_USER_W': str(user_w),
+            'P_DEPTH': str(depth),
+            'P_CUT_THROUGH': str(-1 if cut_through is None else cut_through),
+            'P_DROP_ON_ERROR': str(int(drop_on_error)),
+        }
+        self.run_testbench(core, test_module, ports, vcd_file=vcd_file, env=env)
+
+    @pytest.mark.parametrize('depth,almost_full,almost_empty,runtime_thresholds,cdc', [
+        (16, 12, 3, False, False),
+        (16, 12, 3, True, False),
+        (16, 12, 3, True, True),
+    ])
+    def test_axi_stream_fifo_thresholds(
+        self,
+        depth: int,
+        almost_full: int,
+        almost_empty: int,
+        runtime_thresholds: bool,
+        cdc: bool,
+    ):
+        from hdl_utils.amaranth_utils.axi_stream_fifo import AXIStreamFIFO
+
+        kwargs = dict(
+            data_w=8,
+            user_w=0,
+            depth=depth,
+            almost_full_level=almost_full,
+            almost_empty_level=almost_empty,
+            runtime_thresholds=runtime_thresholds,
+        )
+        if cdc:
+            core = AXIStreamFIFO.CreateCDC(r_domain='rd_domain', w_domain='wr_domain', **kwargs)
+        else:
+            core = AXIStreamFIFO(**kwargs)
+        ports = core.get_ports()
+        test_module = 'tb.tb_axi_stream_fifo_thresholds'
+        base_name = f'tb_axi_stream_fifo_thresholds_{depth}_{almost_full}_{almost_empty}'
+        if runtime_thresholds:
+            base_name += '_runtime'
+        if cdc:
+            base_name += '_cdc'
+        vcd_file = in_waveform_dir(f'{base_name}.vcd')
+        env = {
+            'P_DATA_W': '8',
+            'P_DEPTH': str(depth),
+            'P_ALMOST_FULL': str(almost_full),
+            'P_ALMOST_EMPTY': str(almost_empty),
+            'P_RUNTIME_THRESHOLDS': str(int(runtime_thresholds)),
+            'P_CDC': str(int(cdc)),
+        }
+        self.run_testbench(core, test_module, ports, vcd_file=vcd_file, env=env)
+
+    @pytest.mark.parametrize('data_w,depth,ram_style,fifo_cls_name', [
+        (8, 16, 'auto', 'SyncFIFO'),
+        (8, 64, 'auto', 'SyncFIFO'),
+        (8, 65, 'auto', 'SyncFIFOBuffered'),
+        (128, 64, 'auto', 'SyncFIFO'),
+        # Wide and shallow: 577 bits x 64 doesn't fit the LUTRAM budget
+        (512, 64, 'auto', 'SyncFIFOBuffered'),
+        (512, 16, 'auto', 'SyncFIFO'),
+        (8, 1024, 'lutram', 'SyncFIFO'),
+        (512, 64, 'lutram', 'SyncFIFO'),
+        (8, 16, 'bram', 'SyncFIFOBuffered'),
+    ])
+    def test_axi_stream_fifo_ram_style(
+        self,
+        data_w: int,
+        depth: int,
+        ram_style: str,
+        fifo_cls_name: str,
+    ):
+        from hdl_utils.amaranth_utils.axi_stream_fifo import AXIStreamFIFO
+
+        core = AXIStreamFIFO(data_w=data_w, user_w=0, depth=depth, ram_style=ram_style)
+        assert type(core.fifo).__name__ == fifo_cls_name
+        assert core.fifo.depth == depth
+        with pytest.raises(AssertionError):
+            AXIStreamFIFO(data_w=data_w, user_w=0, depth=depth, ram_style='uram')
+
+    @pytest.mark.parametrize('data_w,user_w,depth,max_fifo_depth,max_fifo_width', [
+        (8, 2, 16, 8, None),
+        (8, 2, 16, 7, None),
+        (8, 2, 16, 7, 4),
+    ])
+    def test_fast_clk_axi_stream_fifo(
+        self,
+        data_w: int,
+        user_w: int,
+        depth: int,
+        max_fifo_depth: int,
+        max_fifo_width: int,
+    ):
+        from hdl_utils.amaranth_utils.axi_stream_fifo import FastClkAXIStreamFIFO, LanedSyncFIFO
         from hdl_utils.amaranth_utils.skid_buffer import AXISkidBuffer
         import math
         n_fifos = int(math.ceil(depth / max_fifo_depth))
@@ -165,8 +401,14 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
             user_w=user_w,
             depth=depth,
             max_fifo_depth=max_fifo_depth,
+            max_fifo_width=max_fifo_width,
         )
         assert len(core.fifos) == n_fifos
+        if max_fifo_width is not None:
+            for f in core.fifos:
+                fifo = f.wrapped_core.fifo
+                assert isinstance(fifo, LanedSyncFIFO)
+                assert fifo.n_lanes == math.ceil(fifo.width / max_fifo_width)
         for i in range(n_fifos - 1):
             assert isinstance(core.fifos[i].skid_buffer_in, AXISkidBuffer)
             assert getattr(core.fifos[i], 'skid_buffer_out') is None
@@ -176,7 +418,9 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
         assert core.source is core.fifos[-1].skid_buffer_out.source
         ports = core.get_ports()
         test_module = 'tb.tb_axi_stream_pass_through'
-        vcd_file = in_waveform_dir(f'tb_fast_clk_axi_stream_fifo_{data_w}_{user_w}_{depth}_{max_fifo_depth}.vcd')
+        vcd_file = in_waveform_dir(
+            f'tb_fast_clk_axi_stream_fifo_{data_w}_{user_w}_{depth}_{max_fifo_depth}_{max_fifo_width}.vcd'
+        )
         env = {
             'P_DATA_W': str(data_w),
             'P_USER_W': str(user_w),
@@ -187,16 +431,18 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
         }
         self.run_testbench(core, test_module, ports, vcd_file=vcd_file, env=env)
 
-    @pytest.mark.parametrize('data_w,user_w,depth,low_reset', [
-        (8, 2, 8, False),
-        (8, 2, 8, True),
+    @pytest.mark.parametrize('data_w,user_w,depth,low_reset,packet_mode', [
+        (8, 2, 8, False, False),
+        (8, 2, 8, True, False),
+        (8, 2, 8, False, True),
     ])
     def test_axi_stream_fifo_cdc(
         self,
         data_w: int,
         user_w: int,
         depth: int,
-        low_reset: bool
+        low_reset: bool,
+        packet_mode: bool,
     ):
         from hdl_utils.amaranth_utils.axi_stream_fifo import AXIStreamFIFO
 
@@ -204,6 +450,7 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
             data_w=data_w,
             user_w=user_w,
             depth=depth,
+            packet_mode=packet_mode,
             r_domain='rd_domain',
             w_domain='wr_domain',
             # fifo_cls: Elaboratable = AsyncFIFO,
@@ -216,13 +463,16 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
             pfx = '_rstn'
         else:
             pfx = ''
+        if packet_mode:
+            pfx += '_packet'
         ports = core.get_ports()
         test_module = 'tb.tb_axi_stream_fifo_cdc'
         vcd_file = in_waveform_dir(f'tb_axi_stream_fifo_cdc_{data_w}_{user_w}_{depth}{pfx}.vcd')
         env = {
             'P_DATA_W': str(data_w),
             'P_USER_W': str(user_w),
-            'P_DEPTH': str(depth)
+            'P_DEPTH': str(depth),
+            'P_PACKET_MODE': str(int(packet_mode)),
         }
         self.run_testbench(core, test_module, ports,
                            vcd_file=vcd_file, env=env)
@@ -380,17 +630,82 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
                 user_w_i=UWI,
             )
 
-    @pytest.mark.parametrize('addr_w,data_w,user_w', [(32, 128, 0)])
-    def test_axi_stream_to_full(self, addr_w, data_w, user_w):
+    @pytest.mark.parametrize('DWI,DWO,UWI', [(32, 8, 4), (48, 16, 3)])
+    def test_width_converter_compact(self, DWI, DWO, UWI):
+        from hdl_utils.amaranth_utils.axi_stream_width_converter import \
+            AXIStreamWidthConverter
+
+        core = AXIStreamWidthConverter(
+            data_w_i=DWI,
+            data_w_o=DWO,
+            user_w_i=UWI,
+            compact=True,
+        )
+        ports = core.get_ports()
+        test_module = 'tb.tb_axi_stream_width_converter_down'
+        vcd_file = in_waveform_dir(f'tb_axi_stream_width_converter_{DWI}_{DWO}_{UWI}_compact.vcd')
+        env = {
+            'P_DWI': str(DWI),
+            'P_DWO': str(DWO),
+            'P_UWI': str(UWI),
+            'P_COMPACT': '1',
+        }
+        self.run_testbench(core, test_module, ports,
+                           vcd_file=vcd_file, env=env)
+
+    @pytest.mark.parametrize(
+        'DWI,DWO,UWI',
+        [
+            (24, 32, 3),
+            (32, 24, 4),
+            (40, 16, 5),
+            (16, 40, 2),
+            (24, 8, 3),
+        ]
+    )
+    def test_width_converter_gearbox(self, DWI, DWO, UWI):
+        from hdl_utils.amaranth_utils.axi_stream_width_converter import \
+            AXIStreamWidthConverter
+
+        core = AXIStreamWidthConverter(
+            data_w_i=DWI,
+            data_w_o=DWO,
+            user_w_i=UWI,
+            gearbox=True,
+        )
+        assert core.convertion_mode == AXIStreamWidthConverter.GEARBOX
+        ports = core.get_ports()
+        test_module = 'tb.tb_axi_stream_width_converter_gearbox'
+        vcd_file = in_waveform_dir(f'tb_axi_stream_width_converter_gearbox_{DWI}_{DWO}_{UWI}.vcd')
+        env = {
+            'P_DWI': str(DWI),
+            'P_DWO': str(DWO),
+            'P_UWI': str(UWI),
+        }
+        self.run_testbench(core, test_module, ports,
+                           vcd_file=vcd_file, env=env)
+
+    @pytest.mark.parametrize('addr_w,data_w,user_w,reg_w,reg_r,rd_fifo_depth', [
+        (32, 128, 0, False, False, 0),
+        (32, 128, 0, True, True, 0),
+        (32, 128, 0, False, False, 512),
+        (32, 128, 0, True, True, 16),
+    ])
+    def test_axi_stream_to_full(self, addr_w, data_w, user_w, reg_w, reg_r, rd_fifo_depth):
         from hdl_utils.amaranth_utils.axi_stream_to_full import AxiStreamToFull
         core = AxiStreamToFull(
             addr_w=addr_w,
             data_w=data_w,
             user_w=user_w,
+            reg_w=reg_w,
+            reg_r=reg_r,
+            rd_fifo_depth=rd_fifo_depth,
         )
         ports = core.get_ports()
         test_module = 'tb.tb_axi_stream_to_full'
-        vcd_file = in_waveform_dir('tb_axi_stream_to_full.py.vcd')
+        vcd_file = in_waveform_dir(
+            f'tb_axi_stream_to_full_{int(reg_w)}{int(reg_r)}_{rd_fifo_depth}.py.vcd'
+        )
         env = {
             'P_ADDR_W': str(addr_w),
             'P_DATA_W': str(data_w),
@@ -398,31 +713,87 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
         }
         self.run_testbench(core, test_module, ports, vcd_file=vcd_file, env=env)
 
-    @pytest.mark.parametrize('addr_w,data_w,user_w,burst_len', [(32, 128, 0, 8)])
-    def test_axi_dma(self, addr_w, data_w, user_w, burst_len):
+    @pytest.mark.parametrize('addr_w,data_w,user_w,burst_len,perf_counters', [
+        (32, 128, 0, 8, False),
+        (32, 128, 0, 8, True),
+    ])
+    def test_axi_dma(self, addr_w, data_w, user_w, burst_len, perf_counters):
         from hdl_utils.amaranth_utils.axi_dma import AxiDma
         core = AxiDma(
             addr_w=addr_w,
             data_w=data_w,
             user_w=user_w,
             burst_len=burst_len,
+            perf_counters=perf_counters,
         )
         ports = core.get_ports()
         test_module = 'tb.tb_axi_dma'
-        vcd_file = in_waveform_dir('tb_axi_dma.py.vcd')
+        vcd_file = in_waveform_dir(f'tb_axi_dma_{int(perf_counters)}.py.vcd')
         env = {
             'P_ADDR_W': str(addr_w),
             'P_DATA_W': str(data_w),
             'P_USER_W': str(user_w),
             'P_BURST_LEN': str(burst_len),
+            'P_PERF_COUNTERS': str(int(perf_counters)),
         }
         self.run_testbench(core, test_module, ports, vcd_file=vcd_file, env=env)
 
-    @pytest.mark.parametrize('addr_w,data_w,user_w,burst_len,ignore_rd_size_signal', [
-        (32, 128, 0, 8, False),
-        (32, 128, 0, 8, True),
+    @pytest.mark.parametrize('addr_w,data_w,user_w,burst_len', [(32, 64, 0, 8)])
+    def test_axi_dma_unaligned(self, addr_w, data_w, user_w, burst_len):
+        from hdl_utils.amaranth_utils.axi_dma import AxiDma
+        core = AxiDma(
+            addr_w=addr_w,
+            data_w=data_w,
+            user_w=user_w,
+            burst_len=burst_len,
+            unaligned=True,
+        )
+        ports = core.get_ports()
+        test_module = 'tb.tb_axi_dma_unaligned'
+        vcd_file = in_waveform_dir('tb_axi_dma_unaligned.py.vcd')
+        env = {
+            'P_ADDR_W': str(addr_w),
+            'P_DATA_W': str(data_w),
+            'P_USER_W': str(user_w),
+            'P_BURST_LEN': str(burst_len),
+        }
+        self.run_testbench(core, test_module, ports, vcd_file=vcd_file, env=env)
+
+    @pytest.mark.parametrize('n_masters,id_w', [(2, 0), (3, 2)])
+    def test_axi_arbiter(self, n_masters, id_w):
+        from hdl_utils.amaranth_utils.axi_arbiter import AxiArbiter
+        addr_w, data_w = 32, 64
+        core = AxiArbiter(
+            addr_w=addr_w,
+            data_w=data_w,
+            n_masters=n_masters,
+            id_w=id_w,
+        )
+        ports = core.get_ports()
+        test_module = 'tb.tb_axi_arbiter'
+        vcd_file = in_waveform_dir(f'tb_axi_arbiter_{n_masters}_{id_w}.py.vcd')
+        env = {
+            'P_ADDR_W': str(addr_w),
+            'P_DATA_W': str(data_w),
+            'P_N_MASTERS': str(n_masters),
+            'P_ID_W': str(id_w),
+        }
+        self.run_testbench(core, test_module, ports, vcd_file=vcd_file, env=env)
+
+    @pytest.mark.parametrize('addr_w,data_w,user_w,burst_len,ignore_rd_size_signal,rd_prefetch_depth', [
+        (32, 128, 0, 8, False, 0),
+        (32, 128, 0, 8, True, 0),
+        (32, 128, 0, 8, False, 32),
     ])
-    def test_axi_dma_triple_buffer(self, addr_w, data_w, user_w, burst_len, ignore_rd_size_signal):
+    def test_axi_dma_triple_buffer(
+        self,
+        addr_w,
+        data_w,
+        user_w,
+        burst_len,
+        ignore_rd_size_signal,
+        rd_prefetch_depth,
+    ):
         from hdl_utils.amaranth_utils.axi_dma_triple_buffer import AXIDmaTripleBuffer
         init_rd_size = 8
         core = AXIDmaTripleBuffer(
@@ -432,10 +803,11 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
             burst_len=burst_len,
             ignore_rd_size_signal=ignore_rd_size_signal,
             init_rd_size=init_rd_size,
+            rd_prefetch_depth=rd_prefetch_depth,
         )
         ports = core.get_ports()
         test_module = 'tb.tb_axi_dma_triple_buffer'
-        vcd_file = in_waveform_dir('tb_axi_dma_triple_buffer.py.vcd')
+        vcd_file = in_waveform_dir(f'tb_axi_dma_triple_buffer_{rd_prefetch_depth}.py.vcd')
         env = {
             'P_ADDR_W': str(addr_w),
             'P_DATA_W': str(data_w),
@@ -443,17 +815,20 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
             'P_BURST_LEN': str(burst_len),
             'P_INIT_RD_SIZE': str(init_rd_size),
             'P_IGNORE_RD_SIZE_SIGNAL': str(int(bool(ignore_rd_size_signal))),
+            'P_RD_PREFETCH_DEPTH': str(rd_prefetch_depth),
         }
         self.run_testbench(core, test_module, ports, vcd_file=vcd_file, env=env)
 
     @pytest.mark.parametrize(
-        'data_w,user_w,no_tkeep,n_split',
+        'data_w,user_w,no_tkeep,n_split,fifo_depth',
         [
-            (8, 1, True, 2),
-            (8, 1, True, 3),
-            (8, 1, True, 1),
-            (16, 1, False, 2),
-            (16, 2, False, 2),
+            (8, 1, True, 2, None),
+            (8, 1, True, 3, None),
+            (8, 1, True, 1, None),
+            (16, 1, False, 2, None),
+            (16, 2, False, 2, None),
+            (16, 2, False, 4, 8),
+            (8, 1, True, 16, 6),
         ]
     )
     def test_axis_splitter(
@@ -462,6 +837,7 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
         user_w: int,
         no_tkeep: bool,
         n_split: int,
+        fifo_depth: int,
     ):
         from hdl_utils.amaranth_utils.axi_stream_splitter import \
             AXIStreamSplitter
@@ -471,15 +847,17 @@ class TestbenchCoresAmaranth(TemplateTestbenchAmaranth):
             user_w=user_w,
             no_tkeep=no_tkeep,
             n_split=n_split,
+            fifo_depth=fifo_depth,
         )
         ports = core.get_ports()
         test_module = 'tb.tb_axi_stream_splitter'
-        vcd_file = in_waveform_dir(f'tb_axi_stream_splitter_{data_w}_{user_w}_{no_tkeep}_{n_split}.vcd')
+        vcd_file = in_waveform_dir(f'tb_axi_stream_splitter_{data_w}_{user_w}_{no_tkeep}_{n_split}_{fifo_depth}.vcd')
         env = {
             'P_DATA_W': str(data_w),
             'P_USER_W': str(user_w),
             'P_NO_TKEEP': str(int(no_tkeep)),
             'P_N_SPLIT': str(n_split),
+            'P_FIFO_DEPTH': str(fifo_depth or 0),
         }
         self.run_testbench(core, test_module, ports,
                            vcd_file=vcd_file, env=env)
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from hdl_utils.cli import CORES, generate, load_core_module, split_variants
+
+
+def test_split_variants():
+    assert split_variants(['a', '-x', '1', '+', 'b', '+']) == [
+        ['a', '-x', '1'],
+        ['b'],
+    ]
+
+
+def test_registry_modules_interface():
+    for name in CORES:
+        module = load_core_module(name)
+        assert callable(module.add_arguments)
+        assert callable(module.create_core)
+
+
+def test_unknown_core():
+    with pytest.raises(ValueError):
+        load_core_module('not_a_core')
+
+
+def test_cli_does_not_import_amaranth():
+    code = 'import sys, hdl_utils.cli; assert "amaranth" not in sys.modules'
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_generate_multiple_variants(tmp_path):
+    out_a = os.path.join(tmp_path, 'a.v')
+    out_b = os.path.join(tmp_path, 'b.v')
+    outputs = generate([
+        'skid_buffer', '-dw', '8', '-uw', '2', '-n', 'sb_a', '--out', out_a,
+        '+',
+        'axi_stream_fifo', '-dw', '16', '-uw', '0', '-d', '8', '-n', 'fifo_b', '--out', out_b,
+    ])
+    assert len(outputs) == 2
+    with open(out_a) as f:
+        assert 'module sb_a(' in f.read()
+    with open(out_b) as f:
+        assert 'module fifo_b(' in f.read()
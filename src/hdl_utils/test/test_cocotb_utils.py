@@ -1,6 +1,16 @@
+import random
+
+import numpy as np
+import pytest
+
 from hdl_utils.cocotb_utils.tb_utils import (
+    pack,
+    unpack,
+    pack_array,
+    unpack_array,
     width_converter_up,
     width_converter_down,
+    width_converter,
 )
 
 def test_width_converters():
@@ -16,3 +26,48 @@ def test_width_converters():
         width_in=24,
         width_out=8
     ) == din
+
+    assert width_converter(
+        data_in=[0x020100, 0x050403, 0x080706],
+        width_in=24,
+        width_out=32
+    ) == [0x03020100, 0x07060504, 0x08]
+
+    assert width_converter(
+        data_in=[0x03020100, 0x07060504, 0x08],
+        width_in=32,
+        width_out=24
+    ) == [0x020100, 0x050403, 0x080706, 0]
+
+
+@pytest.mark.parametrize('elements, element_width', [
+    (3, 8), (4, 16), (8, 8), (2, 32), (3, 24), (4, 3), (5, 12), (16, 8), (2, 128), (3, 40),
+])
+def test_pack_unpack_array(elements, element_width):
+    length = 100
+    items = [random.getrandbits(element_width) for _ in range(length)]
+    words = []
+    for i in range(0, length, elements):
+        chunk = items[i:i + elements]
+        words.append(sum(x << (j * element_width) for j, x in enumerate(chunk)))
+
+    packed = pack_array(items, elements, element_width)
+    assert packed.dtype == (np.uint64 if elements * element_width <= 64 else object)
+    assert packed.tolist() == words
+    assert pack_array(np.array(items, dtype=packed.dtype), elements, element_width).tolist() == words
+    assert list(pack(items, elements, element_width)) == words
+    assert list(pack(iter(items), elements, element_width)) == words
+
+    padded = items + [0] * (-length % elements)
+    unpacked = unpack_array(words, elements, element_width)
+    assert unpacked.dtype == (np.uint64 if element_width <= 64 else object)
+    assert unpacked.tolist() == padded
+    assert unpack_array(packed, elements, element_width).tolist() == padded
+    assert list(unpack(words, elements, element_width)) == padded
+
+
+def test_pack_bytes():
+    data = bytes(random.getrandbits(8) for _ in range(13))
+    assert pack_array(data, 4, 8).tolist() == list(pack(list(data), 4, 8))
+    assert pack_array(b'', 4, 8).tolist() == []
+    assert unpack_array([], 4, 8).tolist() == []
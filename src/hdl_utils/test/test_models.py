@@ -0,0 +1,212 @@
+import random
+import time
+
+import numpy as np
+import pytest
+
+from hdl_utils.cocotb_utils.tb_utils import (
+    pack,
+    unpack,
+    width_converter as width_converter_lists,
+)
+from hdl_utils.models import (
+    Beats,
+    split_words,
+    join_words,
+    from_packets,
+    to_packets,
+    width_converter_up,
+    width_converter_down,
+    width_converter_gearbox,
+    width_converter,
+    splitter,
+    fifo_packet_mode,
+    rate_limiter_starts,
+    bytes_to_beats,
+    beats_to_bytes,
+    memory_image,
+    burst_lengths,
+)
+
+
+def random_packets(n: int, max_length: int, width: int) -> list[list[int]]:
+    return [
+        [random.getrandbits(width) for _ in range(random.randint(1, max_length))]
+        for _ in range(n)
+    ]
+
+
+@pytest.mark.parametrize('elements, element_width', [(4, 8), (3, 24), (2, 64), (5, 32)])
+def test_split_join_words(elements, element_width):
+    words = [random.getrandbits(elements * element_width) for _ in range(100)]
+    units = split_words(words, elements, element_width)
+    assert units.shape == (100, elements)
+    assert units.reshape(-1).tolist() == list(unpack(words, elements, element_width))
+    assert join_words(units, element_width).tolist() == words
+
+
+@pytest.mark.parametrize('data_w_i, data_w_o, user_w_i', [
+    (8, 32, 1),
+    (16, 128, 2),
+    (64, 8, 8),
+    (128, 32, 4),
+    (24, 32, 3),
+    (32, 24, 4),
+    (64, 24, 0),
+])
+def test_width_converter_full_keep(data_w_i, data_w_o, user_w_i):
+    # Without null bytes, every packet is repacked on its own as the list
+    # based helper does
+    datas = random_packets(50, 20, data_w_i)
+    users = [[random.getrandbits(user_w_i) for _ in d] for d in datas]
+    keeps = [[2**(data_w_i // 8) - 1] * len(d) for d in datas]
+    beats = from_packets(datas, data_w_i, users=users, user_w=user_w_i, keeps=keeps)
+    user_w_o = user_w_i * data_w_o // data_w_i
+    for gearbox in [False, True]:
+        out = width_converter(beats, data_w_i, data_w_o, user_w_i, gearbox=gearbox)
+        # Beats with data (the padding of the last input word is not sent)
+        expected = [
+            width_converter_lists(d, data_w_i, data_w_o)[:-(-len(d) * data_w_i // data_w_o)]
+            for d in datas
+        ]
+        assert to_packets(out.data, out.last) == expected
+        if user_w_i:
+            for packet, u in zip(to_packets(out.user, out.last), users):
+                assert packet == width_converter_lists(u, user_w_i, user_w_o)[:len(packet)]
+        else:
+            assert out.user is None
+
+
+def test_width_converter_up_partial_packets():
+    beats = from_packets([[1, 2, 3], [4], [5, 6, 7, 8, 9]], 8, keeps=[[1] * 3, [1], [1] * 5])
+    out = width_converter_up(beats, 8, 32)
+    assert out.data.tolist() == [0x030201, 0x04, 0x08070605, 0x09]
+    assert out.keep.tolist() == [0x7, 0x1, 0xF, 0x1]
+    assert out.last.tolist() == [True, True, False, True]
+
+
+def test_width_converter_down_null_subwords():
+    keeps = [[0b0011, 0b1101], [0b0000]]
+    beats = from_packets([[0x44332211, 0x88776655], [0x99]], 32, keeps=keeps)
+    out = width_converter_down(beats, 32, 8)
+    # Trailing null sub-words of every word are skipped
+    assert out.data.tolist() == [0x11, 0x22, 0x55, 0x66, 0x77, 0x88, 0x99]
+    assert out.keep.tolist() == [1, 1, 1, 0, 1, 1, 0]
+    assert out.last.tolist() == [False, False, False, False, False, True, True]
+    out = width_converter_down(beats, 32, 8, compact=True)
+    assert out.data.tolist() == [0x11, 0x22, 0x55, 0x77, 0x88, 0x99]
+    assert out.keep.tolist() == [1, 1, 1, 1, 1, 0]
+    assert out.last.tolist() == [False, False, False, False, True, True]
+
+
+def test_width_converter_gearbox_partial_last():
+    # 24 -> 16 bits, units of 8 bits: the null units of the last word are
+    # dropped and the last output word is padded
+    beats = from_packets([[0x030201, 0x060504]], 24, keeps=[[0b111, 0b011]])
+    out = width_converter_gearbox(beats, 24, 16)
+    assert out.data.tolist() == [0x0201, 0x0403, 0x05]
+    assert out.keep.tolist() == [0b11, 0b11, 0b01]
+    assert out.last.tolist() == [False, False, True]
+
+
+def test_width_converter_wide_words():
+    datas = random_packets(20, 10, 256)
+    beats = from_packets(datas, 256)
+    assert beats.data.dtype == object
+    out = width_converter_down(width_converter_up(beats, 256, 1024), 1024, 256)
+    expected = [d + [0] * (-len(d) % 4) for d in datas]
+    assert to_packets(out.data, out.last) == expected
+
+
+def test_splitter():
+    beats = from_packets(random_packets(10, 10, 32), 32)
+    outputs = splitter(beats, 3)
+    assert len(outputs) == 3
+    for out in outputs:
+        assert out.data is not beats.data
+        assert out.data.tolist() == beats.data.tolist()
+        assert out.last.tolist() == beats.last.tolist()
+
+
+@pytest.mark.parametrize('drop_on_error', [False, True])
+def test_fifo_packet_mode(drop_on_error):
+    depth = 16
+    packets = [
+        (random_packets(1, random.choice([1, depth - 1, depth, depth + 2]), 32)[0], random.random() < 0.3)
+        for _ in range(50)
+    ]
+    datas = [d for d, _ in packets]
+    users = [[0] * (len(d) - 1) + [int(error) << 1] for d, error in packets]
+    beats = from_packets(datas, 32, users=users, user_w=2)
+    out, dropped = fifo_packet_mode(beats, depth, drop_on_error=drop_on_error, error_bit=1)
+    if drop_on_error:
+        expected = [d for d, error in packets if not error and len(d) < depth]
+    else:
+        expected = datas
+    assert to_packets(out.data, out.last) == expected
+    assert dropped.sum() == len(packets) - len(expected)
+
+
+def test_rate_limiter_starts():
+    # Packets shorter than the period start every max_cycles_per_packet
+    assert rate_limiter_starts([4] * 4, 10).tolist() == [0, 10, 20, 30]
+    # Longer ones start right after the previous one
+    assert rate_limiter_starts([4, 12, 4], 10).tolist() == [0, 10, 22]
+    # A packet arriving late starts on arrival
+    assert rate_limiter_starts([4, 4, 4], 10, arrivals=[0, 35, 36]).tolist() == [0, 35, 45]
+    assert rate_limiter_starts([3, 3], 0).tolist() == [0, 3]
+
+
+@pytest.mark.parametrize('data_w', [8, 32, 128])
+def test_dma_bytes(data_w):
+    bytes_per_beat = data_w // 8
+    for length in [1, bytes_per_beat, 3 * bytes_per_beat + 1]:
+        data = [random.getrandbits(8) for _ in range(length)]
+        beats = bytes_to_beats(data, data_w)
+        assert beats.data.tolist() == list(pack(data, bytes_per_beat, 8))
+        assert beats.last.tolist() == [False] * (len(beats) - 1) + [True]
+        assert beats.keep[:-1].tolist() == [2**bytes_per_beat - 1] * (len(beats) - 1)
+        assert beats_to_bytes(beats, data_w).tolist() == data
+        assert bytes_to_beats(bytes(data), data_w).data.tolist() == beats.data.tolist()
+
+
+def test_memory_image():
+    init = np.arange(64, dtype=np.uint8)
+    image = memory_image(64, [(3, b'\xaa\xbb'), (4, [0xcc, 0xdd]), (62, bytes(2))], init=init)
+    expected = list(range(64))
+    expected[3:6] = [0xaa, 0xcc, 0xdd]
+    expected[62:] = [0, 0]
+    assert image.tolist() == expected
+    assert init.tolist() == list(range(64))
+    with pytest.raises(AssertionError):
+        memory_image(64, [(63, b'\x00\x00')])
+
+
+def test_burst_lengths():
+    assert burst_lengths(0x200, 7, 3, 16) == [(0x200, 3), (0x230, 3), (0x260, 1)]
+    # Cut at the 4KB boundary, then restarted from it
+    assert burst_lengths(0x1000 - 5 * 16, 8, 3, 16) == [
+        (0xfb0, 3), (0xfe0, 2), (0x1000, 3),
+    ]
+    for addr, beats in burst_lengths(0xff8, 1000, 256, 8):
+        assert addr // 4096 == (addr + beats * 8 - 1) // 4096
+    assert sum(beats for _, beats in burst_lengths(0xff8, 1000, 256, 8)) == 1000
+
+
+def test_million_beats():
+    n = 1_000_000
+    rng = np.random.default_rng(0)
+    last = rng.random(n) < 0.01
+    last[-1] = True
+    beats = Beats(
+        data=rng.integers(0, 2**63, n, dtype=np.uint64),
+        last=last,
+        keep=np.full(n, 0xFF, dtype=np.uint64),
+    )
+    t_start = time.perf_counter()
+    out = width_converter(beats, 64, 16)
+    back = width_converter(out, 16, 64)
+    elapsed = time.perf_counter() - t_start
+    assert np.array_equal(back.data, beats.data)
+    assert np.array_equal(back.last, beats.last)
+    assert elapsed < 5, f'{elapsed:.2f}s'
@@ -0,0 +1,151 @@
+import pytest
+
+from hdl_utils.amaranth_utils.reg_map import (
+    Field,
+    Register,
+    RegisterArray,
+    RegisterMapFactory,
+)
+
+
+def test_register_array_allocation():
+    factory = RegisterMapFactory(reg_width=32)
+    factory.allocate_registers([
+        Register(name=f'reg_{i}', dir='rw', fields=[Field(name=f'f_{i}', width=32, offset=0)])
+        for i in range(5)
+    ])
+    factory.allocate_register_arrays([
+        RegisterArray(name='small', depth=4, width=32),
+        RegisterArray(name='big', depth=12, width=16),
+    ])
+    arrays = {name: (addr, depth) for name, _, addr, depth, _ in factory.generate_register_arrays()}
+    # Windows aligned to their size (rounded up to a power of two) and not
+    # overlapping the registers.
+    assert arrays['big'] == (0x40, 12)
+    assert arrays['small'] == (0x20, 4)
+    # New registers don't land inside an array window
+    entry = factory.add_entry(Register(name='reg_late', dir='rw', fields=[]))
+    assert entry[2] == 0x14
+    entry = factory.add_entry(Register(name='reg_later', dir='rw', fields=[]))
+    assert entry[2] == 0x18
+    assert factory.get_min_addr_width() == 7
+
+
+def test_register_array_conflict():
+    factory = RegisterMapFactory(reg_width=32)
+    factory.add_register_array(RegisterArray(name='a', depth=8, width=32), addr=0x20)
+    with pytest.raises(AssertionError):
+        factory.add_register_array(RegisterArray(name='b', depth=4, width=32), addr=0x30)
+    with pytest.raises(AssertionError):
+        factory.add_register_array(RegisterArray(name='c', depth=4, width=32), addr=0x08)
+
+
+def test_allocation_with_forced_addresses():
+    factory = RegisterMapFactory(reg_width=32)
+    factory.allocate_registers(
+        [Register(name='forced', dir='rw', fields=[], force_addr=0x8)]
+        + [Register(name=f'reg_{i}', dir='rw', fields=[]) for i in range(1000)]
+    )
+    addrs = [addr for _, _, addr, _, _ in factory.generate_register_map()]
+    assert addrs[0] == 0x8
+    assert sorted(addrs) == list(range(0, 1001 * 4, 4))
+    assert factory.get_min_addr_width() == 12
+
+
+def test_generate_register_map_is_a_copy():
+    factory = RegisterMapFactory(reg_width=32)
+    factory.add_entry(Register(name='a', dir='rw', fields=[Field(name='x', width=4, offset=0)]))
+    reg_map = factory.generate_register_map()
+    reg_map[0][4].clear()
+    assert len(factory.generate_register_map()[0][4]) == 1
+
+
+def test_export(tmp_path):
+    from hdl_utils.cocotb_utils.buses.reg_map import RegMap
+    factory = RegisterMapFactory(reg_width=32)
+    factory.allocate_registers([
+        Register(name='ctrl', dir='rw', default=0x3, fields=[
+            Field(name='en', width=1, offset=0),
+            Field(name='mode', width=2, offset=1),
+        ]),
+        Register(name='status', dir='ro', fields=[Field(name='busy', width=1, offset=0)]),
+    ])
+    factory.add_register_array(RegisterArray(name='lut', depth=4, width=16))
+    paths = {k: str(tmp_path / f'reg_map.{k}') for k in ('h', 'json', 'py')}
+    outputs = factory.export(
+        prefix='dev',
+        c_header=paths['h'],
+        json_file=paths['json'],
+        py_module=paths['py'],
+    )
+    assert '#define DEV_CTRL_ADDR 0x00000000' in outputs['c']
+    assert '#define DEV_CTRL_MODE_MASK 0x00000006' in outputs['c']
+    assert '#define DEV_LUT_ADDR 0x00000010' in outputs['c']
+    for reg_map in (RegMap.from_json(paths['json']), RegMap.from_py_module(paths['py'])):
+        assert reg_map.get_reg_by_name('status').addr == 0x4
+        assert reg_map.get_reg_by_addr(0x0).fields == [('en', 1, 0), ('mode', 2, 1)]
+        assert reg_map.get_reg_by_addr(0x0).default == 0x3
+
+
+def test_composer_windows():
+    from hdl_utils.amaranth_utils.reg_map import RegisterMapComposer
+    small = RegisterMapFactory(reg_width=32)
+    small.allocate_registers([
+        Register(name='ctrl', dir='rw', fields=[Field(name='en', width=1, offset=0)]),
+    ])
+    big = RegisterMapFactory(reg_width=32)
+    big.allocate_registers([Register(name=f'reg_{i}', dir='rw', fields=[]) for i in range(5)])
+    big.add_register_array(RegisterArray(name='lut', depth=8, width=32))
+    forced = RegisterMapFactory(reg_width=32)
+    forced.add_entry(Register(name='id', dir='ro', fields=[]))
+
+    composer = RegisterMapComposer(reg_width=32)
+    composer.add_block('small', small)
+    composer.add_block('big', big)
+    composer.add_block('forced', forced, force_addr=0x100)
+    windows = {name: (addr, size) for name, addr, size in composer.generate_windows()}
+    assert windows == {
+        'forced': (0x100, 0x4),
+        'big': (0x0, 0x40),
+        'small': (0x40, 0x4),
+    }
+    reg_map = {name: (addr, fields) for name, _, addr, _, fields in composer.generate_register_map()}
+    assert reg_map['small_ctrl'] == (0x40, [('small_en', 1, 0)])
+    assert reg_map['big_reg_4'][0] == 0x10
+    assert reg_map['forced_id'][0] == 0x100
+    assert composer.generate_register_arrays() == [('big_lut', 'rw', 0x20, 8, 32)]
+    assert composer.get_min_addr_width() == 9
+    with pytest.raises(AssertionError):
+        composer.add_block('late', small)
+
+
+def test_perf_counters_registers():
+    from amaranth import Elaboratable, Module
+    from hdl_utils.amaranth_utils.axi_lite_device import AxiLiteDevice
+    from hdl_utils.amaranth_utils.axi_stream_to_full import AxiStreamToFull
+    from hdl_utils.amaranth_utils.generate_verilog import generate_verilog
+    core = AxiStreamToFull(addr_w=32, data_w=64, user_w=0, perf_counters=True)
+    factory = RegisterMapFactory(reg_width=32)
+    factory.allocate_registers(core.perf_counters.registers(prefix='s2f_'))
+    registers_map = factory.generate_register_map()
+    reg_map = {name: (r_dir, fields) for name, r_dir, _, _, fields in registers_map}
+    assert reg_map['S2F_PERF_CTRL'] == ('rw', [('s2f_perf_clear', 1, 0)])
+    assert reg_map['S2F_PERF_WR_BEATS'] == ('ro', [('s2f_perf_wr_beats', 32, 0)])
+    assert len(reg_map) == 1 + len(core.perf_counters.counters)
+
+    device = AxiLiteDevice(
+        addr_w=factory.get_min_addr_width(),
+        data_w=32,
+        registers_map=registers_map,
+    )
+
+    class Top(Elaboratable):
+        def elaborate(self, platform):
+            m = Module()
+            m.submodules.core = core
+            m.submodules.device = device
+            m.d.comb += core.perf_counters.connect(device, prefix='s2f_')
+            return m
+
+    ports = device.axi_lite.extract_signals() + core.m_axi.extract_signals()
+    assert 'perf_wr_beats' in generate_verilog(core=Top(), name='top', ports=ports)